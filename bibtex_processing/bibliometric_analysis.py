@@ -1,79 +1,152 @@
-
-import bibtexparser
 import nltk
+import os
 import re
+import sys
+import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
+from scipy import sparse
 from sklearn.feature_extraction.text import CountVectorizer
-from itertools import combinations
-from collections import defaultdict
 
-# Download NLTK resources
-nltk.download('punkt')
-nltk.download('stopwords')
-from nltk.corpus import stopwords
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bibtex_processing.bibtex_stream import iter_bibtex_entries
+from bibtex_processing.network_layout import BACKBONE_ALPHA, TOP_K_EDGES, export_network, layout, prune_network
 
 
 # === Define input and output paths ===
 INPUT_BIBTEX_PATH = 'C:/Users/Lachmuth/OneDrive - Leibniz-Zentrum für Agrarlandschaftsforschung (ZALF) e.V/Dokumente/FAIRagro/Use Case 4/LTE_text_processing/output/V140_documented/V140_documented_rich.bib'
 
-# === Load BibTeX File ===
-with open(INPUT_BIBTEX_PATH, 'r', encoding='utf-8') as bibfile:
-    bib_database = bibtexparser.load(bibfile)
-
-# === Extract Abstracts ===
-abstracts = [entry.get('abstract', '').lower() for entry in bib_database.entries if 'abstract' in entry]
-
+# Edges need at least this many abstracts in common; PMI and Jaccard thresholds are optional
+MIN_COOCCURRENCE = 2
+MIN_PMI = None
+MIN_JACCARD = None
+# Only the best-connected nodes are labelled, so large networks stay readable
+LABELLED_NODES = 100
 
 # === Preprocess Text ===
-stop_words = set(stopwords.words('english'))
-
 def preprocess(text):
     text = re.sub(r'[^a-zA-Z\s]', '', text)
     return text.lower()
-cleaned_abstracts = [preprocess(abs) for abs in abstracts]
-
-# === Vectorize with CountVectorizer ===
-vectorizer = CountVectorizer(
-    min_df=2,
-    ngram_range=(1, 2),  # Capture bigrams 
-    #token_pattern=r'\b\w+\b',
-    stop_words='english'  # Use built-in stopword list
-)
-X = vectorizer.fit_transform(cleaned_abstracts)
-
-print(vectorizer.get_feature_names_out())
-terms = vectorizer.get_feature_names_out()
-bigrams = [term for term in terms if len(term.split()) == 2]
-print(bigrams)
-
-
-# === Build Co-occurrence Matrix ===
-co_occurrence = defaultdict(int)
-for doc in cleaned_abstracts:
-    tokens = set(doc.split())
-    filtered_tokens = [t for t in tokens if t in terms]
-    for term1, term2 in combinations(filtered_tokens, 2):
-        co_occurrence[(term1, term2)] += 1
-
-# === Build Network Graph ===
-G = nx.Graph()
-for (term1, term2), weight in co_occurrence.items():
-    if weight > 1:  # filter weak connections
-        G.add_edge(term1, term2, weight=weight)
-
-# === Visualize Network ===
-plt.figure(figsize=(12, 12))
-pos = nx.spring_layout(G, k=0.15)
-edges = G.edges()
-weights = [G[u][v]['weight'] for u,v in edges]
-
-nx.draw_networkx_nodes(G, pos, node_size=300, node_color='skyblue')
-nx.draw_networkx_edges(G, pos, edgelist=edges, width=[w * 0.5 for w in weights], alpha=0.6)
-nx.draw_networkx_labels(G, pos, font_size=10, font_family='sans-serif')
-
-plt.title('Filtered Keyword Co-occurrence Network')
-plt.axis('off')
-plt.tight_layout()
-#plt.savefig('filtered_keyword_network.png')
-plt.show()
+
+def cooccurrence_matrix(X):
+    """Sparse term x term matrix of the number of documents containing both terms (upper triangle)."""
+    X_bin = sparse.csr_matrix(X, dtype=np.int32, copy=True)
+    X_bin.data[:] = 1
+    return sparse.triu(X_bin.T @ X_bin, k=1).tocoo()
+
+def association_edges(C, document_frequency, n_documents, min_count=MIN_COOCCURRENCE, min_pmi=MIN_PMI,
+                      min_jaccard=MIN_JACCARD):
+    """Rows, columns, counts, PMI and Jaccard of the co-occurrence pairs that pass the thresholds."""
+    rows, cols, counts = C.row, C.col, C.data.astype(np.float64)
+    df_rows, df_cols = document_frequency[rows], document_frequency[cols]
+    pmi = np.log(counts * n_documents / (df_rows * df_cols))
+    jaccard = counts / (df_rows + df_cols - counts)
+    keep = counts >= min_count
+    if min_pmi is not None:
+        keep &= pmi >= min_pmi
+    if min_jaccard is not None:
+        keep &= jaccard >= min_jaccard
+    return rows[keep], cols[keep], counts[keep], pmi[keep], jaccard[keep]
+
+def nested_ngram_pairs(terms, rows, cols):
+    """Mask of pairs where one term is a word of the other (e.g. "soil" and "soil carbon"), which always co-occur."""
+    index = {term: i for i, term in enumerate(terms)}
+    words = [term.split() for term in terms]
+    parts = np.full((len(terms), max(map(len, words), default=1)), -1)
+    for i, term_words in enumerate(words):
+        if len(term_words) > 1:
+            parts[i, :len(term_words)] = [index.get(word, -1) for word in term_words]
+    return (parts[cols] == rows[:, None]).any(axis=1) | (parts[rows] == cols[:, None]).any(axis=1)
+
+def keyword_network(input_bibtex_path, output_png_path=None, min_count=MIN_COOCCURRENCE, min_pmi=MIN_PMI,
+                    min_jaccard=MIN_JACCARD, backbone_alpha=BACKBONE_ALPHA, top_k=TOP_K_EDGES):
+    """Build and draw the keyword co-occurrence network of the abstracts in a BibTeX file.
+
+    Terms are the vectorizer's unigrams and bigrams; edges carry the number
+    of abstracts both terms occur in (`weight`), their PMI and Jaccard
+    similarity, and are kept if they pass all given thresholds. The network
+    is then pruned to its disparity backbone at `backbone_alpha` with at
+    most `top_k` edges per node (None disables either; see network_layout).
+
+    The figure is saved to `output_png_path` if given, otherwise shown. With
+    a path, the network is also exported next to it as .gexf and .graphml,
+    and node positions are cached in `<name>_positions.json` to warm-start
+    the next layout.
+    """
+    # Download NLTK resources
+    nltk.download('punkt')
+    nltk.download('stopwords')
+    from nltk.corpus import stopwords
+
+    # === Stream BibTeX File and Extract Abstracts ===
+    cleaned_abstracts = [preprocess(entry.get('abstract', '').lower())
+                         for entry in iter_bibtex_entries(input_bibtex_path) if 'abstract' in entry]
+
+    stop_words = set(stopwords.words('english'))
+
+    # === Vectorize with CountVectorizer ===
+    vectorizer = CountVectorizer(
+        min_df=2,
+        ngram_range=(1, 2),  # Capture bigrams
+        #token_pattern=r'\b\w+\b',
+        stop_words='english'  # Use built-in stopword list
+    )
+    X = vectorizer.fit_transform(cleaned_abstracts)
+
+    print(vectorizer.get_feature_names_out())
+    terms = vectorizer.get_feature_names_out()
+    bigrams = [term for term in terms if len(term.split()) == 2]
+    print(bigrams)
+
+
+    # === Build Co-occurrence Matrix and Association Measures ===
+    C = cooccurrence_matrix(X)
+    document_frequency = np.asarray((X > 0).sum(axis=0)).ravel().astype(np.float64)
+    rows, cols, counts, pmi, jaccard = association_edges(C, document_frequency, X.shape[0], min_count, min_pmi,
+                                                         min_jaccard)
+    distinct = ~nested_ngram_pairs(terms, rows, cols)
+
+    # === Build Network Graph ===
+    G = nx.Graph()
+    G.add_edges_from((terms[r], terms[c], {'weight': int(w), 'pmi': float(p), 'jaccard': float(j)})
+                     for r, c, w, p, j in zip(rows[distinct], cols[distinct], counts[distinct], pmi[distinct],
+                                              jaccard[distinct]))
+
+    # === Prune to the Backbone and Lay Out ===
+    G = prune_network(G, backbone_alpha, top_k)
+    print(f"Backbone: {G.number_of_nodes()} terms, {G.number_of_edges()} edges")
+    base_path = os.path.splitext(output_png_path)[0] if output_png_path else None
+    pos = layout(G, cache_path=f"{base_path}_positions.json" if base_path else None)
+    if base_path:
+        export_network(G, pos, base_path)
+
+    # === Visualize Network ===
+    plt.figure(figsize=(12, 12))
+    edges = G.edges()
+    weights = np.array([G[u][v]['weight'] for u, v in edges], dtype=float)
+    widths = 0.5 + 2.5 * weights / weights.max() if len(weights) else []
+    degree = dict(G.degree(weight='weight'))
+    top_degree = max(degree.values(), default=1)
+    labelled = sorted(degree, key=degree.get, reverse=True)[:LABELLED_NODES]
+
+    nodes = nx.draw_networkx_nodes(G, pos, node_size=[20 + 280 * degree[n] / top_degree for n in G],
+                                   node_color='skyblue')
+    edge_lines = nx.draw_networkx_edges(G, pos, edgelist=edges, width=widths, alpha=0.6)
+    # Rasterise the many nodes and edges; labels stay text
+    for collection in (nodes, edge_lines):
+        if hasattr(collection, 'set_rasterized'):
+            collection.set_rasterized(True)
+    nx.draw_networkx_labels(G, pos, labels={n: n for n in labelled}, font_size=10, font_family='sans-serif')
+
+    plt.title('Filtered Keyword Co-occurrence Network')
+    plt.axis('off')
+    plt.tight_layout()
+    if output_png_path:
+        plt.savefig(output_png_path, dpi=200)
+        plt.close()
+    else:
+        plt.show()
+    return G
+
+if __name__ == "__main__":
+    keyword_network(INPUT_BIBTEX_PATH)
@@ -1,8 +1,19 @@
-import bibtexparser
-import requests
-import time
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
 import configparser
 import json
+from collections import Counter
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bibtex_processing.dedup import find_duplicates
+from bibtex_processing.bibtex_stream import BibtexStreamWriter, JsonArrayWriter, iter_bibtex_entries
+from bibtex_processing.scopus_client import (ABSTRACT_ONLY_FIELDS, SCOPUS_DOI_BATCH, SEARCH_REQUIRED_FIELDS,
+                                             scopus_session)
+from bibtex_processing.snapshot_index import BIB_SNAPSHOT_PATH
 
 # === Define input and output paths ===
 
@@ -15,41 +26,12 @@ OUTPUT_LOG_PATH = 'C:/Users/Lachmuth/OneDrive - Leibniz-Zentrum für Agrarlandsc
 # Load API key from config file
 config = configparser.ConfigParser()
 config.read('config.ini')
-SCOPUS_API_KEY = config['SCOPUS']['API_KEY']
-SCOPUS_API_DOI_URL = 'https://api.elsevier.com/content/abstract/doi/'
-SCOPUS_API_SEARCH_URL = 'https://api.elsevier.com/content/search/scopus'
-
-# Load the BibTeX file
-with open(INPUT_BIBTEX_PATH, 'r', encoding='utf-8') as bibtex_file:
-    bib_database = bibtexparser.load(bibtex_file)
-
-enriched_entries = []
-schemaorg_entries = []
-not_found_log = []
-
-def query_scopus_by_doi(doi):
-    headers = {
-        'Accept': 'application/json',
-        'X-ELS-APIKey': SCOPUS_API_KEY
-    }
-    response = requests.get(SCOPUS_API_DOI_URL + doi, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    return None
+SCOPUS_API_KEY = config.get('SCOPUS', 'API_KEY', fallback=None)
 
-def query_scopus_by_title_author(title, authors):
-    headers = {
-        'Accept': 'application/json',
-        'X-ELS-APIKey': SCOPUS_API_KEY
-    }
-    query = f'TITLE("{title}")'
-    if authors:
-        query += f' AND AUTH("{authors}")'
-    params = {'query': query}
-    response = requests.get(SCOPUS_API_SEARCH_URL, headers=headers, params=params)
-    if response.status_code == 200:
-        return response.json()
-    return None
+# Hash of the raw entry, stored in the enriched entry so incremental runs can tell what changed
+RAW_HASH_FIELD = 'raw_hash'
+# Entries read, looked up and written per step; bounds memory for very large exports
+ENRICH_BATCH_SIZE = 500
 
 def extract_authors(metadata):
     authors = metadata.get('authors', {}).get('author', [])
@@ -135,77 +117,194 @@ def convert_to_schemaorg(entry):
         "isAccessibleForFree": entry.get("open_access", "") == "1"
     }
 
-# Process each entry
-for entry in bib_database.entries:
-    doi = entry.get('doi')
-    if doi:
-        data = query_scopus_by_doi(doi)
-    else:
-        title = entry.get('title', '')
-        authors = entry.get('author', '')
-        data = query_scopus_by_title_author(title, authors)
-
-    if data and 'abstracts-retrieval-response' in data:
-        metadata = data['abstracts-retrieval-response']
-        coredata = metadata.get('coredata', {})
-        entry['title'] = str(coredata.get('dc:title', ''))
-        entry['abstract'] = str(coredata.get('dc:description', ''))
-        entry['keywords'] = str(coredata.get('dcterms:subject', ''))
-        entry['copyright'] = str(coredata.get('prism:copyright', ''))
-        #entry['license'] = str(coredata.get('openaccess', ''))
-        entry['journal'] = str(coredata.get('prism:publicationName', ''))
-        entry['volume'] = str(coredata.get('prism:volume', ''))
-        entry['issue'] = str(coredata.get('prism:issueIdentifier', ''))
-        entry['pages'] = str(coredata.get('prism:pageRange', ''))
-        entry['issn'] = str(coredata.get('prism:issn', ''))
-        entry['publisher'] = str(coredata.get('dc:publisher', ''))
-        entry['pub_year'] = str(coredata.get('prism:coverDate', '')[:4])
-        entry['eid'] = str(coredata.get('eid', ''))
-        entry['citedby_count'] = str(coredata.get('citedby-count', ''))
-        entry['authors_affiliations'] = str(extract_authors(metadata))
-        entry['author_keywords'] = str(extract_author_keywords(metadata))
-        entry['indexed_keywords'] = str(extract_indexed_keywords(metadata))
-        open_access_flag = coredata.get('openaccessFlag', '')
-        reuse_license = coredata.get('openaccess', '')  # May contain license type like CC-BY
-        # Combine both into a descriptive license field
-        if open_access_flag == '1':
+def enrich_entry(entry, data):
+    """Copy Scopus abstract-retrieval metadata into a BibTeX entry; returns False if there is none."""
+    if not (data and 'abstracts-retrieval-response' in data):
+        return False
+    metadata = data['abstracts-retrieval-response']
+    coredata = metadata.get('coredata', {})
+    entry['title'] = str(coredata.get('dc:title', ''))
+    entry['abstract'] = str(coredata.get('dc:description', ''))
+    entry['keywords'] = str(coredata.get('dcterms:subject', ''))
+    entry['copyright'] = str(coredata.get('prism:copyright', ''))
+    #entry['license'] = str(coredata.get('openaccess', ''))
+    entry['journal'] = str(coredata.get('prism:publicationName', ''))
+    entry['volume'] = str(coredata.get('prism:volume', ''))
+    entry['issue'] = str(coredata.get('prism:issueIdentifier', ''))
+    entry['pages'] = str(coredata.get('prism:pageRange', ''))
+    entry['issn'] = str(coredata.get('prism:issn', ''))
+    entry['publisher'] = str(coredata.get('dc:publisher', ''))
+    entry['pub_year'] = str(coredata.get('prism:coverDate', '')[:4])
+    entry['eid'] = str(coredata.get('eid', ''))
+    entry['citedby_count'] = str(coredata.get('citedby-count', ''))
+    entry['authors_affiliations'] = str(extract_authors(metadata))
+    entry['author_keywords'] = str(extract_author_keywords(metadata))
+    entry['indexed_keywords'] = str(extract_indexed_keywords(metadata))
+    open_access_flag = coredata.get('openaccessFlag', '')
+    reuse_license = coredata.get('openaccess', '')  # May contain license type like CC-BY
+    # Combine both into a descriptive license field
+    if open_access_flag == '1':
         entry['license'] = f"Open Access; {reuse_license}" if reuse_license else "Open Access"
-        else:
+    else:
         entry['license'] = reuse_license if reuse_license else "Restricted Access"
 
 
-        subject_areas = metadata.get('subject-areas', {}).get('subject-area', [])
-        if isinstance(subject_areas, list):
-            entry['subject_areas'] = '; '.join([sa.get('$', '') for sa in subject_areas])
-        elif isinstance(subject_areas, dict):
-            entry['subject_areas'] = subject_areas.get('$', '')
+    subject_areas = metadata.get('subject-areas', {}).get('subject-area', [])
+    if isinstance(subject_areas, list):
+        entry['subject_areas'] = '; '.join([sa.get('$', '') for sa in subject_areas])
+    elif isinstance(subject_areas, dict):
+        entry['subject_areas'] = subject_areas.get('$', '')
 
-        entry['open_access'] = coredata.get('openaccessFlag', '')
+    entry['open_access'] = coredata.get('openaccessFlag', '')
 
-        funding = metadata.get('item', {}).get('xocs:funding-list', {}).get('xocs:funding', [])
-        if isinstance(funding, list):
-            funders = [f.get('xocs:funding-agency', '') for f in funding]
-            entry['funding'] = '; '.join(funders)
-        elif isinstance(funding, dict):
-            entry['funding'] = funding.get('xocs:funding-agency', '')
+    funding = metadata.get('item', {}).get('xocs:funding-list', {}).get('xocs:funding', [])
+    if isinstance(funding, list):
+        funders = [f.get('xocs:funding-agency', '') for f in funding]
+        entry['funding'] = '; '.join(funders)
+    elif isinstance(funding, dict):
+        entry['funding'] = funding.get('xocs:funding-agency', '')
+    return True
 
-        enriched_entries.append(entry)
-        schemaorg_entries.append(convert_to_schemaorg(entry))
-    else:
-        not_found_log.append(f"Entry not enriched: {entry.get('title', '') or doi}")
-    time.sleep(1)  # Respect API rate limits
-
-# Write enriched BibTeX file
-enriched_db = bibtexparser.bibdatabase.BibDatabase()
-enriched_db.entries = [ensure_string_fields(e) for e in enriched_entries]
-with open(OUTPUT_BIBTEX_PATH, 'w', encoding='utf-8') as enriched_file:
-    bibtexparser.dump(enriched_db, enriched_file)
-
-# Write schema.org JSON-LD file
-with open(OUTPUT_JSONLD_PATH, 'w', encoding='utf-8') as json_file:
-    json.dump(schemaorg_entries, json_file, indent=2, ensure_ascii=False)
-
-# Write log file
-with open(OUTPUT_LOG_PATH, 'w') as log_file:
-    for line in not_found_log:
-        log_file.write(line + '\n')
+def raw_entry_hash(entry):
+    """Content hash of a raw BibTeX entry (all fields, order-independent)."""
+    fields = {key: value for key, value in entry.items() if key != RAW_HASH_FIELD}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def entry_keys(entry):
+    """Keys an entry is matched by across runs: its citation key and its DOI."""
+    keys = [f"id:{entry['ID']}"] if entry.get('ID') else []
+    if entry.get('doi'):
+        keys.append(f"doi:{entry['doi'].strip().lower()}")
+    return keys
+
+def load_enriched(output_bibtex_path, output_jsonld_path):
+    """Previously enriched entries and their JSON-LD, indexed by entry_keys; empty if the outputs are missing or out of step."""
+    if not (os.path.exists(output_bibtex_path) and os.path.exists(output_jsonld_path)):
+        return {}
+    with open(output_jsonld_path, 'r', encoding='utf-8') as json_file:
+        schemaorg_entries = json.load(json_file)
+    entries = list(iter_bibtex_entries(output_bibtex_path))
+    if len(entries) != len(schemaorg_entries):
+        print(f"⚠️ {output_bibtex_path} and {output_jsonld_path} differ in length; enriching everything.")
+        return {}
+    previous = {}
+    for entry, schemaorg_entry in zip(entries, schemaorg_entries):
+        for key in entry_keys(entry):
+            previous[key] = (entry, schemaorg_entry)
+    return previous
+
+def find_previous(entry, previous):
+    """The earlier (enriched entry, JSON-LD) of an unchanged raw entry, else None."""
+    raw_hash = raw_entry_hash(entry)
+    for key in entry_keys(entry):
+        if key in previous and previous[key][0].get(RAW_HASH_FIELD) == raw_hash:
+            return previous[key]
+    entry[RAW_HASH_FIELD] = raw_hash
+    return None
+
+async def enrich_stream(entries, previous, bib_out, json_out, log_file, doi_batch_size=0, duplicates=None,
+                        required_fields=SEARCH_REQUIRED_FIELDS + ABSTRACT_ONLY_FIELDS):
+    """Enrich `entries` batch by batch and write each batch as soon as its lookups are done.
+
+    `duplicates` maps the position of a duplicate record to that of its
+    cluster's first record (see dedup.find_duplicates); duplicates reuse the
+    first record's Scopus data instead of being looked up again.
+    """
+    entries = iter(entries)
+    duplicates = duplicates or {}
+    remaining = Counter(duplicates.values())
+    shared = {}  # position of a cluster's first record -> its Scopus data, until its last duplicate is written
+    reused_count = enriched_count = shared_count = 0
+    position = 0
+    async with scopus_session(SCOPUS_API_KEY) as client:
+        while batch := list(islice(entries, ENRICH_BATCH_SIZE)):
+            positions = range(position, position + len(batch))
+            position += len(batch)
+            reused = [find_previous(entry, previous) for entry in batch]
+            looked_up = set()
+            pending = []
+            for p, entry, result in zip(positions, batch, reused):
+                first = duplicates.get(p)
+                if result is None and not (first in shared or first in looked_up):
+                    looked_up.add(p)
+                    pending.append(entry)
+            # Query Scopus concurrently, as fast as the rate limit allows (see scopus_client.py)
+            results = iter(await client.lookup_many(pending, doi_batch_size, required_fields))
+            for p, entry, result in zip(positions, batch, reused):
+                first = duplicates.get(p)
+                if result is None:
+                    if p in looked_up:
+                        data = next(results)
+                    else:
+                        data = shared[first]
+                        shared_count += 1
+                    if remaining.get(p):
+                        shared[p] = data
+                    if enrich_entry(entry, data):
+                        result = (ensure_string_fields(entry), convert_to_schemaorg(entry))
+                        enriched_count += 1
+                    else:
+                        log_file.write(f"Entry not enriched: {entry.get('title', '') or entry.get('doi')}\n")
+                else:
+                    reused_count += 1
+                if first is not None:
+                    remaining[first] -= 1
+                    if not remaining[first]:
+                        shared.pop(first, None)
+                if result is not None:
+                    bib_out.write(result[0])
+                    json_out.write(result[1])
+    if shared_count:
+        print(f"🧬 {shared_count} duplicate records enriched from their cluster's first record")
+    return reused_count, enriched_count
+
+def enrich_bibtex(input_bibtex_path, output_bibtex_path, output_jsonld_path, output_log_path, incremental=False,
+                  doi_batch_size=0, dedup=True, search_view_only=False):
+    """Enrich a raw BibTeX export with Scopus metadata and write BibTeX, schema.org JSON-LD and a log.
+
+    Entries are streamed from the input and written as they are enriched,
+    so memory does not grow with the size of the export. With
+    `incremental`, entries whose raw content is unchanged since the last
+    run (matched by citation key or DOI) are taken from the existing
+    outputs, which are held in memory, and only new or changed entries are
+    looked up. With `doi_batch_size`, DOIs are looked up that many per
+    Scopus Search request (see ScopusClient.lookup_many); records missing
+    fields the search view lacks are retrieved in full, unless
+    `search_view_only` accepts them without. With `dedup`, a
+    first pass over the input clusters duplicate records so each paper is
+    looked up once and its data shared by all of its records.
+    """
+    previous = load_enriched(output_bibtex_path, output_jsonld_path) if incremental else {}
+    duplicates = find_duplicates(iter_bibtex_entries(input_bibtex_path)) if dedup else {}
+    required_fields = SEARCH_REQUIRED_FIELDS if search_view_only else SEARCH_REQUIRED_FIELDS + ABSTRACT_ONLY_FIELDS
+
+    with BibtexStreamWriter(output_bibtex_path) as bib_out, JsonArrayWriter(output_jsonld_path) as json_out, \
+            open(output_log_path, 'w') as log_file:
+        reused, enriched = asyncio.run(
+            enrich_stream(iter_bibtex_entries(input_bibtex_path), previous, bib_out, json_out, log_file,
+                          doi_batch_size, duplicates, required_fields))
+    if incremental:
+        print(f"♻️ {reused} unchanged entries reused, {enriched} new or changed entries enriched")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enrich a BibTeX export with Scopus metadata.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only enrich entries that are new or changed since the existing outputs were written")
+    parser.add_argument("--doi-batch", type=int, nargs="?", const=SCOPUS_DOI_BATCH, default=0, metavar="N",
+                        help=f"Look up DOIs N at a time (default and maximum {SCOPUS_DOI_BATCH}) with Scopus Search, "
+                             "retrieving records in full where the search view lacks fields")
+    parser.add_argument("--search-view-only", action="store_true",
+                        help="With --doi-batch, accept search records without publisher, subject areas, "
+                             "index terms and licence instead of retrieving them in full")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Look up every record, even those that duplicate an earlier one")
+    args = parser.parse_args()
+
+    if not SCOPUS_API_KEY:
+        if not os.path.exists(BIB_SNAPSHOT_PATH):
+            raise RuntimeError("SCOPUS API_KEY must be set in config.ini, or an offline snapshot imported "
+                               "with bibtex_processing/snapshot_index.py.")
+        print("⚠️ No Scopus API key: enriching from the offline snapshot and cache only.")
+    enrich_bibtex(INPUT_BIBTEX_PATH, OUTPUT_BIBTEX_PATH, OUTPUT_JSONLD_PATH, OUTPUT_LOG_PATH,
+                  incremental=args.incremental, doi_batch_size=args.doi_batch, dedup=not args.no_dedup,
+                  search_view_only=args.search_view_only)
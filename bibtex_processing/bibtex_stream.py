@@ -0,0 +1,110 @@
+"""Streaming BibTeX reading and incremental BibTeX / JSON-LD writing.
+
+    for entry in iter_bibtex_entries(path): ...
+
+    with BibtexStreamWriter(out_bib) as bib_out, JsonArrayWriter(out_json) as json_out:
+        bib_out.write(entry)
+        json_out.write(record)
+
+The reader splits the file at `@` lines outside braces and parses one
+entry at a time with a single bibtexparser parser, so @string macros
+still apply and memory stays flat however large the export is. The
+writers write each entry as soon as it is given and move the finished
+file into place on close, so an interrupted run leaves the previous
+output intact. Entries are written in input order (bibtexparser.dump
+sorts by ID).
+"""
+import json
+import os
+from typing import Dict, Iterator, List
+
+from bibtexparser.bibdatabase import BibDatabase
+from bibtexparser.bparser import BibTexParser
+from bibtexparser.bwriter import BibTexWriter
+
+
+def _brace_delta(line: str) -> int:
+    line = line.replace("\\{", "").replace("\\}", "")
+    return line.count("{") - line.count("}")
+
+
+def iter_bibtex_chunks(bibtex_file) -> Iterator[str]:
+    """Text of each @-block of an open BibTeX file."""
+    chunk: List[str] = []
+    depth = 0
+    for line in bibtex_file:
+        if depth <= 0 and line.lstrip().startswith("@") and chunk:
+            yield "".join(chunk)
+            chunk = []
+            depth = 0
+        chunk.append(line)
+        depth += _brace_delta(line)
+    if chunk:
+        yield "".join(chunk)
+
+
+def iter_bibtex_entries(bibtex_path: str) -> Iterator[Dict[str, str]]:
+    """Entries of a BibTeX file, parsed one at a time, as bibtexparser.load would return them."""
+    parser = BibTexParser()
+    parser.expect_multiple_parse = True
+    with open(bibtex_path, "r", encoding="utf-8") as bibtex_file:
+        for chunk in iter_bibtex_chunks(bibtex_file):
+            parser.parse(chunk, partial=True)
+            entries = parser.bib_database.entries
+            parser.bib_database.entries = []
+            # Keep @string macros but not preambles and comments
+            parser.bib_database.comments = []
+            parser.bib_database.preambles = []
+            yield from entries
+
+
+class _StreamWriter:
+    """Writes to `<path>.tmp` and replaces `path` with it on a clean close."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+        self.count = 0
+
+    def finish(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.finish()
+        self.file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+
+class BibtexStreamWriter(_StreamWriter):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.writer = BibTexWriter()
+        self.database = BibDatabase()
+
+    def write(self, entry: Dict[str, str]) -> None:
+        self.database.entries = [entry]
+        if self.count:
+            self.file.write(self.writer.entry_separator)
+        self.file.write(self.writer.write(self.database))
+        self.count += 1
+
+
+class JsonArrayWriter(_StreamWriter):
+    """Writes a JSON array item by item, formatted like json.dump(items, indent=2)."""
+
+    def write(self, item) -> None:
+        text = json.dumps(item, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+        self.file.write(("[\n  " if not self.count else ",\n  ") + text)
+        self.count += 1
+
+    def finish(self) -> None:
+        self.file.write("\n]" if self.count else "[]")
@@ -0,0 +1,138 @@
+"""Duplicate-record detection for merged BibTeX exports.
+
+The same paper exported from several databases appears under different
+citation keys, DOI casing or title punctuation. Records are blocked by
+
+- normalised DOI,
+- MinHash bands of the title's character shingles, and
+- publication year plus first-author surname,
+
+and a candidate joins an existing cluster if their DOIs are equal, or if
+neither DOI contradicts the other and their titles' shingle Jaccard
+similarity is at least TITLE_THRESHOLD (with matching year and first author
+where both have them). Only the first record of each cluster, its
+representative, needs enriching. Memory grows with the number of unique
+papers, not with the size of the records.
+"""
+import hashlib
+import random
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set
+
+from bibtex_processing.scopus_cache import normalise_doi, normalise_surname, normalise_title
+
+SHINGLE_SIZE = 4
+TITLE_THRESHOLD = 0.8
+MINHASH_BANDS = 8
+MINHASH_ROWS = 2
+# Year/author blocks of prolific authors are only compared against their most recent papers
+MAX_BLOCK_CANDIDATES = 50
+
+# One 64-bit hash per shingle, XORed with a fixed mask per MinHash function
+_MASKS = [random.Random(seed).getrandbits(64) for seed in range(MINHASH_BANDS * MINHASH_ROWS)]
+
+
+def title_shingles(title: str) -> Set[str]:
+    text = normalise_title(title).replace(" ", "")
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_bands(shingles: Set[str]) -> List[str]:
+    """One hash per band of the shingles' MinHash signature; similar titles share a band with high probability."""
+    values = [int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little")
+              for shingle in shingles]
+    signature = [min(value ^ mask for value in values) for mask in _MASKS]
+    return [f"{band}:{signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]}"
+            for band in range(MINHASH_BANDS)]
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+@dataclass
+class Record:
+    doi: str
+    shingles: Set[str]
+    year: str
+    surname: str
+
+    @classmethod
+    def from_entry(cls, entry: Dict[str, str]) -> "Record":
+        return cls(doi=normalise_doi(entry.get("doi")),
+                   shingles=title_shingles(entry.get("title", "")),
+                   year=(entry.get("year") or "").strip()[:4],
+                   surname=normalise_surname((entry.get("author") or "").split(" and ")[0]))
+
+    def same_paper(self, other: "Record") -> bool:
+        if self.doi and other.doi:
+            return self.doi == other.doi
+        if self.year and other.year and self.year != other.year:
+            return False
+        if self.surname and other.surname and self.surname != other.surname:
+            return False
+        return jaccard(self.shingles, other.shingles) >= TITLE_THRESHOLD
+
+
+class DuplicateIndex:
+    """Assigns records, one at a time, to clusters of the same paper."""
+
+    def __init__(self):
+        self.representatives: List[Record] = []
+        self.by_doi: Dict[str, int] = {}
+        self.by_band: Dict[str, List[int]] = {}
+        self.by_year_author: Dict[str, List[int]] = {}
+
+    def _candidates(self, record: Record, bands: List[str]) -> Iterable[int]:
+        if record.doi and record.doi in self.by_doi:
+            yield self.by_doi[record.doi]
+        for band in bands:
+            yield from self.by_band.get(band, ())
+        if record.year and record.surname:
+            yield from self.by_year_author.get(f"{record.year}|{record.surname}", ())[-MAX_BLOCK_CANDIDATES:]
+
+    def add(self, entry: Dict[str, str]) -> int:
+        """Cluster id of the entry: that of an earlier record of the same paper, else a new one."""
+        record = Record.from_entry(entry)
+        bands = minhash_bands(record.shingles) if record.shingles else []
+        seen = set()
+        for cluster in self._candidates(record, bands):
+            if cluster not in seen:
+                seen.add(cluster)
+                if record.same_paper(self.representatives[cluster]):
+                    if record.doi and not self.representatives[cluster].doi:
+                        self.by_doi.setdefault(record.doi, cluster)
+                    return cluster
+        cluster = len(self.representatives)
+        self.representatives.append(record)
+        if record.doi:
+            self.by_doi[record.doi] = cluster
+        for band in bands:
+            self.by_band.setdefault(band, []).append(cluster)
+        if record.year and record.surname:
+            self.by_year_author.setdefault(f"{record.year}|{record.surname}", []).append(cluster)
+        return cluster
+
+
+def find_duplicates(entries: Iterable[Dict[str, str]]) -> Dict[int, int]:
+    """Map the position of every duplicate record to the position of its cluster's first record.
+
+    Records without duplicates are left out, so the result stays small.
+    """
+    index = DuplicateIndex()
+    first_position: List[int] = []
+    duplicates = {}
+    count = 0
+    for position, entry in enumerate(entries):
+        count += 1
+        cluster = index.add(entry)
+        if cluster == len(first_position):
+            first_position.append(position)
+        else:
+            duplicates[position] = first_position[cluster]
+    clusters = len(set(duplicates.values()))
+    print(f"🧬 {count} records, {len(first_position)} unique papers; "
+          f"{len(duplicates)} duplicates in {clusters} clusters")
+    return duplicates
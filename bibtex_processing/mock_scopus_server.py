@@ -0,0 +1,191 @@
+"""Local stand-in for the Scopus abstract retrieval and search APIs.
+
+    python bibtex_processing/mock_scopus_server.py --port 8765 --rate 9
+    SCOPUS_API_BASE=http://127.0.0.1:8765 python bibtex_processing/bibtex_enrichment.py
+
+Answers with synthetic records derived from the requested DOI, enforces a
+per-second throttle (429 beyond `--rate` requests in the current second)
+and sends X-RateLimit-* headers like Scopus. Like Scopus, it rejects DOI
+searches with `count` above 25 or with a malformed DOI with 400. `--check N` starts the server
+in the background, enriches N synthetic entries through scopus_client and
+reports throughput, throttling and missing results; add `--doi-batch 25`
+to compare batched DOI search.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MISSING_DOI_PREFIX = "10.0000/missing"  # DOIs starting with this answer 404
+NO_ABSTRACT_DOI_PREFIX = "10.0000/noabstract"  # search records of these DOIs lack dc:description
+INVALID_DOI_PREFIX = "10.0000/invalid"  # a search query containing one of these answers 400
+DOI_TERM = re.compile(r'DOI\("([^"]+)"\)')
+
+
+def abstract_record(key: str) -> dict:
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return {"abstracts-retrieval-response": {
+        "coredata": {
+            "dc:title": f"Synthetic article {digest[:8]}",
+            "dc:description": f"Abstract of {key}.",
+            "prism:doi": key,
+            "prism:publicationName": "Journal of Mock Agronomy",
+            "prism:volume": str(int(digest[:2], 16)),
+            "prism:issn": "12345678",
+            "prism:coverDate": f"{1990 + int(digest[2:4], 16) % 35}-01-01",
+            "eid": f"2-s2.0-{int(digest[:10], 16)}",
+            "dc:identifier": f"SCOPUS_ID:{int(digest[:10], 16)}",
+            "citedby-count": str(int(digest[4:6], 16)),
+            "openaccessFlag": "1" if int(digest[6], 16) % 2 else "0",
+            "openaccess": "1" if int(digest[6], 16) % 2 else "0",
+            "dc:publisher": "Mock Academic Press",
+        },
+        "subject-areas": {"subject-area": [{"$": "Soil Science"}]},
+        "idxterms": {"mainterm": [{"$": "crop yield"}]},
+        "authors": {"author": [{"ce:indexed-name": "Doe J.", "afid": {"$": "60000001"}}]},
+        "authkeywords": {"author-keyword": [{"$": "long-term experiment"}, {"$": "soil organic carbon"}]},
+    }}
+
+
+def search_record(doi: str) -> dict:
+    """COMPLETE-view Scopus Search record for a DOI; like Scopus, without publisher and licence."""
+    coredata = abstract_record(doi)["abstracts-retrieval-response"]["coredata"]
+    record = {key: value for key, value in coredata.items()
+              if key not in ("openaccessFlag", "openaccess", "dc:publisher")}
+    record.update({"openaccessFlag": coredata["openaccessFlag"] == "1",
+                   "authkeywords": "long-term experiment | soil organic carbon",
+                   "author": [{"authid": "1", "authname": "Doe J.", "afid": [{"$": "60000001"}]}]})
+    if doi.startswith(NO_ABSTRACT_DOI_PREFIX):
+        del record["dc:description"]
+    return record
+
+
+class MockScopusHandler(BaseHTTPRequestHandler):
+    rate = 9
+    quota = 20000
+    max_count = 25  # results per page Scopus allows for the COMPLETE view; larger `count` answers 400
+    lock = threading.Lock()
+    window = [0, 0]  # [second, requests in that second]
+    served = [0]
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: dict, extra_headers=None) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("X-RateLimit-Limit", str(self.quota))
+        self.send_header("X-RateLimit-Remaining", str(max(0, self.quota - self.served[0])))
+        self.send_header("X-RateLimit-Reset", str(int(time.time()) + 7 * 24 * 3600))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        with self.lock:
+            second = int(time.time())
+            if self.window[0] != second:
+                self.window[:] = [second, 0]
+            self.window[1] += 1
+            throttled = self.window[1] > self.rate
+            if not throttled:
+                self.served[0] += 1
+        if throttled:
+            self._send(429, {"error-response": {"error-code": "TOO_MANY_REQUESTS"}}, {"Retry-After": "1"})
+            return
+        if not self.headers.get("X-ELS-APIKey"):
+            self._send(401, {"error-response": {"error-code": "AUTHENTICATION_ERROR"}})
+            return
+
+        url = urlparse(self.path)
+        if url.path.startswith("/content/abstract/doi/"):
+            doi = unquote(url.path[len("/content/abstract/doi/"):])
+            if doi.startswith((MISSING_DOI_PREFIX, INVALID_DOI_PREFIX)):
+                self._send(404, {"service-error": {"status": {"statusCode": "RESOURCE_NOT_FOUND"}}})
+            else:
+                self._send(200, abstract_record(doi))
+        elif url.path.startswith("/content/abstract/scopus_id/"):
+            self._send(200, abstract_record(unquote(url.path.rsplit("/", 1)[1])))
+        elif url.path == "/content/search/scopus":
+            params = parse_qs(url.query)
+            query = params.get("query", [""])[0]
+            dois = DOI_TERM.findall(query)
+            if dois:
+                count = int(params.get("count", ["25"])[0])
+                if count > self.max_count or any(doi.startswith(INVALID_DOI_PREFIX) for doi in dois):
+                    self._send(400, {"service-error": {"status": {"statusCode": "INVALID_INPUT"}}})
+                    return
+                found = [doi for doi in dois if not doi.startswith((MISSING_DOI_PREFIX, INVALID_DOI_PREFIX))]
+                self._send(200, {"search-results": {"opensearch:totalResults": str(len(found)),
+                                                    "entry": [search_record(doi) for doi in found[:count]]}})
+                return
+            record = abstract_record(query)["abstracts-retrieval-response"]["coredata"]
+            self._send(200, {"search-results": {"opensearch:totalResults": "1", "entry": [
+                {"dc:identifier": record["dc:identifier"], "dc:title": record["dc:title"]}]}})
+        else:
+            self._send(404, {"service-error": {"status": {"statusCode": "RESOURCE_NOT_FOUND"}}})
+
+
+def start_server(port: int, rate: int) -> ThreadingHTTPServer:
+    MockScopusHandler.rate = rate
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockScopusHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check(entries_count: int, rate: int, doi_batch_size: int = 0, search_view_only: bool = False) -> None:
+    from bibtex_processing.scopus_client import (ABSTRACT_ONLY_FIELDS, SEARCH_REQUIRED_FIELDS, lookup_entries,
+                                                 missing_fields)
+
+    server = start_server(0, rate)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    entries = [{"doi": f"10.1234/mock.{i}"} for i in range(entries_count)]
+    entries[::10] = [{"title": f"Untitled {i}", "author": "Doe, J."} for i in range(len(entries[::10]))]
+    entries[1] = {"doi": f"{MISSING_DOI_PREFIX}.1"}
+    if entries_count > 2:
+        entries[2] = {"doi": f"{NO_ABSTRACT_DOI_PREFIX}.2"}
+    start = time.perf_counter()
+    results = asyncio.run(lookup_entries(entries, "mock-key", cache_path=None, snapshot_path=None,
+                                         doi_batch_size=doi_batch_size,
+                                         required_fields=SEARCH_REQUIRED_FIELDS if search_view_only
+                                         else SEARCH_REQUIRED_FIELDS + ABSTRACT_ONLY_FIELDS,
+                                         base_url=base_url, rate=rate))
+    seconds = time.perf_counter() - start
+    server.shutdown()
+
+    found = sum(1 for result in results if result)
+    complete = sum(1 for result in results if result and not missing_fields(result, ABSTRACT_ONLY_FIELDS))
+    print(f"✅ {found}/{entries_count} entries found (1 missing on purpose), {complete} with publisher, "
+          f"subject areas, index terms and licence, in {seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Scopus API for local enrichment runs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=int, default=9, help="Requests per second before answering 429")
+    parser.add_argument("--check", type=int, metavar="N", help="Enrich N synthetic entries against the mock and exit")
+    parser.add_argument("--doi-batch", type=int, default=0, metavar="N",
+                        help="With --check, search DOIs N at a time instead of one retrieval each")
+    parser.add_argument("--search-view-only", action="store_true",
+                        help="With --doi-batch, accept search records without retrieving missing fields")
+    args = parser.parse_args()
+
+    if args.check:
+        check(args.check, args.rate, args.doi_batch, args.search_view_only)
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", args.port), MockScopusHandler)
+        MockScopusHandler.rate = args.rate
+        print(f"🧪 Mock Scopus API on http://127.0.0.1:{args.port} ({args.rate} requests/s)")
+        server.serve_forever()
@@ -0,0 +1,205 @@
+"""Backbone pruning, scalable layout and export of keyword co-occurrence networks.
+
+    G = prune_network(G)                       # disparity backbone + top-k edges per node
+    pos = layout(G, cache_path="net_positions.json")
+    export_network(G, pos, "net")              # net.gexf, net.graphml
+
+The disparity filter (Serrano, Boguñá & Vespignani 2009) keeps an edge if
+its share of an endpoint's total weight is significant at level `alpha`
+against a uniform split, so hubs keep their strong links and weak nodes
+their relatively strongest. Of those, each node keeps at most `top_k`.
+
+The layout is force-directed (Fruchterman-Reingold) with attraction along
+edges. Instead of all-pairs repulsion, each node is pushed exactly by its
+NEIGHBOURS nearest nodes (found with a k-d tree) and approximately by all
+others through the node density on a grid, convolved with the repulsion
+kernel by FFT. An iteration is about O(nodes log nodes + edges), so tens
+of thousands of nodes lay out in seconds. Positions are cached by term and
+used as the start of the next run, where only new nodes need placing and
+a few cool iterations suffice.
+"""
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+from scipy.signal import fftconvolve
+from scipy.spatial import cKDTree
+
+BACKBONE_ALPHA = 0.05
+TOP_K_EDGES = 10
+COLD_ITERATIONS = 100
+WARM_ITERATIONS = 20
+GRAVITY = 0.05
+NEIGHBOURS = 8
+GRID = 128
+
+Positions = Dict[str, Tuple[float, float]]
+
+
+def _edge_arrays(G: nx.Graph, weight: str = 'weight'):
+    nodes = list(G)
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = list(G.edges(data=weight, default=1.0))
+    u = np.fromiter((index[a] for a, _, _ in edges), dtype=np.int64, count=len(edges))
+    v = np.fromiter((index[b] for _, b, _ in edges), dtype=np.int64, count=len(edges))
+    w = np.fromiter((float(value) for _, _, value in edges), dtype=np.float64, count=len(edges))
+    return nodes, u, v, w
+
+
+def disparity_significance(n_nodes: int, u: np.ndarray, v: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """Per edge, the smaller of the disparity filter's p-values at its two endpoints."""
+    strength = np.bincount(u, w, n_nodes) + np.bincount(v, w, n_nodes)
+    degree = np.bincount(u, minlength=n_nodes) + np.bincount(v, minlength=n_nodes)
+
+    def p_value(end):
+        k = degree[end]
+        # Degree-1 endpoints carry no information, the other endpoint decides
+        return np.where(k > 1, (1 - w / strength[end]) ** (k - 1), 1.0)
+
+    return np.minimum(p_value(u), p_value(v))
+
+
+def top_k_per_node(n_nodes: int, u: np.ndarray, v: np.ndarray, w: np.ndarray, k: int) -> np.ndarray:
+    """Mask of edges among the `k` heaviest of at least one endpoint."""
+    ends = np.concatenate([u, v])
+    weights = np.concatenate([w, w])
+    order = np.lexsort((-weights, ends))
+    first_of_node = np.searchsorted(ends[order], np.arange(n_nodes))
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order)) - first_of_node[ends[order]]
+    return (rank[:len(u)] < k) | (rank[len(u):] < k)
+
+
+def prune_network(G: nx.Graph, alpha: Optional[float] = BACKBONE_ALPHA, top_k: Optional[int] = TOP_K_EDGES,
+                  weight: str = 'weight') -> nx.Graph:
+    """Backbone of G: significant edges (disparity filter at `alpha`), at most `top_k` per node, no isolated nodes."""
+    nodes, u, v, w = _edge_arrays(G, weight)
+    keep = np.ones(len(w), dtype=bool)
+    if alpha is not None and len(w):
+        keep &= disparity_significance(len(nodes), u, v, w) < alpha
+    if top_k is not None and keep.any():
+        kept = np.flatnonzero(keep)
+        keep[kept] = top_k_per_node(len(nodes), u[kept], v[kept], w[kept], top_k)
+    backbone = nx.Graph()
+    backbone.add_edges_from((nodes[a], nodes[b], G.edges[nodes[a], nodes[b]])
+                            for a, b in zip(u[keep], v[keep]))
+    return backbone
+
+
+def load_positions(cache_path: Optional[str]) -> Positions:
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return {node: tuple(xy) for node, xy in json.load(f).items()}
+    return {}
+
+
+def save_positions(cache_path: str, positions: Positions) -> None:
+    """Merge `positions` into the cache, so terms that drop out for a run keep their place."""
+    cached = load_positions(cache_path)
+    cached.update(positions)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump({node: [round(x, 5), round(y, 5)] for node, (x, y) in cached.items()}, f, ensure_ascii=False)
+
+
+def _initial_positions(nodes, u, v, cached: Positions, rng: np.random.Generator, spacing: float):
+    pos = rng.random((len(nodes), 2))
+    known = np.array([node in cached for node in nodes], dtype=bool)
+    if known.any():
+        pos[known] = [cached[node] for node in np.array(nodes, dtype=object)[known]]
+        # New nodes start next to their already placed neighbours
+        for a, b in ((u, v), (v, u)):
+            placed = known[b] & ~known[a]
+            if placed.any():
+                total = np.zeros((len(nodes), 2))
+                np.add.at(total, a[placed], pos[b[placed]])
+                count = np.bincount(a[placed], minlength=len(nodes))
+                new = count > 0
+                pos[new] = total[new] / count[new, None] + rng.normal(0, spacing, (new.sum(), 2))
+                known |= new
+    # Warm start if most nodes already had a place
+    return pos, known.mean() >= 0.5
+
+
+def _near_repulsion(pos: np.ndarray, spacing: float) -> np.ndarray:
+    """Exact repulsion from each node's NEIGHBOURS nearest nodes."""
+    _, neighbours = cKDTree(pos).query(pos, k=min(NEIGHBOURS + 1, len(pos)))
+    delta = pos[:, None, :] - pos[neighbours[:, 1:]]
+    distance2 = np.maximum((delta ** 2).sum(axis=2), (1e-3 * spacing) ** 2)
+    return (delta * (spacing ** 2 / distance2)[:, :, None]).sum(axis=1)
+
+
+def _far_repulsion(pos: np.ndarray, spacing: float) -> np.ndarray:
+    """Approximate repulsion from all nodes in other grid cells: cell counts convolved with the force kernel."""
+    low = pos.min(axis=0)
+    cell = max(np.ptp(pos, axis=0).max(), spacing) * 1.0001 / GRID
+    ij = np.minimum(((pos - low) / cell).astype(np.int64), GRID - 1)
+    density = np.bincount(ij[:, 0] * GRID + ij[:, 1], minlength=GRID * GRID).reshape(GRID, GRID).astype(float)
+    offsets = np.arange(-GRID + 1, GRID) * cell
+    dx, dy = np.meshgrid(offsets, offsets, indexing='ij')
+    distance2 = dx ** 2 + dy ** 2
+    distance2[GRID - 1, GRID - 1] = np.inf  # the node's own cell is left to _near_repulsion
+    force = np.empty_like(pos)
+    for axis, kernel in enumerate((dx, dy)):
+        field = fftconvolve(density, kernel / distance2, mode='full')[GRID - 1:2 * GRID - 1, GRID - 1:2 * GRID - 1]
+        force[:, axis] = field[ij[:, 0], ij[:, 1]]
+    return spacing ** 2 * force
+
+
+def layout(G: nx.Graph, cache_path: Optional[str] = None, iterations: Optional[int] = None, seed: int = 42,
+           weight: str = 'weight') -> Positions:
+    """Force-directed positions of G's nodes, warm-started from (and saved to) `cache_path`."""
+    nodes, u, v, w = _edge_arrays(G, weight)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    rng = np.random.default_rng(seed)
+    spacing = 1 / np.sqrt(n)  # ideal edge length in the unit square
+    cached = load_positions(cache_path)
+    pos, warm = _initial_positions(nodes, u, v, cached, rng, spacing)
+    if iterations is None:
+        iterations = WARM_ITERATIONS if warm else COLD_ITERATIONS
+    strength = np.log1p(w) / np.log1p(w).max() if len(w) else w
+    temperature = (0.02 if warm else 0.1) * max(1.0, np.ptp(pos, axis=0).max())
+
+    for step in range(iterations):
+        if n > 1:
+            displacement = _near_repulsion(pos, spacing) + _far_repulsion(pos, spacing)
+        else:
+            displacement = np.zeros((n, 2))
+        # Attraction along edges, stronger for frequent co-occurrences
+        if len(u):
+            delta = pos[u] - pos[v]
+            distance = np.hypot(delta[:, 0], delta[:, 1])
+            force = delta * (distance * strength / spacing)[:, None]
+            for axis in (0, 1):
+                displacement[:, axis] += np.bincount(v, force[:, axis], n) - np.bincount(u, force[:, axis], n)
+        # Weak pull to the centre keeps disconnected parts together
+        displacement += GRAVITY * (pos.mean(axis=0) - pos)
+        length = np.maximum(np.hypot(displacement[:, 0], displacement[:, 1]), 1e-9)
+        step_temperature = temperature * (1 - step / iterations)
+        pos += displacement * (np.minimum(length, step_temperature) / length)[:, None]
+
+    positions = {node: (float(x), float(y)) for node, (x, y) in zip(nodes, pos)}
+    if cache_path:
+        save_positions(cache_path, positions)
+    return positions
+
+
+def export_network(G: nx.Graph, positions: Positions, base_path: str) -> Tuple[str, str]:
+    """Write `<base_path>.gexf` (with viz positions) and `<base_path>.graphml` (x, y attributes)."""
+    graph = G.copy()
+    for node, (x, y) in positions.items():
+        if node in graph:
+            graph.nodes[node]['x'] = x
+            graph.nodes[node]['y'] = y
+    graphml_path = f"{base_path}.graphml"
+    nx.write_graphml(graph, graphml_path)
+    for node in graph:
+        if 'x' in graph.nodes[node]:
+            graph.nodes[node]['viz'] = {'position': {'x': graph.nodes[node]['x'] * 1000,
+                                                     'y': graph.nodes[node]['y'] * 1000, 'z': 0.0}}
+    gexf_path = f"{base_path}.gexf"
+    nx.write_gexf(graph, gexf_path)
+    return gexf_path, graphml_path
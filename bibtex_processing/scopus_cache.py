@@ -0,0 +1,94 @@
+"""Persistent cache of raw Scopus responses.
+
+Responses are stored zlib-compressed in SQLite, keyed by DOI or, for entries
+without one, by normalised title and first author. Entries Scopus does not
+know are cached too, so a re-run after changing only the conversion code
+makes no network calls. Entries older than SCOPUS_CACHE_TTL_DAYS are
+fetched again.
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCOPUS_CACHE_PATH = os.getenv("SCOPUS_CACHE_PATH", os.path.join(PROJECT_DIR, "output", "scopus_cache.sqlite"))
+SCOPUS_CACHE_TTL_DAYS = float(os.getenv("SCOPUS_CACHE_TTL_DAYS", "30"))
+COMMIT_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    payload    BLOB          -- zlib-compressed JSON; NULL if Scopus has no record
+)
+"""
+NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def normalise_doi(doi: str) -> str:
+    return re.sub(r'^https?://(?:dx[.])?doi[.]org/', '', (doi or "").strip().lower())
+
+
+def normalise_title(title: str) -> str:
+    return NON_ALNUM.sub(" ", (title or "").casefold()).strip()
+
+
+def normalise_surname(name: str) -> str:
+    """Surname of 'Last, First' or 'First Last', lower-cased letters only."""
+    surname = name.split(",")[0] if "," in name else (name.split() or [""])[-1]
+    return NON_ALNUM.sub("", surname.casefold())
+
+
+def cache_key(entry: Dict) -> Optional[str]:
+    """'doi:<doi>' or 'title:<title>|<first author surname>' for a BibTeX entry."""
+    doi = normalise_doi(entry.get("doi"))
+    if doi:
+        return f"doi:{doi}"
+    title = normalise_title(entry.get("title"))
+    if not title:
+        return None
+    return f"title:{title}|{normalise_surname((entry.get('author') or '').split(' and ')[0])}"
+
+
+class ScopusCache:
+    def __init__(self, db_path: str = SCOPUS_CACHE_PATH, ttl_days: float = SCOPUS_CACHE_TTL_DAYS):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.pending = 0
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stored": 0}
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict]]:
+        """(True, data) for a fresh cached response (data may be None for "not in Scopus"), else (False, None)."""
+        row = self.conn.execute("SELECT fetched_at, payload FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return False, None
+        if time.time() - row[0] > self.ttl_seconds:
+            self.stats["expired"] += 1
+            return False, None
+        self.stats["hits"] += 1
+        return True, json.loads(zlib.decompress(row[1])) if row[1] is not None else None
+
+    def put(self, key: str, data: Optional[Dict]) -> None:
+        payload = zlib.compress(json.dumps(data, separators=(",", ":")).encode(), 6) if data is not None else None
+        self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, time.time(), payload))
+        self.stats["stored"] += 1
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.conn.commit()
+            self.pending = 0
+
+    def summary(self) -> str:
+        return (f"{self.stats['hits']} hits, {self.stats['misses']} misses, {self.stats['expired']} expired, "
+                f"{self.stats['stored']} stored")
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,390 @@
+"""Async Scopus client: pooled connections, token-bucket rate limiting, bounded concurrency and retries.
+
+    results = asyncio.run(lookup_entries(bib_database.entries, SCOPUS_API_KEY))
+
+Requests are spaced by a token bucket at SCOPUS_RATE per second (the
+per-second throttle of the Scopus APIs). The X-RateLimit-Remaining and
+X-RateLimit-Reset headers pause all workers when the quota is used up.
+429 answers halve the rate; each successful request then raises it by 5%
+until it is back at SCOPUS_RATE. Point SCOPUS_API_BASE at
+bibtex_processing/mock_scopus_server.py to try it without a key.
+"""
+import asyncio
+import contextlib
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from bibtex_processing.scopus_cache import SCOPUS_CACHE_PATH, ScopusCache, cache_key, normalise_doi
+from bibtex_processing.snapshot_index import BIB_SNAPSHOT_PATH, SnapshotIndex
+
+SCOPUS_API_BASE = os.getenv("SCOPUS_API_BASE", "https://api.elsevier.com")
+SCOPUS_RATE = float(os.getenv("SCOPUS_RATE", "9"))  # requests per second
+SCOPUS_CONCURRENCY = int(os.getenv("SCOPUS_CONCURRENCY", "8"))
+SCOPUS_MAX_RETRIES = 4
+RATE_RECOVERY = 1.05  # factor by which each successful request raises the rate again after a 429
+# DOIs per Scopus Search query in batched mode; the COMPLETE view returns at most 25 results per page
+SCOPUS_DOI_BATCH = 25
+# Search-view fields a record needs to be used instead of an abstract retrieval
+SEARCH_REQUIRED_FIELDS = ("dc:title", "dc:description", "prism:coverDate")
+# Abstract-retrieval fields enrich_entry uses that the search view never has
+ABSTRACT_ONLY_FIELDS = ("dc:publisher", "openaccess", "subject-areas", "idxterms")
+# Search-view records are cached apart from full abstract retrievals, under "search:<cache key>"
+SEARCH_KEY_PREFIX = "search:"
+SCOPUS_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class ScopusError(Exception):
+    """Scopus rejected the request for a reason retrying will not fix (e.g. an invalid API key)."""
+
+
+class ScopusUnavailable(Exception):
+    """A request still failed after all retries; the result is unknown and must not be cached."""
+
+
+def search_to_abstract(record: Dict) -> Dict:
+    """Reshape a Scopus Search (COMPLETE view) record like an abstract-retrieval response.
+
+    The search view has no publisher, subject areas, index terms or licence
+    (ABSTRACT_ONLY_FIELDS), so those stay empty.
+    """
+    coredata = {key: value for key, value in record.items() if key.startswith(("dc:", "prism:"))}
+    coredata.update({
+        "eid": record.get("eid", ""),
+        "citedby-count": record.get("citedby-count", ""),
+        "openaccessFlag": "1" if record.get("openaccessFlag") in (True, "true", "1") else "0",
+    })
+    authors = [{"ce:indexed-name": author.get("authname", ""), "afid": author.get("afid", "")}
+               for author in record.get("author", [])]
+    keywords = [{"$": keyword.strip()} for keyword in (record.get("authkeywords") or "").split("|") if keyword.strip()]
+    response = {"coredata": coredata, "authors": {"author": authors}, "authkeywords": {"author-keyword": keywords}}
+    if record.get("fund-sponsor"):
+        response["item"] = {"xocs:funding-list": {"xocs:funding": [{"xocs:funding-agency": record["fund-sponsor"]}]}}
+    return {"abstracts-retrieval-response": response}
+
+
+def missing_fields(data: Dict, fields) -> List[str]:
+    """The `fields` (coredata keys or top-level parts) an abstract-retrieval-shaped response lacks."""
+    response = data.get("abstracts-retrieval-response", {})
+    coredata = response.get("coredata", {})
+    return [field for field in fields if not (coredata.get(field) or response.get(field))]
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every worker for `seconds`."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def throttled(self) -> None:
+        self.rate = max(1.0, self.rate / 2)
+
+    def succeeded(self) -> None:
+        # Back to the configured rate within a few dozen requests after a 429 (x2 in about 14)
+        self.rate = min(self.max_rate, self.rate * RATE_RECOVERY)
+
+
+class ScopusClient:
+    def __init__(self, api_key: str, base_url: str = SCOPUS_API_BASE, rate: float = SCOPUS_RATE,
+                 concurrency: int = SCOPUS_CONCURRENCY, max_retries: int = SCOPUS_MAX_RETRIES,
+                 cache: Optional[ScopusCache] = None, snapshot: Optional[SnapshotIndex] = None):
+        self.api_key = api_key
+        self.cache = cache
+        self.snapshot = snapshot
+        self.base_url = base_url
+        self.bucket = TokenBucket(rate)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.stats = {"entries": 0, "requests": 0, "retries": 0, "throttled": 0, "not_found": 0, "unavailable": 0,
+                      "fallbacks": 0, "failed_searches": 0}
+        self.http = None
+
+    async def __aenter__(self) -> "ScopusClient":
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url, timeout=SCOPUS_TIMEOUT,
+            headers={"Accept": "application/json", "X-ELS-APIKey": self.api_key or ""},
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency))
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.http.aclose()
+
+    def _observe_quota(self, headers: httpx.Headers) -> None:
+        remaining, reset = headers.get("X-RateLimit-Remaining"), headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None and remaining.isdigit() and int(remaining) == 0:
+            self.bucket.pause(max(0.0, float(reset) - time.time()))
+
+    def _retry_delay(self, response: Optional[httpx.Response], attempt: int) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.replace(".", "", 1).isdigit():
+                return float(retry_after)
+            reset = response.headers.get("X-RateLimit-Reset")
+            if response.status_code == 429 and reset and reset.isdigit():
+                return max(0.0, float(reset) - time.time())
+        return min(30.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+    async def get_json(self, path: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """GET a Scopus resource; None if it does not exist, ScopusUnavailable if retries are exhausted."""
+        if not self.api_key:
+            raise ScopusUnavailable("no Scopus API key (offline: snapshot and cache only)")
+        async with self.semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.bucket.acquire()
+                self.stats["requests"] += 1
+                try:
+                    response = await self.http.get(path, params=params)
+                except httpx.TransportError:
+                    response = None
+                else:
+                    self._observe_quota(response.headers)
+                    if response.status_code == 200:
+                        self.bucket.succeeded()
+                        return response.json()
+                    if response.status_code == 404:
+                        self.stats["not_found"] += 1
+                        return None
+                    if response.status_code in (401, 403):
+                        raise ScopusError(f"Scopus refused the request ({response.status_code}): {response.text[:200]}")
+                    if response.status_code not in RETRY_STATUS:
+                        return None
+                    if response.status_code == 429:
+                        self.stats["throttled"] += 1
+                        self.bucket.throttled()
+                if attempt == self.max_retries:
+                    raise ScopusUnavailable(f"{path}: {response.status_code if response is not None else 'no response'}")
+                self.stats["retries"] += 1
+                delay = self._retry_delay(response, attempt)
+                if response is not None and response.status_code == 429:
+                    self.bucket.pause(delay)
+                await asyncio.sleep(delay)
+        raise ScopusUnavailable(path)
+
+    async def abstract_by_doi(self, doi: str) -> Optional[Dict]:
+        return await self.get_json(f"/content/abstract/doi/{quote(doi.strip(), safe='/()')}")
+
+    async def abstract_by_scopus_id(self, scopus_id: str) -> Optional[Dict]:
+        return await self.get_json(f"/content/abstract/scopus_id/{quote(scopus_id, safe='')}")
+
+    async def search(self, query: str, **params) -> Optional[Dict]:
+        return await self.get_json("/content/search/scopus", {"query": query, **params})
+
+    async def search_dois(self, dois: List[str]) -> Optional[Tuple[Dict[str, Dict], bool]]:
+        """Search-view records for `dois` from one Scopus Search query, by normalised DOI.
+
+        The flag is True if the query matched more records than were returned.
+        None if Scopus rejected the query (e.g. a malformed DOI), which says
+        nothing about whether the DOIs exist.
+        """
+        query = " OR ".join(f'DOI("{doi.strip()}")' for doi in dois)
+        answer = await self.search(query, view="COMPLETE", count=min(len(dois), SCOPUS_DOI_BATCH))
+        if answer is None:
+            return None
+        results = answer.get("search-results", {})
+        hits = [hit for hit in results.get("entry", []) if "error" not in hit]
+        records = {normalise_doi(hit["prism:doi"]): hit for hit in hits if hit.get("prism:doi")}
+        total = results.get("opensearch:totalResults", "0")
+        return records, int(total) > len(hits) if str(total).isdigit() else False
+
+    def _cached(self, entry: Dict) -> Tuple[Optional[str], bool, Optional[Dict]]:
+        """(cache key, found locally, data): the offline snapshot first, then the response cache."""
+        self.stats["entries"] += 1
+        if self.snapshot:
+            data = self.snapshot.lookup(entry)
+            if data is not None:
+                return None, True, data
+        key = cache_key(entry) if self.cache else None
+        if key:
+            hit, data = self.cache.get(key)
+            return key, hit, data
+        return key, False, None
+
+    async def _fetch(self, key: Optional[str], request) -> Optional[Dict]:
+        """Await `request` and cache its result under `key`; None, uncached, if Scopus stayed unavailable."""
+        try:
+            data = await request
+        except ScopusUnavailable:
+            self.stats["unavailable"] += 1
+            return None
+        if key:
+            self.cache.put(key, data)
+        return data
+
+    async def lookup_entry(self, entry: Dict) -> Optional[Dict]:
+        """Abstract-retrieval response for a BibTeX entry, from the cache if fresh, else from Scopus."""
+        key, hit, data = self._cached(entry)
+        return data if hit else await self._fetch(key, self._lookup(entry))
+
+    async def _lookup_doi_batch(self, batch: List[Tuple[Optional[str], Dict]],
+                                required_fields) -> List[Optional[Dict]]:
+        try:
+            searched = await self.search_dois([entry["doi"] for _, entry in batch])
+        except ScopusUnavailable:
+            self.stats["unavailable"] += 1
+            searched = None
+        if searched is None:
+            # No answer to go by: retrieve every DOI of the batch on its own and cache no negatives
+            self.stats["failed_searches"] += 1
+            records, truncated = {}, True
+        else:
+            records, truncated = searched
+
+        async def resolve(key, entry):
+            record = records.get(normalise_doi(entry["doi"]))
+            if record:
+                data = search_to_abstract(record)
+                if key:
+                    self.cache.put(SEARCH_KEY_PREFIX + key, data)
+                if not missing_fields(data, required_fields):
+                    return data
+            if record or truncated:
+                # Search record lacks required fields, or the results were cut off: retrieve this DOI on its own
+                self.stats["fallbacks"] += 1
+                return await self._fetch(key, self.abstract_by_doi(entry["doi"]))
+            self.stats["not_found"] += 1
+            if key:
+                self.cache.put(key, None)
+            return None
+
+        return await asyncio.gather(*(resolve(key, entry) for key, entry in batch))
+
+    async def lookup_many(self, entries: List[Dict], doi_batch_size: int = 0,
+                          required_fields=SEARCH_REQUIRED_FIELDS + ABSTRACT_ONLY_FIELDS) -> List[Optional[Dict]]:
+        """lookup_entry for each entry, in input order.
+
+        With `doi_batch_size` > 1, uncached DOIs are looked up that many (at
+        most SCOPUS_DOI_BATCH) at a time with one Scopus Search query
+        (`DOI(a) OR DOI(b) ...`); if Scopus rejects a query, its DOIs are
+        retrieved one by one. A search
+        record lacking any of `required_fields` falls back to abstract
+        retrieval; by default that includes ABSTRACT_ONLY_FIELDS, so results
+        are as complete as without batching. Search records are cached under
+        their own keys and never served as abstract retrievals.
+        """
+        if doi_batch_size <= 1:
+            return list(await asyncio.gather(*(self.lookup_entry(entry) for entry in entries)))
+        doi_batch_size = min(doi_batch_size, SCOPUS_DOI_BATCH)
+        results: List[Optional[Dict]] = [None] * len(entries)
+        by_doi, others = [], []
+        for i, entry in enumerate(entries):
+            key, hit, data = self._cached(entry)
+            if hit:
+                results[i] = data
+            elif not entry.get("doi"):
+                others.append((i, key, entry))
+            elif key and (partial := self.cache.get(SEARCH_KEY_PREFIX + key))[0]:
+                # Searched before: use the record if it has all required fields, else only retrieve
+                if partial[1] is not None and not missing_fields(partial[1], required_fields):
+                    results[i] = partial[1]
+                else:
+                    self.stats["fallbacks"] += 1
+                    others.append((i, key, entry))
+            else:
+                by_doi.append((i, key, entry))
+
+        async def doi_batch(batch):
+            lookups = await self._lookup_doi_batch([(key, entry) for _, key, entry in batch], required_fields)
+            for (i, _, _), data in zip(batch, lookups):
+                results[i] = data
+
+        async def single(i, key, entry):
+            results[i] = await self._fetch(key, self._lookup(entry))
+
+        await asyncio.gather(*(doi_batch(by_doi[start:start + doi_batch_size])
+                               for start in range(0, len(by_doi), doi_batch_size)),
+                             *(single(*item) for item in others))
+        return results
+
+    async def _lookup(self, entry: Dict) -> Optional[Dict]:
+        """By DOI, else by title (and authors) search."""
+        doi = entry.get("doi")
+        if doi:
+            return await self.abstract_by_doi(doi)
+        title = entry.get("title", "")
+        if not title:
+            return None
+        query = f'TITLE("{title}")'
+        if entry.get("author"):
+            query += f' AND AUTH("{entry["author"]}")'
+        results = await self.search(query)
+        hits = (results or {}).get("search-results", {}).get("entry", [])
+        if not hits or "error" in hits[0]:
+            return None
+        # The search only returns a summary; fetch the full record of the best hit
+        scopus_id = hits[0].get("dc:identifier", "").replace("SCOPUS_ID:", "")
+        return await self.abstract_by_scopus_id(scopus_id) if scopus_id else None
+
+
+@contextlib.asynccontextmanager
+async def scopus_session(api_key: str, cache_path: Optional[str] = SCOPUS_CACHE_PATH,
+                         snapshot_path: Optional[str] = BIB_SNAPSHOT_PATH, **client_options):
+    """A ScopusClient with the response cache in `cache_path` and the offline snapshot in `snapshot_path`.
+
+    Either can be None to go without; the snapshot is also skipped if it has
+    not been imported. Prints statistics at the end.
+    """
+    cache = ScopusCache(cache_path) if cache_path else None
+    snapshot = SnapshotIndex(snapshot_path) if snapshot_path and os.path.exists(snapshot_path) else None
+    try:
+        async with ScopusClient(api_key, cache=cache, snapshot=snapshot, **client_options) as client:
+            start = time.perf_counter()
+            yield client
+            seconds = time.perf_counter() - start
+            print(f"🔎 Scopus: {client.stats['entries']} entries, {client.stats['requests']} requests in {seconds:.1f}s "
+                  f"({client.stats['requests'] / seconds if seconds else 0:.1f}/s), {client.stats['retries']} retries, "
+                  f"{client.stats['throttled']} throttled, {client.stats['unavailable']} unavailable, "
+                  f"{client.stats['fallbacks']} search fallbacks, {client.stats['failed_searches']} failed searches")
+            if snapshot:
+                print(f"📀 Offline snapshot: {snapshot.hits} hits")
+            if cache:
+                print(f"💾 Scopus cache: {cache.summary()}")
+    finally:
+        if cache:
+            cache.close()
+        if snapshot:
+            snapshot.close()
+
+
+async def lookup_entries(entries: List[Dict], api_key: str, cache_path: Optional[str] = SCOPUS_CACHE_PATH,
+                         doi_batch_size: int = 0, snapshot_path: Optional[str] = BIB_SNAPSHOT_PATH,
+                         required_fields=SEARCH_REQUIRED_FIELDS + ABSTRACT_ONLY_FIELDS,
+                         **client_options) -> List[Optional[Dict]]:
+    """Scopus data for each entry (None where nothing was found), in input order.
+
+    Entries in the offline snapshot are taken from it; responses are cached
+    in `cache_path`. Pass None for either to always query Scopus. See
+    ScopusClient.lookup_many for `doi_batch_size` and `required_fields`.
+    """
+    async with scopus_session(api_key, cache_path, snapshot_path, **client_options) as client:
+        return await client.lookup_many(entries, doi_batch_size, required_fields)
@@ -0,0 +1,231 @@
+"""Offline bibliographic snapshot as a local enrichment source.
+
+Import an OpenAlex works or Crossref JSONL snapshot (one work per line,
+optionally gzipped) once:
+
+    python bibtex_processing/snapshot_index.py import works-part-*.jsonl.gz
+    python bibtex_processing/snapshot_index.py lookup 10.1016/j.still.2019.104344
+
+Each work is reshaped like a Scopus abstract-retrieval response, so
+enrich_entry handles it unchanged, and stored zlib-compressed in SQLite
+keyed by DOI, with an index on the normalised title. Entries without a
+DOI match by title only if their first author or year agrees. scopus_client
+consults the snapshot before its cache and the API, so entries it covers
+need no network access.
+"""
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import zlib
+from typing import Dict, Iterator, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bibtex_processing.scopus_cache import PROJECT_DIR, normalise_doi, normalise_surname, normalise_title
+
+BIB_SNAPSHOT_PATH = os.getenv("BIB_SNAPSHOT_PATH", os.path.join(PROJECT_DIR, "output", "bibliographic_snapshot.sqlite"))
+INSERT_BATCH = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS works (
+    doi       TEXT PRIMARY KEY,
+    title_key TEXT NOT NULL,
+    surname   TEXT NOT NULL,  -- first author
+    year      INTEGER,
+    payload   BLOB NOT NULL   -- zlib-compressed abstract-retrieval-shaped JSON
+) WITHOUT ROWID
+"""
+TITLE_INDEX = "CREATE INDEX IF NOT EXISTS works_title ON works (title_key)"
+JATS_TAG = re.compile(r"<[^>]+>")
+
+
+def _abstract_from_inverted_index(inverted_index: Optional[Dict]) -> str:
+    if not inverted_index:
+        return ""
+    positions = sorted((position, word) for word, indices in inverted_index.items() for position in indices)
+    return " ".join(word for _, word in positions)
+
+
+def _affiliations(names) -> list:
+    return [{"$": name} for name in names if name]
+
+
+def _response(coredata: Dict, authors: list, keywords: list, terms: list, subjects: list, funders: list) -> Dict:
+    return {"abstracts-retrieval-response": {
+        "coredata": {key: value for key, value in coredata.items() if value not in (None, "")},
+        "authors": {"author": authors},
+        "authkeywords": {"author-keyword": [{"$": keyword} for keyword in keywords]},
+        "idxterms": {"mainterm": [{"$": term} for term in terms]},
+        "subject-areas": {"subject-area": [{"$": subject} for subject in subjects]},
+        "item": {"xocs:funding-list": {"xocs:funding": [{"xocs:funding-agency": funder} for funder in funders]}},
+    }}
+
+
+def from_openalex(work: Dict) -> Dict:
+    location = work.get("primary_location") or {}
+    source = location.get("source") or {}
+    biblio = work.get("biblio") or {}
+    pages = "-".join(page for page in (biblio.get("first_page"), biblio.get("last_page")) if page)
+    coredata = {
+        "dc:title": work.get("title") or work.get("display_name"),
+        "dc:description": _abstract_from_inverted_index(work.get("abstract_inverted_index")),
+        "prism:doi": normalise_doi(work.get("doi")),
+        "prism:publicationName": source.get("display_name"),
+        "prism:issn": (source.get("issn_l") or "").replace("-", ""),
+        "prism:volume": biblio.get("volume"),
+        "prism:issueIdentifier": biblio.get("issue"),
+        "prism:pageRange": pages,
+        "prism:coverDate": work.get("publication_date") or str(work.get("publication_year") or ""),
+        "dc:publisher": source.get("host_organization_name"),
+        "citedby-count": str(work.get("cited_by_count", "")),
+        "openaccessFlag": "1" if (work.get("open_access") or {}).get("is_oa") else "0",
+        "openaccess": location.get("license"),
+        "dc:identifier": work.get("id"),
+    }
+    authors = [{"ce:indexed-name": (authorship.get("author") or {}).get("display_name", ""),
+                "afid": _affiliations(institution.get("display_name") for institution in authorship.get("institutions") or [])}
+               for authorship in work.get("authorships") or []]
+    keywords = [keyword.get("display_name", "") for keyword in work.get("keywords") or []]
+    topics = work.get("topics") or work.get("concepts") or []
+    terms = [topic.get("display_name", "") for topic in topics]
+    subjects = sorted({(topic.get("field") or {}).get("display_name", "") for topic in topics} - {""})
+    funders = [grant.get("funder_display_name", "") for grant in work.get("grants") or []]
+    return _response(coredata, authors, keywords, terms, subjects, funders)
+
+
+def from_crossref(work: Dict) -> Dict:
+    work = work.get("message", work)
+    issued = ((work.get("issued") or work.get("published") or {}).get("date-parts") or [[None]])[0]
+    cover_date = "-".join(f"{part:02d}" if i else str(part) for i, part in enumerate(issued) if part)
+    licenses = work.get("license") or []
+    coredata = {
+        "dc:title": (work.get("title") or [""])[0],
+        "dc:description": " ".join(JATS_TAG.sub(" ", work.get("abstract") or "").split()),
+        "prism:doi": normalise_doi(work.get("DOI")),
+        "prism:publicationName": (work.get("container-title") or [""])[0],
+        "prism:issn": (work.get("ISSN") or [""])[0].replace("-", ""),
+        "prism:volume": work.get("volume"),
+        "prism:issueIdentifier": work.get("issue"),
+        "prism:pageRange": work.get("page"),
+        "prism:coverDate": cover_date,
+        "dc:publisher": work.get("publisher"),
+        "citedby-count": str(work.get("is-referenced-by-count", "")),
+        "openaccessFlag": "1" if any("creativecommons.org" in (lic.get("URL") or "") for lic in licenses) else "0",
+        "openaccess": licenses[0].get("URL") if licenses else None,
+    }
+    authors = [{"ce:indexed-name": " ".join(part for part in (author.get("family"), author.get("given")) if part),
+                "afid": _affiliations(affiliation.get("name") for affiliation in author.get("affiliation") or [])}
+               for author in work.get("author") or []]
+    funders = [funder.get("name", "") for funder in work.get("funder") or []]
+    return _response(coredata, authors, [], [], work.get("subject") or [], funders)
+
+
+def to_row(work: Dict) -> Optional[Tuple]:
+    """(doi, title_key, surname, year, payload) for an OpenAlex or Crossref work; None without a DOI."""
+    if "authorships" in work or "display_name" in work:
+        data = from_openalex(work)
+        first_author = ((work.get("authorships") or [{}])[0].get("author") or {}).get("display_name", "")
+    else:
+        data = from_crossref(work)
+        # Indexed names are "Family Given"; the family name is given separately
+        first_author = ((work.get("message", work).get("author") or [{}])[0]).get("family", "")
+    coredata = data["abstracts-retrieval-response"]["coredata"]
+    if not coredata.get("prism:doi"):
+        return None
+    year = coredata.get("prism:coverDate", "")[:4]
+    return (coredata["prism:doi"], normalise_title(coredata.get("dc:title")), normalise_surname(first_author or ""),
+            int(year) if year.isdigit() else None,
+            zlib.compress(json.dumps(data, separators=(",", ":")).encode(), 6))
+
+
+def iter_rows(snapshot_path: str) -> Iterator[Tuple]:
+    opener = gzip.open if snapshot_path.endswith(".gz") else open
+    with opener(snapshot_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = to_row(json.loads(line))
+                if row:
+                    yield row
+
+
+def import_snapshot(snapshot_path: str, db_path: str = BIB_SNAPSHOT_PATH) -> int:
+    """Add (or replace) the works of a JSONL snapshot in the index; return the number imported."""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(SCHEMA)
+        count = 0
+        rows = iter_rows(snapshot_path)
+        while True:
+            batch = [row for _, row in zip(range(INSERT_BATCH), rows)]
+            if not batch:
+                break
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO works VALUES (?, ?, ?, ?, ?)", batch)
+            count += len(batch)
+        # Built after the bulk insert, which is faster than maintaining it row by row
+        conn.execute(TITLE_INDEX)
+    finally:
+        conn.close()
+    return count
+
+
+class SnapshotIndex:
+    """Read-only lookups of BibTeX entries in the snapshot, by DOI or by title."""
+
+    def __init__(self, db_path: str = BIB_SNAPSHOT_PATH):
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        self.hits = 0
+
+    def lookup(self, entry: Dict) -> Optional[Dict]:
+        doi = normalise_doi(entry.get("doi"))
+        if doi:
+            row = self.conn.execute("SELECT payload FROM works WHERE doi = ?", (doi,)).fetchone()
+        else:
+            row = self._by_title(entry)
+        if row is None:
+            return None
+        self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def _by_title(self, entry: Dict) -> Optional[Tuple]:
+        title = normalise_title(entry.get("title"))
+        if not title:
+            return None
+        rows = self.conn.execute("SELECT surname, year, payload FROM works WHERE title_key = ?", (title,)).fetchall()
+        if not rows:
+            return None
+        # Short or generic titles ("Editorial") are shared by many works: the first author or the year must agree
+        surname = normalise_surname((entry.get("author") or "").split(" and ")[0])
+        year = (entry.get("year") or "").strip()[:4]
+        matches = [(bool(surname) and row[0] == surname, bool(year) and str(row[1]) == year, row[2]) for row in rows]
+        matches = [match for match in matches if match[0] or match[1]]
+        if not matches:
+            return None
+        return (max(matches, key=lambda match: match[:2])[2],)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "import":
+        for snapshot_path in sys.argv[2:]:
+            start = time.perf_counter()
+            count = import_snapshot(snapshot_path)
+            print(f"📚 {count} works from {snapshot_path} indexed in {BIB_SNAPSHOT_PATH} "
+                  f"({time.perf_counter() - start:.1f}s)")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "lookup":
+        index = SnapshotIndex()
+        for doi in sys.argv[2:]:
+            start = time.perf_counter()
+            data = index.lookup({"doi": doi})
+            title = data["abstracts-retrieval-response"]["coredata"].get("dc:title") if data else "—"
+            print(f"{doi}: {title} ({(time.perf_counter() - start) * 1e6:.0f} µs)")
+    else:
+        print("Usage: python bibtex_processing/snapshot_index.py import SNAPSHOT.jsonl[.gz] ... | lookup DOI ...")
@@ -0,0 +1,209 @@
+"""Out-of-core term statistics and co-occurrence for large abstract or full-text corpora.
+
+    python bibtex_processing/term_statistics.py --texts "output/*/*.txt"
+    python bibtex_processing/term_statistics.py --bib big_export.bib --workers 8
+
+Unlike keyword_network, which fits a vocabulary over all abstracts at once,
+documents are streamed in chunks to a process pool and turned into hashed
+unigram/bigram features, so no vocabulary or corpus is held in memory:
+
+1. each chunk returns its document frequencies, which are summed;
+2. the TOP_FEATURES most frequent features are kept, and each chunk
+   returns its sparse co-occurrence matrix over them plus the terms that
+   hashed to them, which are merged.
+
+Terms that hash to the same column are counted together, which inflates a
+few counts slightly on very large vocabularies. Only a bounded number of
+chunks is in flight at any time. Long texts share millions of term pairs,
+so PMI, Jaccard and the nested n-gram check are computed only for the
+strongest pairs, block by block, until TOP_EDGES edges pass. The top terms
+and those edges (count, PMI, Jaccard) are printed and optionally written
+as CSV.
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.utils import murmurhash3_32
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bibtex_processing.bibliometric_analysis import (MIN_COOCCURRENCE, association_edges, cooccurrence_matrix,
+                                                      nested_ngram_pairs, preprocess)
+from bibtex_processing.bibtex_stream import iter_bibtex_entries
+
+N_FEATURES = 2 ** 20
+TOP_FEATURES = 5000
+MIN_DF = 2
+CHUNK_SIZE = 500
+TOP_EDGES = 10000
+EDGE_BLOCK = 65536
+
+HASHER = HashingVectorizer(n_features=N_FEATURES, ngram_range=(1, 2), stop_words='english', preprocessor=preprocess,
+                           alternate_sign=False, norm=None)
+
+
+def feature_index(term: str) -> int:
+    """Column HASHER puts `term` in."""
+    return abs(murmurhash3_32(term, positive=False)) % N_FEATURES
+
+
+def iter_bibtex_abstracts(bibtex_path: str) -> Iterator[str]:
+    return (entry['abstract'] for entry in iter_bibtex_entries(bibtex_path) if entry.get('abstract'))
+
+
+def iter_text_files(pattern: str) -> Iterator[str]:
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with open(path, 'r', encoding='utf-8', errors='replace') as text_file:
+            yield text_file.read()
+
+
+def _binary(texts: List[str]) -> sparse.csr_matrix:
+    X = HASHER.transform(texts)
+    X.data[:] = 1
+    return X
+
+
+def chunk_document_frequencies(texts: List[str]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """(feature indices, document frequencies, documents) of one chunk."""
+    indices, counts = np.unique(_binary(texts).indices, return_counts=True)
+    return indices, counts, len(texts)
+
+
+def chunk_cooccurrence(texts: List[str], selected: np.ndarray) -> Tuple[sparse.csr_matrix, Dict[int, Counter]]:
+    """Co-occurrence over the `selected` features, and the terms seen per selected feature."""
+    C = cooccurrence_matrix(_binary(texts)[:, selected]).tocsr()
+    position = {int(feature): i for i, feature in enumerate(selected)}
+    analyzer = HASHER.build_analyzer()
+    names: Dict[int, Counter] = defaultdict(Counter)
+    for text in texts:
+        for term in set(analyzer(text)):
+            i = position.get(feature_index(term))
+            if i is not None:
+                names[i][term] += 1
+    return C, dict(names)
+
+
+def _map_chunks(pool: ProcessPoolExecutor, func, texts: Iterable[str], chunk_size: int, in_flight: int, *args):
+    """Results of func(chunk, *args) for successive chunks, keeping at most `in_flight` chunks submitted."""
+    texts = iter(texts)
+    pending = []
+    while True:
+        while len(pending) < in_flight and (chunk := list(islice(texts, chunk_size))):
+            pending.append(pool.submit(func, chunk, *args))
+        if not pending:
+            return
+        yield pending.pop(0).result()
+
+
+def strongest_edges(terms: np.ndarray, frequencies: np.ndarray, n_documents: int, C: sparse.coo_matrix,
+                    min_count: int, min_pmi: Optional[float], min_jaccard: Optional[float],
+                    top_edges: Optional[int]) -> List[Tuple[str, str, int, float, float]]:
+    """Up to `top_edges` (None for all) edges of C passing the thresholds, by count, ties in matrix order."""
+    keep = C.data >= min_count
+    rows, cols, counts = C.row[keep], C.col[keep], C.data[keep]
+    order = np.argsort(-counts, kind='stable')
+    block = len(order) if top_edges is None else max(2 * top_edges, EDGE_BLOCK)
+    edges = []
+    for start in range(0, len(order), block):
+        pairs = order[start:start + block]
+        candidates = sparse.coo_matrix((counts[pairs], (rows[pairs], cols[pairs])), shape=C.shape)
+        # coo_matrix keeps the given order, so passing pairs stay sorted by count
+        r, c, w, p, j = association_edges(candidates, frequencies, n_documents, min_count, min_pmi, min_jaccard)
+        distinct = ~nested_ngram_pairs(terms, r, c)
+        edges.extend((terms[a], terms[b], int(count), float(pmi), float(jaccard)) for a, b, count, pmi, jaccard in
+                     zip(r[distinct], c[distinct], w[distinct], p[distinct], j[distinct]))
+        if top_edges is not None and len(edges) >= top_edges:
+            return edges[:top_edges]
+    return edges
+
+
+def term_statistics(texts: Callable[[], Iterable[str]], workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+                    top_features: int = TOP_FEATURES, min_df: int = MIN_DF, min_count: int = MIN_COOCCURRENCE,
+                    min_pmi: Optional[float] = None, min_jaccard: Optional[float] = None,
+                    top_edges: Optional[int] = TOP_EDGES):
+    """Document frequencies of the top terms and the co-occurrence edges between them.
+
+    `texts` returns a fresh iterator over the corpus; it is read twice.
+    Returns (terms, document frequencies, number of documents, edges) where
+    edges are the `top_edges` (None for all) strongest (term, term, count,
+    pmi, jaccard), sorted by count.
+    """
+    workers = workers or os.cpu_count() or 1
+    in_flight = 2 * workers
+    document_frequency = np.zeros(N_FEATURES, dtype=np.int64)
+    n_documents = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for indices, counts, documents in _map_chunks(pool, chunk_document_frequencies, texts(), chunk_size,
+                                                      in_flight):
+            document_frequency[indices] += counts
+            n_documents += documents
+
+        candidates = np.flatnonzero(document_frequency >= min_df)
+        selected = np.sort(candidates[np.argsort(-document_frequency[candidates], kind='stable')[:top_features]])
+
+        C = sparse.csr_matrix((len(selected), len(selected)), dtype=np.int32)
+        names: Dict[int, Counter] = defaultdict(Counter)
+        for chunk_C, chunk_names in _map_chunks(pool, chunk_cooccurrence, texts(), chunk_size, in_flight, selected):
+            C = C + chunk_C
+            for i, counter in chunk_names.items():
+                names[i].update(counter)
+
+    # A hashed column may hold several terms; it is named after the most frequent one
+    terms = np.array([names[i].most_common(1)[0][0] if names[i] else f'#{feature}'
+                      for i, feature in enumerate(selected)], dtype=object)
+    frequencies = document_frequency[selected].astype(np.float64)
+    edges = strongest_edges(terms, frequencies, n_documents, C.tocoo(), min_count, min_pmi, min_jaccard, top_edges)
+    return terms, frequencies, n_documents, edges
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming term statistics and keyword co-occurrence.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--bib", help="BibTeX file whose abstracts are analysed")
+    source.add_argument("--texts", help='Glob of text files, e.g. "output/*/*.txt"')
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--top-features", type=int, default=TOP_FEATURES,
+                        help="Most frequent terms whose co-occurrence is counted")
+    parser.add_argument("--min-pmi", type=float, default=None)
+    parser.add_argument("--min-jaccard", type=float, default=None)
+    parser.add_argument("--top-edges", type=int, default=TOP_EDGES,
+                        help="Strongest edges to keep and write; 0 keeps all")
+    parser.add_argument("--top", type=int, default=25, help="Terms and edges to print")
+    parser.add_argument("--out-dir", help="Write terms.csv and edges.csv here")
+    args = parser.parse_args()
+
+    def texts():
+        return iter_bibtex_abstracts(args.bib) if args.bib else iter_text_files(args.texts)
+
+    start = time.perf_counter()
+    terms, frequencies, n_documents, edges = term_statistics(
+        texts, args.workers, args.chunk_size, args.top_features, min_pmi=args.min_pmi, min_jaccard=args.min_jaccard,
+        top_edges=args.top_edges or None)
+    print(f"📊 {n_documents} documents, {len(terms)} terms, {len(edges)} edges "
+          f"({time.perf_counter() - start:.1f}s)")
+    by_frequency = np.argsort(-frequencies, kind='stable')
+    print("Top terms:", ", ".join(f"{terms[i]} ({int(frequencies[i])})" for i in by_frequency[:args.top]))
+    for term1, term2, count, pmi, jaccard in edges[:args.top]:
+        print(f"  {term1} — {term2}: {count} documents, PMI {pmi:.2f}, Jaccard {jaccard:.2f}")
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        with open(os.path.join(args.out_dir, "terms.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["term", "document_frequency"])
+            writer.writerows((terms[i], int(frequencies[i])) for i in by_frequency)
+        with open(os.path.join(args.out_dir, "edges.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["source", "target", "count", "pmi", "jaccard"])
+            writer.writerows(edges)
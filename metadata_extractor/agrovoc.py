@@ -0,0 +1,164 @@
+"""Offline AGROVOC label index for resolving CropSpecies URIs after extraction.
+
+Build it once from an AGROVOC N-Triples dump (e.g. agrovoc_core.nt.gz from
+https://www.fao.org/agrovoc/releases):
+
+    python -m metadata_extractor.agrovoc build agrovoc_core.nt.gz
+    python -m metadata_extractor.agrovoc lookup "winter wheat"
+
+skos:prefLabel and skos:altLabel literals in AGROVOC_LANGUAGES are stored in
+SQLite keyed by their normalised form; lookups are memoised in an LRU cache.
+"""
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGROVOC_DB = os.getenv("AGROVOC_DB", os.path.join(PROJECT_DIR, "output", "agrovoc.sqlite"))
+AGROVOC_LANGUAGES = tuple(os.getenv("AGROVOC_LANGUAGES", "en,de").split(","))
+AGROVOC_URI_PREFIX = "http://aims.fao.org/aos/agrovoc/"
+
+SKOS = "http://www.w3.org/2004/02/skos/core#"
+LABEL_PREDICATES = {f"<{SKOS}prefLabel>": 1, f"<{SKOS}altLabel>": 0}
+TRIPLE_LITERAL = re.compile(r'^<([^>]+)>\s+(<[^>]+>)\s+"((?:[^"\\]|\\.)*)"@([A-Za-z\-]+)\s*\.\s*$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    label     TEXT NOT NULL,
+    lang      TEXT NOT NULL,
+    uri       TEXT NOT NULL,
+    preferred INTEGER NOT NULL,
+    PRIMARY KEY (label, lang, uri)
+) WITHOUT ROWID
+"""
+
+
+def normalise_label(label: str) -> str:
+    return " ".join(label.casefold().split())
+
+
+def _unescape(literal: str) -> str:
+    if "\\" not in literal:
+        return literal
+    try:
+        return json.loads(f'"{literal}"')
+    except ValueError:
+        return literal
+
+
+def iter_labels(dump_path: str, languages=AGROVOC_LANGUAGES) -> Iterator[Tuple[str, str, str, int]]:
+    """Yield (normalised label, language, concept URI, preferred) from an N-Triples dump, streaming."""
+    opener = gzip.open if dump_path.endswith(".gz") else open
+    with opener(dump_path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if "skos/core#" not in line or "Label>" not in line:
+                continue
+            match = TRIPLE_LITERAL.match(line)
+            if not match or match.group(2) not in LABEL_PREDICATES:
+                continue
+            uri, predicate, literal, lang = match.groups()
+            lang = lang.lower()
+            if lang in languages and uri.startswith(AGROVOC_URI_PREFIX):
+                yield normalise_label(_unescape(literal)), lang, uri, LABEL_PREDICATES[predicate]
+
+
+def build_index(dump_path: str, db_path: str = AGROVOC_DB, languages=AGROVOC_LANGUAGES) -> int:
+    """(Re)build the SQLite label index from a dump; return the number of labels stored."""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS labels")
+        conn.execute(SCHEMA)
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO labels VALUES (?, ?, ?, ?)", iter_labels(dump_path, languages))
+        count = conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return count
+
+
+class AgrovocIndex:
+    """Label → AGROVOC concept URI lookups against the SQLite index."""
+
+    def __init__(self, db_path: str = AGROVOC_DB, languages=AGROVOC_LANGUAGES, cache_size: int = 65536):
+        # Read-only: the index is shared by threads of the extraction service
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self.languages = languages
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve(self, label: str) -> Optional[str]:
+        """URI of the concept with this label; preferred labels and earlier languages win."""
+        key = normalise_label(label)
+        if not key:
+            return None
+        rows = self.conn.execute("SELECT lang, uri, preferred FROM labels WHERE label = ?", (key,)).fetchall()
+        if not rows and key.endswith("s"):
+            # Plural crop names ("oats", "potatoes") are singular in AGROVOC
+            stem = key[:-2] if key.endswith("oes") else key[:-1]
+            rows = self.conn.execute("SELECT lang, uri, preferred FROM labels WHERE label = ?", (stem,)).fetchall()
+        if not rows:
+            return None
+        rank = {lang: i for i, lang in enumerate(self.languages)}
+        lang, uri, preferred = min(rows, key=lambda row: (-row[2], rank.get(row[0], len(rank)), row[1]))
+        return uri
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+_index = None
+
+
+def get_index() -> Optional[AgrovocIndex]:
+    """Shared index, or None if it has not been built."""
+    global _index
+    if _index is None and os.path.exists(AGROVOC_DB):
+        _index = AgrovocIndex(AGROVOC_DB)
+    return _index
+
+
+def resolve_crop_uris(parsed_json: Dict, index: Optional[AgrovocIndex] = None) -> int:
+    """Fill missing or non-AGROVOC `uri`s of the crop rotation and cover crop levels in place.
+
+    Works on the parsed LLM response before validation; returns the number of URIs set.
+    """
+    index = index or get_index()
+    overview = parsed_json.get("LTE_metadata_OverviewMap") if isinstance(parsed_json, dict) else None
+    if index is None or not isinstance(overview, dict):
+        return 0
+    resolved = 0
+    for level in ("crop_rotation_levels", "cover_crop_levels"):
+        for crop in overview.get(level) or []:
+            concept = crop.get("name") if isinstance(crop, dict) else None
+            if not isinstance(concept, dict) or not concept.get("label"):
+                continue
+            if (concept.get("uri") or "").startswith(AGROVOC_URI_PREFIX):
+                continue
+            uri = index.resolve(concept["label"])
+            if uri:
+                concept["uri"] = uri
+                resolved += 1
+    return resolved
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "build":
+        start = time.perf_counter()
+        db_path = sys.argv[3] if len(sys.argv) > 3 else AGROVOC_DB
+        count = build_index(sys.argv[2], db_path)
+        print(f"📚 {count} AGROVOC labels indexed in {db_path} ({time.perf_counter() - start:.1f}s)")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "lookup":
+        index = AgrovocIndex()
+        for label in sys.argv[2:]:
+            start = time.perf_counter()
+            uri = index.resolve(label)
+            print(f"{label}: {uri or '—'} ({(time.perf_counter() - start) * 1e6:.0f} µs)")
+    else:
+        print("Usage: python -m metadata_extractor.agrovoc build DUMP.nt[.gz] [DB] | lookup LABEL ...")
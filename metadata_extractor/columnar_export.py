@@ -0,0 +1,112 @@
+"""Flatten extraction results into Arrow tables and write them as Parquet.
+
+    python -m metadata_extractor.columnar_export [output_root] [parquet_dir]
+
+One row per paper in papers.parquet, plus child tables keyed by paper_id:
+authors, research_parameters, crop_species (crop rotation and cover crop
+levels) and soil_info. Low-cardinality string columns are dictionary-encoded,
+so pandas reads them as categoricals. Query them with pandas or DuckDB:
+
+    duckdb.sql("SELECT lte_country, count(*) FROM 'output/parquet/papers.parquet' GROUP BY 1")
+"""
+import glob
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pydantic import ValidationError
+
+from .models import MetadataExtractionResponse
+
+TABLES = ("papers", "authors", "research_parameters", "crop_species", "soil_info")
+CATEGORICAL_MAX_DISTINCT_RATIO = 0.5  # dictionary-encode string columns with at most this share of distinct values
+
+
+def flatten(record: Dict, prefix: str = "") -> Dict:
+    """Nested dicts become prefix_key columns; lists of scalars stay list columns."""
+    row = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            row.update(flatten(value, f"{prefix}{key}_"))
+        else:
+            row[f"{prefix}{key}"] = value
+    return row
+
+
+def paper_rows(paper_id: str, lte: str, result: MetadataExtractionResponse) -> Dict[str, List[Dict]]:
+    data = result.model_dump(mode="json")
+    citation, overview = data["citation"], data["LTE_metadata_OverviewMap"]
+    rows = {name: [] for name in TABLES}
+
+    authors = citation.pop("authors")
+    rows["authors"] = [{"paper_id": paper_id, "position": i, **author} for i, author in enumerate(authors)]
+
+    variables = overview.pop("research_parameters")
+    rows["research_parameters"] = [
+        {"paper_id": paper_id, "position": i, "name": variable["name"], "description": variable["description"],
+         "unit": variable["unit"], "vocabulary": variable["vocabulary"]}
+        for i, variable in enumerate(variables)]
+
+    for level in ("crop_rotation", "cover_crop"):
+        for i, crop in enumerate(overview.pop(f"{level}_levels") or []):
+            rows["crop_species"].append({"paper_id": paper_id, "level": level, "position": i,
+                                         "label": crop["name"]["label"], "uri": crop["name"]["uri"]})
+
+    rows["soil_info"] = [{"paper_id": paper_id, **overview.pop("soil_info")}]
+    rows["papers"] = [{"paper_id": paper_id, "lte_folder": lte, **flatten(citation), **flatten(overview, "lte_")}]
+    return rows
+
+
+def load_results(output_root: str) -> Iterable[Tuple[str, str, MetadataExtractionResponse]]:
+    """Yield (paper_id, LTE folder, result) for every valid output/<LTE>/<name>.json."""
+    skipped = 0
+    for path in sorted(glob.glob(os.path.join(output_root, "*", "*.json"))):
+        lte = os.path.basename(os.path.dirname(path))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = MetadataExtractionResponse.model_validate(json.load(f))
+        except (ValueError, ValidationError):
+            # Other JSON outputs (Schema.org exports, benchmarks) live next to the results
+            skipped += 1
+            continue
+        yield f"{lte}/{os.path.splitext(os.path.basename(path))[0]}", lte, result
+    if skipped:
+        print(f"⚠️ Skipped {skipped} JSON file(s) that are not extraction results")
+
+
+def encode_categoricals(table: pa.Table) -> pa.Table:
+    for i, field in enumerate(table.schema):
+        if not pa.types.is_string(field.type) or table.num_rows == 0:
+            continue
+        column = table.column(i)
+        if pc.count_distinct(column).as_py() <= CATEGORICAL_MAX_DISTINCT_RATIO * table.num_rows:
+            table = table.set_column(i, field.name, column.dictionary_encode())
+    return table
+
+
+def build_tables(results: Iterable[Tuple[str, str, MetadataExtractionResponse]]) -> Dict[str, pa.Table]:
+    rows = {name: [] for name in TABLES}
+    for paper_id, lte, result in results:
+        for name, table_rows in paper_rows(paper_id, lte, result).items():
+            rows[name].extend(table_rows)
+    return {name: encode_categoricals(pa.Table.from_pylist(table_rows)) for name, table_rows in rows.items()}
+
+
+def export_parquet(output_root: str, parquet_dir: str) -> Dict[str, int]:
+    """Write one Parquet file per table to `parquet_dir`; return the row counts."""
+    os.makedirs(parquet_dir, exist_ok=True)
+    tables = build_tables(load_results(output_root))
+    for name, table in tables.items():
+        pq.write_table(table, os.path.join(parquet_dir, f"{name}.parquet"), compression="zstd")
+    return {name: table.num_rows for name, table in tables.items()}
+
+
+if __name__ == "__main__":
+    output_root = sys.argv[1] if len(sys.argv) > 1 else "output"
+    parquet_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(output_root, "parquet")
+    counts = export_parquet(output_root, parquet_dir)
+    print(f"📦 Parquet tables in {parquet_dir}: " + ", ".join(f"{name} {count}" for name, count in counts.items()))
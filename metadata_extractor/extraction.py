@@ -0,0 +1,114 @@
+"""In-process extraction API: PDF → text → LLM → validated metadata, without the HTTP service.
+
+    from metadata_extractor.extraction import extract_from_pdf, extract_many
+
+    metadata = extract_from_pdf("input/V140/paper.pdf")
+    results = extract_many(paths, concurrency=4)
+
+Uses the same text extraction, prompt, LLM client pool and OCR cache as the
+FastAPI endpoint in main.py.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from json import loads, JSONDecodeError
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from .agrovoc import resolve_crop_uris
+from .llm_client import call_llm_with_usage
+from .models import MetadataExtractionResponse
+from .pdf_utils import extract_and_format_pdf_to_markdown
+from .prompts import SYSTEM_PROMPT
+from .rule_extraction import apply_rule_fields, known_fields_prompt, pre_extract
+
+# Raw LLM responses are appended here for debugging
+LLM_DEBUG_LOG = "llm_debug_log.txt"
+
+
+class ExtractionError(Exception):
+    """The LLM returned no content or content that is not JSON."""
+
+
+def clean_llm_response(raw_response: str) -> str:
+    """Remove Markdown-style code fencing from LLM response."""
+    if raw_response.startswith("```json"):
+        raw_response = raw_response[len("```json"):].strip()
+    if raw_response.endswith("```"):
+        raw_response = raw_response[:-len("```")].strip()
+    return raw_response
+
+
+def parse_llm_response(raw_response: str) -> dict:
+    if not raw_response or raw_response.strip() == "":
+        raise ExtractionError("LLM returned empty response.")
+    try:
+        return loads(clean_llm_response(raw_response))
+    except JSONDecodeError as e:
+        raise ExtractionError(f"Failed to parse JSON: {str(e)}") from e
+
+
+def report_disagreements(disagreements) -> None:
+    for path, rule_value, llm_value in disagreements:
+        print(f"⚖️ {path}: LLM returned {llm_value!r}, the pattern found {rule_value!r}; keeping {llm_value!r}")
+
+
+def log_raw_response(raw_response: str) -> None:
+    with open(LLM_DEBUG_LOG, "a", encoding="utf-8") as log:
+        log.write(f"\n[{datetime.now().isoformat()}] Raw LLM response:\n{raw_response or '[EMPTY]'}\n")
+
+
+def extract_from_text_with_usage(text: str, prompt: str = SYSTEM_PROMPT
+                                 ) -> Tuple[MetadataExtractionResponse, Optional[Dict[str, int]]]:
+    """Extract metadata from article text; also return the token usage reported by the API."""
+    rule_fields = pre_extract(text)
+    raw_response, usage = call_llm_with_usage(prompt + known_fields_prompt(rule_fields), text)
+    log_raw_response(raw_response)
+    parsed_json = parse_llm_response(raw_response)
+    report_disagreements(apply_rule_fields(parsed_json, rule_fields))
+    # Fill AGROVOC URIs of crop species from the offline index instead of trusting the LLM's guesses
+    resolved = resolve_crop_uris(parsed_json)
+    if resolved:
+        print(f"🌾 Resolved {resolved} AGROVOC URI(s) offline")
+    metadata = MetadataExtractionResponse.model_validate(parsed_json)
+    return metadata, usage
+
+
+def extract_from_text(text: str, prompt: str = SYSTEM_PROMPT) -> MetadataExtractionResponse:
+    return extract_from_text_with_usage(text, prompt)[0]
+
+
+def extract_rule_fields_from_pdf(pdf_path: str, backend: Optional[str] = None) -> Dict[str, Any]:
+    """Only the pattern-recoverable fields (DOI, ISSN, year, licence, e-mail, coordinates); no LLM call."""
+    return pre_extract(extract_and_format_pdf_to_markdown(pdf_path, backend=backend))
+
+
+def extract_from_pdf(pdf_path: str, backend: Optional[str] = None) -> MetadataExtractionResponse:
+    return extract_from_text(extract_and_format_pdf_to_markdown(pdf_path, backend=backend))
+
+
+def extract_many(pdf_paths: Iterable[str], concurrency: int = 4, pdf_workers: Optional[int] = None
+                 ) -> Dict[str, Union[MetadataExtractionResponse, Exception]]:
+    """Extract metadata from many PDFs; failed papers map to their exception.
+
+    PDF parsing runs in `pdf_workers` processes and feeds up to `concurrency`
+    LLM calls in threads, so parsing the next papers overlaps with waiting
+    for the model. Results are returned in input order.
+    """
+    pdf_paths = list(pdf_paths)
+    results = {}
+    with ProcessPoolExecutor(max_workers=pdf_workers or min(concurrency, os.cpu_count() or 1)) as pdf_pool, \
+            ThreadPoolExecutor(max_workers=concurrency) as llm_pool:
+        text_futures = {pdf_pool.submit(extract_and_format_pdf_to_markdown, path): path for path in pdf_paths}
+        llm_futures = {}
+        for future in as_completed(text_futures):
+            path = text_futures[future]
+            try:
+                llm_futures[path] = llm_pool.submit(extract_from_text, future.result())
+            except Exception as e:
+                results[path] = e
+        for path, future in llm_futures.items():
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                results[path] = e
+    return {path: results[path] for path in pdf_paths}
@@ -0,0 +1,145 @@
+"""Targeted extraction of only the fields an LTE overview map row is missing.
+
+    rows = read_lte_map()
+    row = find_row(rows, "192")
+    filled, gaps, usage = extract_gaps_with_usage(markdown_text, row)
+
+The reduced schema keeps the LTEEntry field definitions but only for the
+missing columns, so the prompt and the answer cover nothing that is already
+known.
+"""
+import json
+from typing import Dict, List, Optional, Tuple, Type
+
+from pydantic import create_model
+
+from .extraction import parse_llm_response
+from .llm_client import call_llm_with_usage
+from .models import LTEEntry, StrictBaseModel
+from .prompts import GAP_PROMPT
+from .rule_extraction import pre_extract
+
+# Same convention as LTEmetadata_heatmap.py, which reads the map with na_values='Unknown'
+MISSING_VALUES = {"", "unknown", "na", "n/a", "nan", "none", "null"}
+# The map writes these flags in lower case, the other yes/no columns capitalised
+LOWERCASE_FLAG_COLUMNS = {"one_factorial_lte", "two_factorial_lte", "multifactorial_lte"}
+# Known values sent along so the LLM knows which LTE of the publication is meant
+IDENTIFYING_COLUMNS = ("name", "site", "country", "trial_institution", "start_date")
+
+
+def _column_fields() -> Dict[str, Tuple[str, Optional[str]]]:
+    """Map CSV column -> (LTEEntry field, sub-field of a nested model or None)."""
+    columns = {}
+    for name, field in LTEEntry.model_fields.items():
+        annotation = field.annotation
+        if isinstance(annotation, type) and issubclass(annotation, StrictBaseModel):
+            for sub_name in annotation.model_fields:
+                columns[sub_name] = (name, sub_name)
+        else:
+            columns[name] = (name, None)
+    return columns
+
+
+COLUMN_FIELDS = _column_fields()
+
+
+def is_missing(value: Optional[str]) -> bool:
+    return value is None or value.strip().lower() in MISSING_VALUES
+
+
+def find_row(rows: List[Dict[str, str]], lte_id: str) -> Dict[str, str]:
+    for row in rows:
+        if row["id"] == str(lte_id):
+            return row
+    raise KeyError(f"No LTE with id {lte_id} in the overview map")
+
+
+def missing_columns(row: Dict[str, str]) -> List[str]:
+    """Map columns of `row` that are empty or "Unknown" and can be extracted into LTEEntry.
+
+    LTEEntry fields the map has no column for are not gaps: the merged row
+    has nowhere to put them.
+    """
+    return [column for column in COLUMN_FIELDS if column in row and is_missing(row[column])]
+
+
+def gap_model(columns: List[str]) -> Type[StrictBaseModel]:
+    """Sub-schema of LTEEntry containing only `columns`, nested models reduced likewise."""
+    top_level, nested = {}, {}
+    for column in columns:
+        name, sub_name = COLUMN_FIELDS[column]
+        if sub_name is None:
+            field = LTEEntry.model_fields[name]
+            top_level[name] = (field.annotation, field)
+        else:
+            nested.setdefault(name, []).append(sub_name)
+    for name, sub_names in nested.items():
+        parent = LTEEntry.model_fields[name].annotation
+        sub_fields = {sub_name: (parent.model_fields[sub_name].annotation, parent.model_fields[sub_name])
+                      for sub_name in sub_names}
+        sub_model = create_model(f"{parent.__name__}Gaps", __base__=StrictBaseModel, __doc__=parent.__doc__,
+                                 **sub_fields)
+        top_level[name] = (sub_model, ...)
+    return create_model("LTEEntryGaps", __base__=StrictBaseModel, __doc__=LTEEntry.__doc__, **top_level)
+
+
+def _without_titles(schema):
+    """JSON schema without the "title" keys pydantic adds to every property; they only cost tokens."""
+    if isinstance(schema, dict):
+        return {key: _without_titles(value) for key, value in schema.items()
+                if not (key == "title" and isinstance(value, str))}
+    if isinstance(schema, list):
+        return [_without_titles(value) for value in schema]
+    return schema
+
+
+def gap_prompt(row: Dict[str, str], model: Type[StrictBaseModel]) -> str:
+    known = {column: row[column] for column in IDENTIFYING_COLUMNS if not is_missing(row.get(column))}
+    return GAP_PROMPT.format(known=json.dumps(known, ensure_ascii=False),
+                             schema=json.dumps(_without_titles(model.model_json_schema()), separators=(",", ":")))
+
+
+def _to_csv_value(column: str, value) -> str:
+    if isinstance(value, bool):
+        flag = "yes" if value else "no"
+        return flag if column in LOWERCASE_FLAG_COLUMNS else flag.capitalize()
+    if column == "research_parameters":
+        return ", ".join(f"{item['name']} ({item['unit']})" if item.get("unit") else item["name"] for item in value)
+    if column in ("crop_rotation_levels", "cover_crop_levels"):
+        return ", ".join(item["name"]["label"] for item in value)
+    return str(value)
+
+
+def merge_gaps(row: Dict[str, str], gaps: StrictBaseModel) -> Dict[str, str]:
+    """Copy of `row` with the extracted values written into its missing columns; known values are kept."""
+    merged = dict(row)
+    data = gaps.model_dump(mode="json")
+    for column in missing_columns(row):
+        name, sub_name = COLUMN_FIELDS[column]
+        value = data.get(name)
+        if sub_name is not None:
+            value = value.get(sub_name) if value else None
+        if value not in (None, "", []):
+            merged[column] = _to_csv_value(column, value)
+    return merged
+
+
+def extract_gaps_with_usage(text: str, row: Dict[str, str]
+                            ) -> Tuple[Dict[str, str], Optional[StrictBaseModel], Optional[Dict[str, int]]]:
+    """Ask the LLM only for the missing fields of `row`; return the merged row, the gaps and token usage.
+
+    Missing coordinates and contact e-mail found by pattern are filled first and not asked for.
+    """
+    row = dict(row)
+    for path, value in pre_extract(text).items():
+        column = path.rsplit(".", 1)[1]
+        if path.startswith("LTE_metadata_OverviewMap.") and column in COLUMN_FIELDS and column in row \
+                and is_missing(row[column]):
+            row[column] = _to_csv_value(column, value)
+    columns = missing_columns(row)
+    if not columns:
+        return row, None, None
+    model = gap_model(columns)
+    raw_response, usage = call_llm_with_usage(gap_prompt(row, model), text)
+    gaps = model.model_validate(parse_llm_response(raw_response))
+    return merge_gaps(row, gaps), gaps, usage
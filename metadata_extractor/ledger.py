@@ -0,0 +1,109 @@
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Document states, in pipeline order
+PENDING = "pending"
+TEXT_EXTRACTED = "text_extracted"
+LLM_DONE = "llm_done"
+VALIDATED = "validated"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    pdf_path          TEXT PRIMARY KEY,
+    lte               TEXT,
+    state             TEXT NOT NULL,
+    failed_stage      TEXT,
+    attempts          INTEGER NOT NULL DEFAULT 0,
+    last_error        TEXT,
+    text_path         TEXT,
+    result_path       TEXT,
+    text_seconds      REAL,
+    llm_seconds       REAL,
+    prompt_tokens     INTEGER,
+    completion_tokens INTEGER,
+    updated_at        TEXT
+)
+"""
+
+
+class WorkLedger:
+    """SQLite record of each document's progress through a batch extraction.
+
+    A batch can be interrupted at any point; on the next run finished
+    documents are skipped, and interrupted or failed ones resume from the
+    last completed stage.
+    """
+
+    def __init__(self, db_path: str):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def _update(self, pdf_path: str, **fields) -> None:
+        fields["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self.conn:
+            self.conn.execute(f"UPDATE documents SET {assignments} WHERE pdf_path = ?",
+                              (*fields.values(), pdf_path))
+
+    def register(self, pdf_path: str, lte: str, text_path: str, result_path: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO documents (pdf_path, lte, state, text_path, result_path, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (pdf_path, lte, PENDING, text_path, result_path, datetime.now().isoformat(timespec="seconds")))
+
+    def get(self, pdf_path: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM documents WHERE pdf_path = ?", (pdf_path,)).fetchone()
+
+    def reset(self, pdf_path: str) -> None:
+        self._update(pdf_path, state=PENDING, failed_stage=None, last_error=None, attempts=0)
+
+    def start_attempt(self, pdf_path: str) -> None:
+        with self.conn:
+            self.conn.execute("UPDATE documents SET attempts = attempts + 1 WHERE pdf_path = ?", (pdf_path,))
+
+    def mark_text_extracted(self, pdf_path: str, seconds: float) -> None:
+        self._update(pdf_path, state=TEXT_EXTRACTED, text_seconds=round(seconds, 3))
+
+    def mark_llm_done(self, pdf_path: str, seconds: float,
+                      prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None) -> None:
+        self._update(pdf_path, state=LLM_DONE, llm_seconds=round(seconds, 3),
+                     prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def mark_validated(self, pdf_path: str) -> None:
+        self._update(pdf_path, state=VALIDATED, failed_stage=None, last_error=None)
+
+    def mark_failed(self, pdf_path: str, stage: str, error: str) -> None:
+        """Record a failure; `stage` is the state the document was being moved to."""
+        self._update(pdf_path, state=FAILED, failed_stage=stage, last_error=error[:2000])
+
+    def resume_stage(self, row: sqlite3.Row) -> str:
+        """Last completed stage of a document; failed documents resume before the stage that failed.
+
+        A response that failed validation is discarded, so those documents
+        resume before the LLM call rather than validating it again.
+        """
+        if row["state"] != FAILED:
+            return row["state"]
+        return {LLM_DONE: TEXT_EXTRACTED, VALIDATED: TEXT_EXTRACTED}.get(row["failed_stage"], PENDING)
+
+    def summary(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT state, COUNT(*) FROM documents GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def totals(self) -> Dict[str, float]:
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(text_seconds), 0), COALESCE(SUM(llm_seconds), 0), "
+            "COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0) FROM documents").fetchone()
+        return {"text_seconds": row[0], "llm_seconds": row[1], "prompt_tokens": row[2], "completion_tokens": row[3]}
+
+    def failures(self) -> List[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM documents WHERE state = ?", (FAILED,)).fetchall()
+
+    def close(self) -> None:
+        self.conn.close()
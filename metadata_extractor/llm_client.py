@@ -1,24 +1,38 @@
 from openai import OpenAI
-from .config import API_KEY, API_ENDPOINT, MODEL_NAME
 from datetime import datetime
+from typing import Dict, Optional, Tuple
 import httpx
 
-print(API_ENDPOINT)
 print("📦 llm_client module loaded")
 
-def call_llm_with_prompt(prompt: str, text: str) -> str:
-    print("🛠️ Preparing to initialize OpenAI client...")
-    print("🔑 API_KEY:", API_KEY)
-    print("🌐 API_ENDPOINT:", API_ENDPOINT)
-    print("🧠 MODEL_NAME:", MODEL_NAME)
+_client = None
 
-    try:
-        client = OpenAI(
+def get_client() -> OpenAI:
+    """Shared OpenAI client, so concurrent requests reuse one HTTP connection pool.
+
+    The credentials are read on the first call rather than at import, so the
+    HTTP-client and rules-only modes run without them.
+    """
+    global _client
+    if _client is None:
+        from .config import API_KEY, API_ENDPOINT, MODEL_NAME
+        print("🛠️ Initializing OpenAI client...")
+        print("🌐 API_ENDPOINT:", API_ENDPOINT)
+        print("🧠 MODEL_NAME:", MODEL_NAME)
+        _client = OpenAI(
             api_key=API_KEY,
             base_url=API_ENDPOINT,
             timeout=httpx.Timeout(500.0, connect=60.0, read=500.0, write=500.0, pool=500.0),
-            max_retries=2
+            max_retries=2,
+            http_client=httpx.Client(limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)),
         )
+    return _client
+
+def call_llm_with_usage(prompt: str, text: str) -> Tuple[str, Optional[Dict[str, int]]]:
+    """Like call_llm_with_prompt, but also return the token usage reported by the API."""
+    try:
+        client = get_client()
+        from .config import MODEL_NAME
         print("📤 Sending request to LLM...")
         response = client.chat.completions.create(
             model=MODEL_NAME,
@@ -28,7 +42,14 @@ def call_llm_with_prompt(prompt: str, text: str) -> str:
             ]
         )
         print("✅ LLM responded.")
-        return response.choices[0].message.content
+        usage = None
+        if response.usage is not None:
+            usage = {"prompt_tokens": response.usage.prompt_tokens,
+                     "completion_tokens": response.usage.completion_tokens}
+        return response.choices[0].message.content, usage
     except Exception as e:
         print(f"❌ LLM call failed: {e}")
-        return ""
+        return "", None
+
+def call_llm_with_prompt(prompt: str, text: str) -> str:
+    return call_llm_with_usage(prompt, text)[0]
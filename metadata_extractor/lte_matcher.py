@@ -0,0 +1,165 @@
+"""Link extracted LTEs to rows of the LTE overview map.
+
+    matcher = LTEMatcher.from_csv("input/metadata_LTEmap_20250728.csv")
+    matcher.match(name="Static fertilization experiment", site="Bad Lauchstädt")
+    matcher.match_entry(result.LTE_metadata_OverviewMap)
+
+Names and sites are normalised (umlauts transliterated, accents and generic
+words such as "LTE" or "experiment" dropped) and split into character
+trigrams. An inverted index from trigram to map rows picks a few dozen
+candidates per query, which are then scored exactly, so a query costs well
+under a millisecond regardless of the size of the map.
+"""
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional
+
+LTE_MAP_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "input", "metadata_LTEmap_20250728.csv")
+
+TRANSLITERATION = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss", "æ": "ae", "ø": "oe", "å": "aa"})
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Words shared by most map rows; they carry no information for telling LTEs apart
+GENERIC_WORDS = frozenset("""
+    lte ltfe experiment experiments experimental trial trials long term field station site
+    the of and in at on for near bei am an der die das de la le du von zu
+""".split())
+
+# Relative weight of each query field; fields missing from the query are left out
+WEIGHTS = {"name": 0.5, "site": 0.35, "institution": 0.15}
+COUNTRY_MISMATCH_PENALTY = 0.5
+MAX_DOCUMENT_FREQUENCY = 0.1  # trigrams in more rows than this share are not used for candidate lookup
+MAX_CANDIDATES = 50
+
+
+class LTEMatch(NamedTuple):
+    id: str
+    name: str
+    score: float
+
+
+def normalise_tokens(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text.lower().translate(TRANSLITERATION))
+    text = text.encode("ascii", "ignore").decode("ascii")
+    return [token for token in NON_ALNUM.sub(" ", text).split() if token not in GENERIC_WORDS]
+
+
+def trigrams(tokens: List[str]) -> FrozenSet[str]:
+    grams = set()
+    for token in tokens:
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def dice(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def containment(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Share of `a` found in `b`, e.g. a site name inside an LTE name."""
+    return len(a & b) / len(a) if a else 0.0
+
+
+def read_lte_map(csv_path: str = LTE_MAP_CSV) -> List[Dict[str, str]]:
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        return [row for row in csv.DictReader(f, delimiter=";") if row.get("id")]
+
+
+class LTEMatcher:
+    """Trigram-indexed fuzzy lookup of LTE overview map rows by name, site and institution."""
+
+    def __init__(self, rows: List[Dict[str, str]]):
+        self.ids = [row["id"] for row in rows]
+        self.positions = {lte_id: i for i, lte_id in enumerate(self.ids)}
+        self.names = [row["name"] for row in rows]
+        self.countries = [" ".join(normalise_tokens(row.get("country"))) for row in rows]
+        self.name_grams = [trigrams(normalise_tokens(row["name"])) for row in rows]
+        self.site_grams = [trigrams(normalise_tokens(row.get("site"))) for row in rows]
+        self.institution_tokens = [frozenset(normalise_tokens(row.get("trial_institution"))) for row in rows]
+
+        postings = defaultdict(set)
+        for i in range(len(rows)):
+            for gram in self.name_grams[i] | self.site_grams[i]:
+                postings[gram].add(i)
+        max_rows = max(1, int(MAX_DOCUMENT_FREQUENCY * len(rows)))
+        self.index = {gram: tuple(row_ids) for gram, row_ids in postings.items() if len(row_ids) <= max_rows}
+
+    @classmethod
+    def from_csv(cls, csv_path: str = LTE_MAP_CSV) -> "LTEMatcher":
+        return cls(read_lte_map(csv_path))
+
+    def candidates(self, grams: FrozenSet[str]) -> List[int]:
+        hits = Counter()
+        for gram in grams:
+            hits.update(self.index.get(gram, ()))
+        return [i for i, _ in hits.most_common(MAX_CANDIDATES)]
+
+    def _query(self, name, site, institution, country):
+        query = {"name": trigrams(normalise_tokens(name)), "site": trigrams(normalise_tokens(site)),
+                 "institution": frozenset(normalise_tokens(institution)),
+                 "country": " ".join(normalise_tokens(country))}
+        query["weights"] = {field: weight for field, weight in WEIGHTS.items() if query[field]}
+        return query
+
+    def _score(self, i: int, query: Dict) -> float:
+        weights = query["weights"]
+        score = 0.0
+        if "name" in weights:
+            score += weights["name"] * dice(query["name"], self.name_grams[i])
+        if "site" in weights:
+            # LTE names usually contain the site, so a site found in the name counts too
+            score += weights["site"] * max(dice(query["site"], self.site_grams[i]),
+                                           containment(query["site"], self.name_grams[i]))
+        if "institution" in weights:
+            score += weights["institution"] * containment(query["institution"], self.institution_tokens[i])
+        score /= sum(weights.values())
+        if query["country"] and self.countries[i] and query["country"] != self.countries[i]:
+            score *= COUNTRY_MISMATCH_PENALTY
+        return score
+
+    def match(self, name: Optional[str] = None, site: Optional[str] = None, institution: Optional[str] = None,
+              country: Optional[str] = None, top_k: int = 5, min_score: float = 0.2) -> List[LTEMatch]:
+        """Ranked map rows for an extracted LTE, best first."""
+        query = self._query(name, site, institution, country)
+        if not (query["name"] or query["site"]):
+            return []
+        matches = []
+        for i in self.candidates(query["name"] | query["site"]):
+            score = self._score(i, query)
+            if score >= min_score:
+                matches.append(LTEMatch(self.ids[i], self.names[i], round(score, 4)))
+        matches.sort(key=lambda match: match.score, reverse=True)
+        return matches[:top_k]
+
+    def score_entry(self, lte_id: str, entry) -> float:
+        """Similarity of an extracted LTEEntry to one given map row (0 if the id is unknown)."""
+        i = self.positions.get(str(lte_id))
+        query = self._query(entry.name, entry.site, entry.trial_institution, entry.country)
+        if i is None or not (query["name"] or query["site"]):
+            return 0.0
+        return round(self._score(i, query), 4)
+
+    def match_entry(self, entry, top_k: int = 5) -> List[LTEMatch]:
+        """Match an extracted LTEEntry."""
+        return self.match(entry.name, entry.site, entry.trial_institution, entry.country, top_k=top_k)
+
+
+if __name__ == "__main__":
+    # Self-check: look up every map row by its own name and site and report accuracy and latency
+    rows = read_lte_map(sys.argv[1] if len(sys.argv) > 1 else LTE_MAP_CSV)
+    matcher = LTEMatcher(rows)
+    start = time.perf_counter()
+    hits = sum(1 for row in rows if (matches := matcher.match(row["name"], row["site"])) and matches[0].id == row["id"])
+    seconds = time.perf_counter() - start
+    print(f"🔎 {hits}/{len(rows)} rows ranked first for their own name and site, "
+          f"{seconds / len(rows) * 1000:.3f} ms per query")
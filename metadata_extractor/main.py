@@ -1,16 +1,17 @@
 # Standard library imports
-import os
+import json
 from datetime import datetime
-from json import loads, JSONDecodeError
+from typing import Dict
 
 # Third-party imports
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 # Local module imports
 from .models import MetadataExtractionResponse
-from .llm_client import call_llm_with_prompt
-from .prompts import SYSTEM_PROMPT
+from .multi_lte import extract_multi_from_text_with_usage
+from .extraction import ExtractionError, extract_from_text_with_usage
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -36,16 +37,8 @@ DUMMY_JSON_RESPONSE = '''```json
 ```'''
 
 
-def clean_llm_response(raw_response: str) -> str:
-    """Remove Markdown-style code fencing from LLM response."""
-    if raw_response.startswith("```json"):
-        raw_response = raw_response[len("```json"):].strip()
-    if raw_response.endswith("```"):
-        raw_response = raw_response[:-len("```")].strip()
-    return raw_response
-
 @app.post("/extract_metadata", response_model=MetadataExtractionResponse)
-async def extract_metadata(request: Request):
+async def extract_metadata(request: Request, response: Response):
     print("🚀 extract_metadata endpoint called")
     body = await request.json()
     article_text = body.get("text")
@@ -53,33 +46,43 @@ async def extract_metadata(request: Request):
     if not article_text:
         return JSONResponse(status_code=400, content={"error": "Missing 'text' in request body."})
 
-    # Uncomment this to use the real LLM call
-    extracted_json = call_llm_with_prompt(SYSTEM_PROMPT, article_text)
+    try:
+        # Run the blocking LLM call in a worker thread so concurrent requests are not serialised
+        metadata, usage = await run_in_threadpool(extract_from_text_with_usage, article_text)
+    except (ExtractionError, ValueError) as e:
+        # Empty or unparseable LLM output, or output not matching the models
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    if usage:
+        # Token usage travels in headers so the response body stays a MetadataExtractionResponse
+        response.headers["X-LLM-Prompt-Tokens"] = str(usage["prompt_tokens"])
+        response.headers["X-LLM-Completion-Tokens"] = str(usage["completion_tokens"])
+
+    # Save the validated result, exactly as returned
+    filename = f"llm_response_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(metadata.model_dump(mode="json", by_alias=True), f, indent=2, ensure_ascii=False)
 
-    #print("🧪 Skipping LLM call — using dummy response")
-    #extracted_json = DUMMY_JSON_RESPONSE
+    return metadata
 
-    if not extracted_json:
-        print("⚠️ LLM returned no content.")
-    else:
-        print(f"🧠 Raw LLM response: {extracted_json}")
 
-    # Log the raw LLM response to a file for debugging
-    with open("llm_debug_log.txt", "a", encoding="utf-8") as log:
-        log.write(f"\n[{datetime.now().isoformat()}] Raw LLM response:\n{extracted_json or '[EMPTY]'}\n")
+@app.post("/extract_metadata_multi", response_model=Dict[str, MetadataExtractionResponse])
+async def extract_metadata_multi(request: Request, response: Response):
+    """One extraction for a publication filed under several LTE folders; returns a response per folder."""
+    print("🚀 extract_metadata_multi endpoint called")
+    body = await request.json()
+    article_text = body.get("text")
+    ltes = body.get("ltes")
 
-    if not extracted_json or extracted_json.strip() == "":
-        return JSONResponse(status_code=500, content={"error": "LLM returned empty response."})
+    if not article_text or not ltes:
+        return JSONResponse(status_code=400, content={"error": "Missing 'text' or 'ltes' in request body."})
 
     try:
-        cleaned_json = clean_llm_response(extracted_json)
-        parsed_json = loads(cleaned_json)
-    except JSONDecodeError as e:
-        return JSONResponse(status_code=500, content={"error": f"Failed to parse JSON: {str(e)}"})
-
-    # Save the cleaned JSON to a file
-    filename = f"llm_response_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(cleaned_json)
-
-    return parsed_json
\ No newline at end of file
+        results, usage = await run_in_threadpool(extract_multi_from_text_with_usage, article_text, ltes)
+    except (ExtractionError, ValueError) as e:
+        # Empty or unparseable LLM output, or output not matching the models
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    if usage:
+        response.headers["X-LLM-Prompt-Tokens"] = str(usage["prompt_tokens"])
+        response.headers["X-LLM-Completion-Tokens"] = str(usage["completion_tokens"])
+    print(f"🧩 {len(results)}/{len(ltes)} LTE(s) extracted in one call")
+    return results
@@ -0,0 +1,102 @@
+import gc
+import os
+import shutil
+import sys
+import tempfile
+from typing import IO, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# === CONFIGURATION ===
+# Above this resident set size, intermediate PDF text is spilled to a temporary file (0 disables)
+PDF_RSS_CEILING_MB = float(os.getenv("PDF_RSS_CEILING_MB", "1024"))
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (0.0 if it cannot be determined)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (0.0 if it cannot be determined)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    if psutil is not None:
+        return psutil.Process().memory_info().peak_wset / 2**20
+    return 0.0
+
+
+class SpillingTextBuffer:
+    """Text accumulator that moves its contents to a temporary file once the
+    process RSS exceeds the configured ceiling, so large documents do not
+    have to be held in memory while they are being extracted."""
+
+    def __init__(self, rss_ceiling_mb: Optional[float] = None):
+        self.rss_ceiling_mb = PDF_RSS_CEILING_MB if rss_ceiling_mb is None else rss_ceiling_mb
+        self._parts: List[str] = []
+        self._file: Optional[IO[str]] = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def write(self, text: str) -> None:
+        if self._file is None and self.rss_ceiling_mb and current_rss_mb() > self.rss_ceiling_mb:
+            self._spill()
+        if self._file is not None:
+            self._file.write(text)
+        else:
+            self._parts.append(text)
+
+    def _spill(self) -> None:
+        self._file = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self._file.writelines(self._parts)
+        self._parts = []
+        gc.collect()
+
+    def copy_to(self, fileobj: IO[str]) -> None:
+        """Stream the buffered text into an open text file without building one string."""
+        if self._file is None:
+            fileobj.writelines(self._parts)
+            return
+        self._file.flush()
+        self._file.seek(0)
+        shutil.copyfileobj(self._file, fileobj)
+        self._file.seek(0, os.SEEK_END)
+
+    def getvalue(self) -> str:
+        if self._file is None:
+            return "".join(self._parts)
+        self._file.flush()
+        self._file.seek(0)
+        text = self._file.read()
+        self._file.seek(0, os.SEEK_END)
+        return text
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._parts = []
+
+    def __enter__(self) -> "SpillingTextBuffer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
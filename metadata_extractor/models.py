@@ -164,4 +164,9 @@ class MetadataExtractionResponse(StrictBaseModel):
     citation: CitationMetadata
     #LTE_metadata: LTEDataMetadata
     LTE_metadata_OverviewMap: LTEEntry 
-    #reasoning: Optional[str]
\ No newline at end of file
+    #reasoning: Optional[str]
+
+class MultiLTEExtractionResponse(StrictBaseModel):
+    """Response for a publication covering several LTEs: one LTEEntry per LTE, in the order they were asked for."""
+    citation: CitationMetadata
+    LTE_metadata_OverviewMap: List[LTEEntry]
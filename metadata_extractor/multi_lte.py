@@ -0,0 +1,94 @@
+"""One-call extraction for publications that cover several LTEs.
+
+The same PDF filed under input/LTE_19_Fundulea/, input/LTE_23_Lovrin/, ...
+is sent to the LLM once, asking for a list of LTEEntry objects. Each entry
+is then assigned to its LTE folder by similarity to the folder's overview
+map row (LTE_<index>_<site>, matching the map's `index` column) or, for
+other folders, to the folder name.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .agrovoc import resolve_crop_uris
+from .extraction import log_raw_response, parse_llm_response, report_disagreements
+from .llm_client import call_llm_with_usage
+from .lte_matcher import LTE_MAP_CSV, LTEMatcher, containment, normalise_tokens, read_lte_map, trigrams
+from .models import LTEEntry, MetadataExtractionResponse, MultiLTEExtractionResponse
+from .prompts import MULTI_LTE_PROMPT, SYSTEM_PROMPT
+from .rule_extraction import apply_rule_fields, known_fields_prompt, pre_extract
+
+LTE_FOLDER = re.compile(r"^LTE_(\d+)_(.+)$")
+
+_map_rows = None
+_matcher = None
+
+
+def lte_map() -> Tuple[Dict[str, Dict[str, str]], LTEMatcher]:
+    """Overview map rows by `index` and the matcher over them, loaded once."""
+    global _map_rows, _matcher
+    if _matcher is None:
+        rows = read_lte_map(LTE_MAP_CSV)
+        _map_rows = {row["index"]: row for row in rows}
+        _matcher = LTEMatcher(rows)
+    return _map_rows, _matcher
+
+
+def folder_map_row(folder: str) -> Optional[Dict[str, str]]:
+    match = LTE_FOLDER.match(folder)
+    return lte_map()[0].get(match.group(1)) if match else None
+
+
+def describe_ltes(folders: List[str]) -> str:
+    lines = []
+    for i, folder in enumerate(folders, 1):
+        row = folder_map_row(folder)
+        if row:
+            lines.append(f"{i}. {row['name']} (site: {row['site']}, country: {row['country']})")
+        else:
+            lines.append(f"{i}. {folder.replace('_', ' ')}")
+    return "\n".join(lines)
+
+
+def _folder_score(folder: str, entry: LTEEntry) -> float:
+    row = folder_map_row(folder)
+    if row:
+        return lte_map()[1].score_entry(row["id"], entry)
+    folder_grams = trigrams(normalise_tokens(folder.replace("_", " ")))
+    return containment(folder_grams, trigrams(normalise_tokens(f"{entry.name or ''} {entry.site or ''}")))
+
+
+def assign_entries(folders: List[str], entries: List[LTEEntry]) -> Dict[str, Optional[LTEEntry]]:
+    """Pair folders with entries by best similarity first; leftovers are paired in the order asked for."""
+    pairs = sorted(((_folder_score(folder, entry), f, e) for f, folder in enumerate(folders)
+                    for e, entry in enumerate(entries)), reverse=True)
+    assigned, used = {}, set()
+    for score, f, e in pairs:
+        if score > 0 and folders[f] not in assigned and e not in used:
+            assigned[folders[f]] = entries[e]
+            used.add(e)
+    leftovers = iter(entry for e, entry in enumerate(entries) if e not in used)
+    return {folder: assigned.get(folder) or next(leftovers, None) for folder in folders}
+
+
+def extract_multi_from_text_with_usage(text: str, folders: List[str], prompt: str = SYSTEM_PROMPT
+                                       ) -> Tuple[Dict[str, MetadataExtractionResponse], Optional[Dict[str, int]]]:
+    """Extract all LTEs of a publication in one LLM call; return a response per folder and the token usage.
+
+    Folders without a matching entry in the answer are left out of the result.
+    """
+    # Coordinates and e-mail cannot be attributed to one of several sites, so only citation fields are used
+    rule_fields = {path: value for path, value in pre_extract(text).items() if path.startswith("citation.")}
+    full_prompt = prompt + known_fields_prompt(rule_fields) + MULTI_LTE_PROMPT.format(ltes=describe_ltes(folders))
+    raw_response, usage = call_llm_with_usage(full_prompt, text)
+    log_raw_response(raw_response)
+    parsed_json = parse_llm_response(raw_response)
+    report_disagreements(apply_rule_fields(parsed_json, rule_fields))
+    for entry in parsed_json.get("LTE_metadata_OverviewMap") or []:
+        resolve_crop_uris({"LTE_metadata_OverviewMap": entry})
+    multi = MultiLTEExtractionResponse.model_validate(parsed_json)
+
+    results = {}
+    for folder, entry in assign_entries(folders, multi.LTE_metadata_OverviewMap).items():
+        if entry is not None:
+            results[folder] = MetadataExtractionResponse(citation=multi.citation, LTE_metadata_OverviewMap=entry)
+    return results, usage
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import fitz
+
+# === CONFIGURATION ===
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join(PROJECT_DIR, "output", ".ocr_cache"))
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "eng+deu")
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+OCR_TIMEOUT = int(os.getenv("OCR_TIMEOUT", "300"))  # seconds per page
+
+MIN_TEXT_CHARS = 50       # fewer extractable characters than this -> no usable text layer
+MIN_WORD_CHAR_RATIO = 0.6  # share of letters/digits/whitespace below this -> garbage text layer
+CID_PATTERN = re.compile(r"\(cid:\d+\)")
+
+
+def page_needs_ocr(text: Optional[str]) -> bool:
+    """Return True if a page's extracted text is empty or looks like glyph garbage."""
+    if not text:
+        return True
+    stripped = text.strip()
+    if len(stripped) < MIN_TEXT_CHARS:
+        return True
+    # pdfminer emits "(cid:NN)" and PyMuPDF U+FFFD for glyphs without a unicode mapping
+    readable = CID_PATTERN.sub("", stripped).replace("\ufffd", "")
+    if len(readable) < MIN_TEXT_CHARS:
+        return True
+    word_chars = sum(1 for c in readable if c.isalnum() or c.isspace())
+    return word_chars / len(stripped) < MIN_WORD_CHAR_RATIO
+
+
+def tesseract_available() -> bool:
+    return shutil.which(TESSERACT_CMD) is not None
+
+
+def _cache_path(page_hash: str) -> str:
+    return os.path.join(OCR_CACHE_DIR, page_hash[:2], f"{page_hash}.txt")
+
+
+def _render_page(page: "fitz.Page") -> Tuple[str, bytes]:
+    """Render a page and return (content hash, PNG bytes) for OCR."""
+    pix = page.get_pixmap(dpi=OCR_DPI, colorspace=fitz.csGRAY, alpha=False)
+    digest = hashlib.sha256()
+    digest.update(f"{OCR_LANGUAGES}|{OCR_DPI}|{pix.width}x{pix.height}|".encode())
+    digest.update(pix.samples)
+    png = pix.tobytes("png")
+    pix = None
+    return digest.hexdigest(), png
+
+
+def _run_tesseract(png: bytes) -> str:
+    result = subprocess.run(
+        [TESSERACT_CMD, "stdin", "stdout", "-l", OCR_LANGUAGES],
+        input=png,
+        capture_output=True,
+        timeout=OCR_TIMEOUT,
+        check=True,
+    )
+    return result.stdout.decode("utf-8", errors="replace")
+
+
+def _ocr_and_cache(page_hash: str, png: bytes) -> str:
+    text = _run_tesseract(png)
+    path = _cache_path(page_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return text
+
+
+def apply_ocr_fallback(pdf_path: str, page_texts: List[str],
+                       page_offset: int = 0) -> Tuple[List[str], Dict]:
+    """Replace pages without a usable text layer by Tesseract OCR output.
+
+    Pages are OCR'd in parallel; results are cached on disk by a hash of the
+    rendered page, so a page is never OCR'd twice. `page_offset` is the index
+    of the first page in `page_texts` when a document is processed in windows.
+    Returns the updated page texts and a statistics dict for the processing log.
+    """
+    start = time.perf_counter()
+    missing = [i for i, text in enumerate(page_texts) if page_needs_ocr(text)]
+    stats = {
+        "pages": len(page_texts),
+        "pages_without_text": len(missing),
+        "pages_ocr": 0,
+        "cache_hits": 0,
+        "ocr_failed": 0,
+        "tesseract_missing": False,
+        "seconds": 0.0,
+    }
+    if not missing:
+        return page_texts, stats
+    if not tesseract_available():
+        stats["tesseract_missing"] = True
+        print(f"⚠️ {len(missing)} page(s) in {os.path.basename(pdf_path)} have no text layer, "
+              f"but '{TESSERACT_CMD}' was not found — skipping OCR.")
+        return page_texts, stats
+
+    texts = list(page_texts)
+    futures = {}
+    pending = {}  # page hash -> future, so identical pages (e.g. blank ones) are OCR'd once
+    with fitz.open(pdf_path) as doc, ThreadPoolExecutor(max_workers=OCR_WORKERS) as pool:
+        # Rendering stays on this thread (PyMuPDF is not thread-safe); the
+        # tesseract subprocesses run concurrently in the pool.
+        for i in missing:
+            if page_offset + i >= doc.page_count:
+                continue
+            page_hash, png = _render_page(doc.load_page(page_offset + i))
+            cached = _cache_path(page_hash)
+            if os.path.exists(cached):
+                with open(cached, "r", encoding="utf-8") as f:
+                    texts[i] = f.read()
+                stats["cache_hits"] += 1
+                continue
+            if page_hash not in pending:
+                pending[page_hash] = pool.submit(_ocr_and_cache, page_hash, png)
+            futures[i] = pending[page_hash]
+
+        for i, future in futures.items():
+            try:
+                texts[i] = future.result()
+                stats["pages_ocr"] += 1
+            except (subprocess.SubprocessError, OSError) as e:
+                stats["ocr_failed"] += 1
+                print(f"❌ OCR failed for page {page_offset + i + 1} of {os.path.basename(pdf_path)}: {e}")
+
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    return texts, stats
+
+
+def merge_ocr_stats(total: Optional[Dict], stats: Dict) -> Dict:
+    """Add the statistics of one page window to the running totals of a document."""
+    if total is None:
+        return dict(stats)
+    merged = {key: total[key] + stats[key] for key in total if key != "tesseract_missing"}
+    merged["tesseract_missing"] = total["tesseract_missing"] or stats["tesseract_missing"]
+    merged["seconds"] = round(merged["seconds"], 2)
+    return merged
+
+
+def format_ocr_stats(stats: Dict) -> str:
+    """One-line summary of OCR coverage and timing for the processing log."""
+    text_pages = stats["pages"] - stats["pages_without_text"]
+    line = (f"text layer {text_pages}/{stats['pages']} pages; "
+            f"OCR {stats['pages_ocr']} page(s), {stats['cache_hits']} from cache, "
+            f"{stats['ocr_failed']} failed in {stats['seconds']:.2f}s")
+    if stats["tesseract_missing"]:
+        line += "; tesseract not found, OCR skipped"
+    return line
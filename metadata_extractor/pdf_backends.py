@@ -0,0 +1,180 @@
+import io
+import itertools
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .ocr import page_needs_ocr
+from .pdf_tables import EXTRACT_TABLES, page_text_with_tables
+
+# === CONFIGURATION ===
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_RESULTS_PATH = os.getenv(
+    "PDF_BACKEND_BENCHMARK", os.path.join(PROJECT_DIR, "output", "pdf_backend_benchmark.json"))
+DEFAULT_BACKEND_ORDER = ["pymupdf", "pdfminer", "pypdf2"]
+MIN_ADEQUATE_PAGE_SHARE = 0.8  # share of pages with a usable text layer for a backend to be accepted
+PDF_PAGE_WINDOW = int(os.getenv("PDF_PAGE_WINDOW", "25"))  # pages held in memory at a time
+
+
+class PDFBackend:
+    """Common interface of the PDF text extractors; yields the plain text of each page."""
+    name = ""
+
+    def available(self) -> bool:
+        raise NotImplementedError
+
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        raise NotImplementedError
+
+    def iter_text_pages(self, pdf_path: str) -> Iterator[str]:
+        """Plain page text without table detection; enough to judge the text layer."""
+        return self.iter_pages(pdf_path)
+
+    def extract_pages(self, pdf_path: str) -> List[str]:
+        return list(self.iter_pages(pdf_path))
+
+    def iter_page_windows(self, pdf_path: str, window: int = PDF_PAGE_WINDOW) -> Iterator[Tuple[int, List[str]]]:
+        """Yield (index of first page, page texts) for consecutive windows of at most `window` pages."""
+        pages = self.iter_pages(pdf_path)
+        start = 0
+        while True:
+            batch = list(itertools.islice(pages, window))
+            if not batch:
+                return
+            yield start, batch
+            start += len(batch)
+
+
+class PyMuPDFBackend(PDFBackend):
+    name = "pymupdf"
+
+    def available(self) -> bool:
+        try:
+            import fitz  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        return self._iter_pages(pdf_path, EXTRACT_TABLES)
+
+    def iter_text_pages(self, pdf_path: str) -> Iterator[str]:
+        return self._iter_pages(pdf_path, False)
+
+    def _iter_pages(self, pdf_path: str, tables: bool) -> Iterator[str]:
+        import fitz
+        with fitz.open(pdf_path) as doc:
+            for i in range(doc.page_count):
+                page = doc.load_page(i)
+                # Tables become compact TSV blocks instead of flattened cell text
+                text = page_text_with_tables(page) if tables else page.get_text("text")
+                page = None  # release the page object before the next one is loaded
+                if (i + 1) % PDF_PAGE_WINDOW == 0:
+                    fitz.TOOLS.store_shrink(100)  # drop cached fonts/images of finished pages
+                yield text
+        fitz.TOOLS.store_shrink(100)
+
+
+class PDFMinerBackend(PDFBackend):
+    name = "pdfminer"
+
+    def available(self) -> bool:
+        try:
+            import pdfminer  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        # Same pipeline as pdfminer.high_level.extract_text, but one page at a time
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+
+        rsrcmgr = PDFResourceManager(caching=True)
+        laparams = LAParams()
+        with open(pdf_path, "rb") as fp:
+            for page in PDFPage.get_pages(fp):
+                buffer = io.StringIO()
+                device = TextConverter(rsrcmgr, buffer, laparams=laparams)
+                PDFPageInterpreter(rsrcmgr, device).process_page(page)
+                device.close()
+                text = buffer.getvalue().rstrip("\f")
+                del page, device, buffer  # layout objects of this page are no longer referenced
+                yield text
+
+
+class PyPDF2Backend(PDFBackend):
+    name = "pypdf2"
+
+    def available(self) -> bool:
+        try:
+            import PyPDF2  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        from PyPDF2 import PdfReader
+        reader = PdfReader(pdf_path)
+        for i in range(len(reader.pages)):
+            yield reader.pages[i].extract_text() or ""
+
+
+BACKENDS: Dict[str, PDFBackend] = {
+    backend.name: backend for backend in (PyMuPDFBackend(), PDFMinerBackend(), PyPDF2Backend())
+}
+
+
+def get_backend(name: str) -> PDFBackend:
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown PDF backend '{name}'. Available: {', '.join(BACKENDS)}") from None
+
+
+def backend_ranking(results_path: str = BENCHMARK_RESULTS_PATH) -> List[str]:
+    """Backend names ordered fastest first, from the last benchmark run if there is one."""
+    try:
+        with open(results_path, "r", encoding="utf-8") as f:
+            summary = json.load(f)["summary"]
+    except (OSError, KeyError, ValueError):
+        return list(DEFAULT_BACKEND_ORDER)
+    ranked = sorted(summary, key=lambda name: summary[name].get("pages_per_sec", 0.0), reverse=True)
+    return ranked + [name for name in DEFAULT_BACKEND_ORDER if name not in ranked]
+
+
+def text_layer_share(page_texts: List[str]) -> float:
+    if not page_texts:
+        return 0.0
+    return sum(1 for text in page_texts if not page_needs_ocr(text)) / len(page_texts)
+
+
+def select_backend(pdf_path: str, ranking: Optional[List[str]] = None,
+                   probe_pages: int = PDF_PAGE_WINDOW) -> str:
+    """Return the fastest backend whose output is adequate for this document.
+
+    Backends are tried fastest first on the plain text (no table detection)
+    of the first `probe_pages` pages; the first one that yields a usable text layer on at least
+    MIN_ADEQUATE_PAGE_SHARE of them wins. If none does, the backend with the
+    best coverage is returned (OCR handles the rest).
+    """
+    best_share, best_name = -1.0, ""
+    for name in ranking or backend_ranking():
+        backend = BACKENDS.get(name)
+        if backend is None or not backend.available():
+            continue
+        try:
+            page_texts = list(itertools.islice(backend.iter_text_pages(pdf_path), probe_pages))
+        except Exception as e:
+            print(f"⚠️ PDF backend '{name}' failed on {os.path.basename(pdf_path)}: {e}")
+            continue
+        share = text_layer_share(page_texts)
+        if share >= MIN_ADEQUATE_PAGE_SHARE:
+            return name
+        if share > best_share:
+            best_share, best_name = share, name
+    if not best_name:
+        raise RuntimeError(f"No PDF backend could read {pdf_path}")
+    return best_name
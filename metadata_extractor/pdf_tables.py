@@ -0,0 +1,99 @@
+import os
+import re
+from typing import List, Optional
+
+import fitz
+
+# === CONFIGURATION ===
+EXTRACT_TABLES = os.getenv("PDF_EXTRACT_TABLES", "1") == "1"
+MIN_TABLE_ROWS = 2
+MIN_TABLE_COLS = 2
+TABLE_OVERLAP = 0.5     # text blocks with at least this share of their area inside a table are dropped
+CAPTION_DISTANCE = 60   # points above/below a table searched for its "Table n" caption
+
+# Tables travel through the text pipeline as <table ...>TSV</table> blocks, which the
+# cleaner passes through unchanged (see text_cleaning.TABLE_BLOCK)
+CAPTION_PATTERN = re.compile(r"^\s*(?:Table|Tab\.)\s*\d+", re.IGNORECASE)
+
+
+def _compact_cell(cell: Optional[str]) -> str:
+    return " ".join(cell.split()) if cell else ""
+
+
+def table_to_tsv(rows: List[List[Optional[str]]]) -> str:
+    """Render table rows as TSV, dropping empty rows and columns."""
+    rows = [[_compact_cell(cell) for cell in row] for row in rows]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    keep_cols = [j for j in range(width) if any(row[j] for row in rows)]
+    return "\n".join("\t".join(row[j] for j in keep_cols) for row in rows)
+
+
+def table_block(tsv: str, caption: Optional[str] = None) -> str:
+    title = ' title="{}"'.format(caption.replace('"', "'")) if caption else ""
+    return f"\n<table{title}>\n{tsv}\n</table>\n"
+
+
+def _find_caption(blocks: list, bbox: "fitz.Rect") -> Optional[str]:
+    for x0, y0, x1, y1, text, *_ in blocks:
+        near = (bbox.y0 - CAPTION_DISTANCE <= y1 <= bbox.y0 + 5) or (bbox.y1 - 5 <= y0 <= bbox.y1 + CAPTION_DISTANCE)
+        if near and CAPTION_PATTERN.match(text):
+            return " ".join(text.split())
+    return None
+
+
+def _overlap_share(block_rect: "fitz.Rect", tables: List["fitz.Rect"]) -> float:
+    area = block_rect.get_area()
+    if not area:
+        return 0.0
+    return max((block_rect & table).get_area() / area for table in tables)
+
+
+def page_text_with_tables(page: "fitz.Page") -> str:
+    """Page text in reading order, with detected tables emitted as compact TSV blocks.
+
+    Text inside table regions (which would otherwise leak into the prompt as
+    flattened cell soup) and the tables' captions are replaced by one
+    <table title="...">...</table> block per table.
+    """
+    try:
+        found = page.find_tables().tables
+    except AttributeError:  # PyMuPDF < 1.23 has no table finder
+        return page.get_text("text")
+
+    blocks = page.get_text("blocks")
+    tables = []
+    for table in found:
+        rows = table.extract()
+        if len(rows) < MIN_TABLE_ROWS or table.col_count < MIN_TABLE_COLS:
+            continue
+        tsv = table_to_tsv(rows)
+        if tsv:
+            tables.append((fitz.Rect(table.bbox), tsv))
+    if not tables:
+        return page.get_text("text")
+
+    table_rects = [rect for rect, _ in tables]
+    captions = [_find_caption(blocks, rect) for rect in table_rects]
+    parts = []
+    emitted = set()
+    for x0, y0, x1, y1, text, _, block_type in blocks:
+        if block_type != 0:  # image block
+            continue
+        rect = fitz.Rect(x0, y0, x1, y1)
+        stripped = " ".join(text.split())
+        if _overlap_share(rect, table_rects) >= TABLE_OVERLAP or stripped in captions:
+            # Emit each table once, where its first block would have appeared
+            for i, table_rect in enumerate(table_rects):
+                if i not in emitted and (rect.intersects(table_rect) or stripped == captions[i]):
+                    parts.append(table_block(tables[i][1], captions[i]))
+                    emitted.add(i)
+            continue
+        parts.append(text)
+    for i in range(len(tables)):
+        if i not in emitted:
+            parts.append(table_block(tables[i][1], captions[i]))
+    return "\n".join(parts)
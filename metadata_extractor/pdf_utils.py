@@ -1,35 +1,59 @@
-import fitz
-import re
+from typing import Optional
+
+from .memory_utils import SpillingTextBuffer
+from .ocr import apply_ocr_fallback, format_ocr_stats, merge_ocr_stats
+from .pdf_backends import get_backend, select_backend
+from .text_cleaning import clean_text
+
+def format_page_text(text: str) -> str:
+    return clean_text(text, "markdown")
+
+def write_pdf_markdown(pdf_path: str, buffer: SpillingTextBuffer, backend: Optional[str] = None) -> None:
+    """Extract and format a PDF window by window into `buffer`.
+
+    Only PDF_PAGE_WINDOW pages are held in memory at a time; the buffer spills
+    to disk once the process RSS exceeds PDF_RSS_CEILING_MB.
+    """
+    backend = backend or select_backend(pdf_path)
+    pages = 0
+    written = False
+    ocr_stats = None
+
+    for start, page_texts in get_backend(backend).iter_page_windows(pdf_path):
+        # Scanned (image-only) pages come back empty or as glyph garbage; OCR them
+        page_texts, window_stats = apply_ocr_fallback(pdf_path, page_texts, page_offset=start)
+        ocr_stats = merge_ocr_stats(ocr_stats, window_stats)
+        for text in page_texts:
+            markdown = format_page_text(text)
+            if markdown:
+                # Pages are already whitespace-normalised; only table blocks keep their line breaks
+                buffer.write(' ' + markdown if written else markdown)
+                written = True
+        pages += len(page_texts)
+        page_texts = None
+
+    print(f"📄 Extracted {pages} page(s) with PDF backend '{backend}'")
+    if ocr_stats and ocr_stats["pages_without_text"]:
+        print(f"🔍 OCR fallback: {format_ocr_stats(ocr_stats)}")
+    if buffer.spilled:
+        print("💾 RSS ceiling reached, intermediate text was spilled to disk")
+
+def extract_and_format_pdf_to_markdown(pdf_path: str, backend: Optional[str] = None) -> str:
+    """The formatted text of a PDF as one string.
+
+    Memory stays bounded while the PDF is read, but the returned string holds
+    the whole document, as the LLM prompt needs it. To only store the text,
+    use write_pdf_markdown_file, which streams the spilled buffer to disk.
+    """
+    with SpillingTextBuffer() as buffer:
+        write_pdf_markdown(pdf_path, buffer, backend)
+        markdown_text = buffer.getvalue()
 
-def extract_and_format_pdf_to_markdown(pdf_path: str) -> str:
-    doc = fitz.open(pdf_path)
-    markdown_lines = []
-
-    for page in doc:
-        text = page.get_text("text")
-        lines = text.split('\n')
-
-        for line in lines:
-            line = line.strip()
-
-            if re.search(r'(CC[- ]BY|Creative Commons|License|Copyright)', line, re.IGNORECASE):
-                markdown_lines.append(line)
-                continue
-
-            if re.match(r'^\s*(Page\s+\d+|All rights reserved.*)$', line, re.IGNORECASE):
-                continue
-
-            if re.match(r'^\s*(Figure|Fig\.|Table)\s*\d+[:.]?', line, re.IGNORECASE):
-                continue
-
-            if re.match(r'^\d+\s*$', line):
-                continue
-
-            if re.match(r'^[A-Z][A-Z\s\-]{3,}$', line):
-                markdown_lines.append(f"\n## {line.title()}\n")
-            else:
-                markdown_lines.append(line)
-
-    markdown_text = ' '.join(markdown_lines)
-    markdown_text = re.sub(r'\s{2,}', ' ', markdown_text)
     return markdown_text.strip()
+
+def write_pdf_markdown_file(pdf_path: str, output_path: str, backend: Optional[str] = None) -> None:
+    """Extract and format a PDF into the text file `output_path` without building the whole text in memory."""
+    with SpillingTextBuffer() as buffer:
+        write_pdf_markdown(pdf_path, buffer, backend)
+        with open(output_path, "w", encoding="utf-8") as f:
+            buffer.copy_to(f)
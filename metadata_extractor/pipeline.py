@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS task_runs (
+    stage         TEXT NOT NULL,
+    task          TEXT NOT NULL,
+    fingerprint   TEXT NOT NULL,
+    output_hashes TEXT NOT NULL,
+    seconds       REAL,
+    finished_at   TEXT,
+    PRIMARY KEY (stage, task)
+);
+"""
+
+
+def _timed_call(func: Callable, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+@dataclass
+class Task:
+    """One unit of work of a stage: reads `inputs`, writes `outputs` by calling func(*args)."""
+    key: str
+    func: Callable
+    args: tuple = ()
+    inputs: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+
+
+@dataclass
+class Stage:
+    """A pipeline stage.
+
+    `tasks` is called once the upstream stages have finished, so it can list
+    their outputs. A task is re-run only if its fingerprint changes: the
+    content of its input files, the stage's `code` files and `params`
+    (e.g. the prompt text), or if one of its outputs is missing or was
+    modified since it was written.
+    """
+    name: str
+    tasks: Callable[[], List[Task]]
+    depends_on: Sequence[str] = ()
+    code: Sequence[str] = ()
+    params: Dict = field(default_factory=dict)
+    executor: str = "thread"   # "thread" for I/O-bound stages, "process" for CPU-bound ones
+    workers: int = 1
+
+
+class Pipeline:
+    """Minimal DAG runner with content-hashed incremental rebuilds."""
+
+    def __init__(self, stages: List[Stage], manifest_path: str):
+        self.stages = {stage.name: stage for stage in stages}
+        self.conn = sqlite3.connect(manifest_path)
+        self.conn.executescript(SCHEMA)
+
+    def file_hash(self, path: str) -> Optional[str]:
+        """SHA-256 of a file, memoised by size and mtime so unchanged PDFs are not re-read."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        row = self.conn.execute("SELECT size, mtime_ns, sha256 FROM file_hashes WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        sha = digest.hexdigest()
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                              (path, stat.st_size, stat.st_mtime_ns, sha))
+        return sha
+
+    def fingerprint(self, stage: Stage, task: Task) -> str:
+        digest = hashlib.sha256()
+        digest.update(json.dumps([stage.name, task.key, repr(task.args), stage.params],
+                                 sort_keys=True, default=str).encode())
+        for path in list(stage.code) + list(task.inputs):
+            digest.update(f"{path}={self.file_hash(path)}".encode())
+        return digest.hexdigest()
+
+    def is_current(self, stage: Stage, task: Task, fingerprint: str) -> bool:
+        row = self.conn.execute("SELECT fingerprint, output_hashes FROM task_runs WHERE stage = ? AND task = ?",
+                                (stage.name, task.key)).fetchone()
+        if row is None or row[0] != fingerprint:
+            return False
+        recorded = json.loads(row[1])
+        return all(self.file_hash(path) == recorded.get(path) for path in task.outputs)
+
+    def record(self, stage: Stage, task: Task, fingerprint: str, seconds: float) -> None:
+        output_hashes = {path: self.file_hash(path) for path in task.outputs}
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO task_runs VALUES (?, ?, ?, ?, ?, ?)",
+                              (stage.name, task.key, fingerprint, json.dumps(output_hashes),
+                               round(seconds, 3), datetime.now().isoformat(timespec="seconds")))
+
+    def order(self, targets: Optional[Sequence[str]] = None) -> List[Stage]:
+        """Stages in dependency order; with `targets`, only those and their upstream stages."""
+        ordered, visiting = [], set()
+
+        def visit(name: str) -> None:
+            if any(stage.name == name for stage in ordered):
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a cycle through stage '{name}'")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            ordered.append(self.stages[name])
+
+        for name in targets or self.stages:
+            visit(name)
+        return ordered
+
+    def run_stage(self, stage: Stage, force: bool = False) -> Dict[str, int]:
+        stale = []
+        tasks = stage.tasks()
+        blocked = []
+        for task in list(tasks):
+            if not all(os.path.exists(path) for path in task.inputs):
+                print(f"⏭️ {stage.name}/{task.key}: missing input, skipped")
+                blocked.append(task)
+                tasks.remove(task)
+        for task in tasks:
+            fingerprint = self.fingerprint(stage, task)
+            if force or not self.is_current(stage, task, fingerprint):
+                stale.append((task, fingerprint))
+        counts = {"cached": len(tasks) - len(stale), "run": 0, "failed": 0, "skipped": len(blocked)}
+        if not stale:
+            return counts
+
+        pool_class = ProcessPoolExecutor if stage.executor == "process" else ThreadPoolExecutor
+        with pool_class(max_workers=stage.workers) as pool:
+            futures = [(task, fingerprint, pool.submit(_timed_call, task.func, *task.args))
+                       for task, fingerprint in stale]
+            for task, fingerprint, future in futures:
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    counts["failed"] += 1
+                    print(f"❌ {stage.name}/{task.key}: {type(e).__name__}: {e}")
+                    continue
+                self.record(stage, task, fingerprint, seconds)
+                counts["run"] += 1
+        return counts
+
+    def run(self, targets: Optional[Sequence[str]] = None, force: Sequence[str] = ()) -> Dict[str, Dict[str, int]]:
+        results = {}
+        for stage in self.order(targets):
+            start = time.perf_counter()
+            counts = self.run_stage(stage, force=stage.name in force)
+            results[stage.name] = counts
+            problems = "".join(f", {counts[key]} {key}" for key in ("failed", "skipped") if counts[key])
+            print(f"🔧 {stage.name}: {counts['run']} run, {counts['cached']} cached{problems} "
+                  f"({time.perf_counter() - start:.1f}s)")
+        return results
+
+    def close(self) -> None:
+        self.conn.close()
@@ -16,6 +16,7 @@ CRITICAL INSTRUCTIONS:
 8. Assess data accessibility and licensing information of both the publication and datasets.
     Data set distribution and license information should be included if available in the methods section or data availability statement of the publication. If not available, leave these fields empty.
 9. Return only raw JSON, without Markdown formatting or code block markers.
+10. Tables of the publication are given as tab-separated values between <table title="..."> and </table>; use them for trial design (plot size, replication), soil information (texture, bulk density, organic carbon) and treatment levels.
 
 NEVER HALLUCINATE OR MAKE THINGS UP. IF INFORMATION IS NOT PRESENT IN THE TEXT, MARK IT AS EMPTY STRING OR NULL.
 
@@ -71,3 +72,28 @@ EXTRACTION QUALITY STANDARDS:
 
 Return only raw JSON, without Markdown formatting or code block markers.
 """
+
+# Gap-driven extraction: only the fields an LTE overview map row is missing (see gap_extraction.py)
+GAP_PROMPT = """You are an expert in agricultural research data management. The publication below describes, among others, this long-term experiment (LTE) of the LTE overview map:
+{known}
+
+Extract ONLY the following metadata about this LTE from the publication. Return raw JSON matching this JSON schema, without Markdown formatting or code block markers:
+{schema}
+
+Use AGROVOC labels for crop species. Tables are given as tab-separated values between <table title="..."> and </table>.
+NEVER HALLUCINATE OR MAKE THINGS UP. IF INFORMATION IS NOT PRESENT IN THE TEXT, SET THE FIELD TO NULL.
+"""
+
+# Appended to SYSTEM_PROMPT with the fields found by rule_extraction.py
+KNOWN_FIELDS_PROMPT = """
+ALREADY EXTRACTED:
+The following fields were read from the text by exact patterns and are filled in afterwards. Return null for them:
+{fields}
+"""
+
+# Appended to SYSTEM_PROMPT when one publication covers several LTEs (see multi_lte.py)
+MULTI_LTE_PROMPT = """
+SEVERAL LTEs:
+This publication describes several LTEs. Return "LTE_metadata_OverviewMap" as a JSON list with one object per LTE below, in this order, each describing only that LTE (the citation is shared):
+{ltes}
+"""
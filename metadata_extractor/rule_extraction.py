@@ -0,0 +1,153 @@
+"""Rule-based pre-extraction of fields that exact patterns recover reliably.
+
+DOI, ISSN, publication year, CC licence, contact e-mail and site
+coordinates are taken from the text before the LLM call. The LLM is told
+they are known (so it returns null for them), except for the year, which
+it extracts as well (CROSS_CHECKED_FIELDS); afterwards they fill only the
+fields it left empty, and values it filled differently are reported, not
+overridden.
+
+Patterns are not matched in the reference list, whose DOIs, years and
+licences belong to other papers. The paper's own DOI, ISSN, year and
+e-mail are only taken from its first FRONT_MATTER_CHARS characters.
+
+Fields are addressed by dotted paths into MetadataExtractionResponse,
+e.g. "citation.journal.issn".
+"""
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from .prompts import KNOWN_FIELDS_PROMPT
+
+DOI = re.compile(r"\b(10\.\d{4,9}/[^\s\"<>]+)")
+ISSN = re.compile(r"\b(?:e-?)?ISSN[:\s]*(\d{4}-\d{3}[\dXx])\b")
+EMAIL = re.compile(r"\b[A-Za-z0-9._%+\-]+@[A-Za-z0-9\-]+(?:\.[A-Za-z0-9\-]+)*\.[A-Za-z]{2,}\b")
+# The issue year from the citation line, not the (often earlier) online-first or © year:
+# "Geoderma 434 (2023) 116492", "Nutr Cycl Agroecosyst (2018) 110:105", "J. Plant Nutr. Soil Sci. 2018, 181, 664",
+# "ARCHIVES OF AGRONOMY AND SOIL SCIENCE 2020, VOL. 66, NO. 13" and Taylor & Francis "To cite this article: ... (2013)"
+_YEAR = r"((?:18|19|20)\d{2})"
+YEAR = re.compile(
+    r"[A-Za-z]\s*\d{1,4}\s*\(" + _YEAR + r"\)\s*\d"
+    r"|\(" + _YEAR + r"\)\s*\d{1,4}\s*:\s*\d"
+    r"|\b" + _YEAR + r",\s*(?:VOL\.\s*)?\d{1,4},\s*(?:NO\.\s*\d{1,4},\s*)?\d"
+    r"|To cite this article:[^()]{0,1500}\(" + _YEAR + r"\)",
+    re.IGNORECASE)
+CC_LICENSE = re.compile(
+    r"\bCC[\s\-]BY((?:[\s\-](?:NC|SA|ND))*)(?:[\s\-](\d\.\d))?\b"
+    r"|Creative Commons Attribution((?:[\s\-](?:Non-?Commercial|ShareAlike|No-?Derivatives|NoDerivs))*)"
+    r"(?:[\s\-]+(?:License|Licence))?(?:,?\s*(?:version\s*)?(\d\.\d))?",
+    re.IGNORECASE)
+# 51°23'45"N, 51° 23.5' N, 51.3958° N or 51.3958 N; minutes and seconds are optional
+COORDINATE = (r"(\d{1,3}(?:[.,]\d+)?)\s*°?\s*(?:(\d{1,2}(?:[.,]\d+)?)\s*['′’]\s*)?"
+              r"(?:(\d{1,2}(?:[.,]\d+)?)\s*(?:\"|″|''|”)\s*)?")
+LAT_LON = re.compile(COORDINATE + r"([NS])\b(?:\s*(?:,|;|/|and)\s*)?" + COORDINATE + r"([EW])\b")
+
+CC_TERMS = {"noncommercial": "NC", "non-commercial": "NC", "sharealike": "SA",
+            "noderivatives": "ND", "no-derivatives": "ND", "noderivs": "ND"}
+# Cross-check tolerance for coordinates (degrees, about 1 km)
+COORDINATE_TOLERANCE = 0.01
+FRONT_MATTER_CHARS = 8000
+# Pattern values the LLM still extracts itself, so the two cross-check each other
+CROSS_CHECKED_FIELDS = ("citation.year",)
+# The last such heading in the second half of the text starts the reference list
+REFERENCES_HEADING = re.compile(
+    r"\b(?:References|REFERENCES|Literature [Cc]ited|LITERATURE CITED|Bibliography|Literatur(?:verzeichnis)?)\b")
+
+
+def _first(pattern: re.Pattern, text: str) -> Optional[re.Match]:
+    return pattern.search(text)
+
+
+def _degrees(degrees: str, minutes: Optional[str], seconds: Optional[str], hemisphere: str) -> float:
+    value = float(degrees.replace(",", "."))
+    value += float(minutes.replace(",", ".")) / 60 if minutes else 0.0
+    value += float(seconds.replace(",", ".")) / 3600 if seconds else 0.0
+    return round(-value if hemisphere in "SW" else value, 5)
+
+
+def _license(match: re.Match) -> str:
+    cc_terms, cc_version, long_terms, long_version = match.groups()
+    if cc_terms is not None or cc_version is not None or match.group(0).upper().startswith("CC"):
+        terms = [term.upper() for term in re.split(r"[\s\-]+", cc_terms or "") if term]
+        version = cc_version
+    else:
+        terms = [CC_TERMS[term.lower()] for term in re.split(r"[\s\-]+(?=[A-Z])", long_terms or "")
+                 if term and term.lower() in CC_TERMS]
+        version = long_version
+    return " ".join(part for part in ("CC", "-".join(["BY"] + terms), version) if part)
+
+
+def split_matter(text: str) -> Tuple[str, str]:
+    """(front matter, text before the reference list) of an article."""
+    headings = list(REFERENCES_HEADING.finditer(text))
+    if headings and headings[-1].start() >= len(text) // 2:
+        text = text[:headings[-1].start()]
+    return text[:FRONT_MATTER_CHARS], text
+
+
+def pre_extract(text: str) -> Dict[str, Any]:
+    """Fields recovered by pattern from `text`, keyed by dotted path."""
+    front_matter, body = split_matter(text)
+    fields = {}
+    if match := _first(DOI, front_matter):
+        fields["citation.doi"] = match.group(1).rstrip(".,;:)]")
+    if match := _first(ISSN, front_matter):
+        fields["citation.journal.issn"] = match.group(1).upper()
+    if match := _first(YEAR, front_matter):
+        year = int(next(group for group in match.groups() if group))
+        if year <= date.today().year + 1:
+            fields["citation.year"] = year
+    if match := _first(CC_LICENSE, body):
+        fields["citation.license"] = _license(match)
+        fields["citation.open_access"] = True
+    if match := _first(EMAIL, front_matter):
+        fields["LTE_metadata_OverviewMap.sources.contact_email"] = match.group(0)
+    for match in LAT_LON.finditer(body):
+        latitude = _degrees(*match.group(1, 2, 3, 4))
+        longitude = _degrees(*match.group(5, 6, 7, 8))
+        if abs(latitude) <= 90 and abs(longitude) <= 180:
+            fields["LTE_metadata_OverviewMap.latitude"] = latitude
+            fields["LTE_metadata_OverviewMap.longitude"] = longitude
+            break
+    return fields
+
+
+def known_fields_prompt(fields: Dict[str, Any]) -> str:
+    """Prompt addendum listing the pre-extracted fields the LLM should leave null (not CROSS_CHECKED_FIELDS)."""
+    known = {path: value for path, value in fields.items() if path not in CROSS_CHECKED_FIELDS}
+    if not known:
+        return ""
+    return KNOWN_FIELDS_PROMPT.format(fields="\n".join(f"- {path}: {value}" for path, value in known.items()))
+
+
+def _agrees(rule_value: Any, llm_value: Any) -> bool:
+    if isinstance(rule_value, float) and isinstance(llm_value, (int, float)):
+        return abs(rule_value - llm_value) <= COORDINATE_TOLERANCE
+    if isinstance(rule_value, str) and isinstance(llm_value, str):
+        def normalise(value: str) -> str:
+            return re.sub(r"^https?://(?:dx\.)?doi\.org/", "", value.strip().casefold())
+        return normalise(rule_value) == normalise(llm_value)
+    return rule_value == llm_value
+
+
+def apply_rule_fields(parsed_json: Dict, fields: Dict[str, Any]) -> List[Tuple[str, Any, Any]]:
+    """Write the pre-extracted `fields` into the fields the parsed LLM response left empty, in place.
+
+    Returns (path, pattern value, LLM value) for every field the LLM filled
+    differently; the LLM value is kept.
+    """
+    disagreements = []
+    for path, value in fields.items():
+        *parents, key = path.split(".")
+        node = parsed_json
+        for parent in parents:
+            if not isinstance(node.get(parent), dict):
+                node[parent] = {}
+            node = node[parent]
+        llm_value = node.get(key)
+        if llm_value in (None, ""):
+            node[key] = value
+        elif not _agrees(value, llm_value):
+            disagreements.append((path, value, llm_value))
+    return disagreements
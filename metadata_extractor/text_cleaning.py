@@ -0,0 +1,115 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# Whitespace without newlines, so line patterns cannot run into the next line of a page buffer
+_S = r"[^\S\n]"
+
+LICENSE_LINE = r"[^\n]*(?:CC[- ]BY|Creative Commons|License|Copyright)"
+PAGE_MARKER_LINE = rf"(?:Page{_S}+\d+|All rights reserved[^\n]*){_S}*$"
+PAGE_MARKER_PREFIX = rf"Page{_S}+\d+"
+CAPTION_PREFIX = rf"(?:Figure|Fig\.|Table){_S}*\d+"
+CAPTION_PREFIX_SPACED = rf"(?:Figure|Fig\.|Table){_S}+\d+"
+NUMBER_LINE = rf"\d+{_S}*$"
+HEADING_LINE = rf"[A-Z][A-Z \t\-]{{3,}}{_S}*$"
+# Compact TSV tables from metadata_extractor.pdf_tables; passed through verbatim
+TABLE_BLOCK = re.compile(r"(<table[^>\n]*>\n.*?\n</table>)", re.DOTALL)
+
+
+@dataclass(frozen=True)
+class CleaningProfile:
+    """Line rules of one text extractor; all profiles run on the same engine."""
+    name: str
+    keep: Optional[str] = None   # lines containing this (case-insensitive) are never dropped
+    drop: Tuple[str, ...] = ()   # case-insensitive patterns matched at the start of a stripped line
+    headings: str = "keep"       # all-caps lines: "keep", "drop" or "markdown" (## Title)
+
+
+PROFILES: Dict[str, CleaningProfile] = {
+    # metadata_extractor.pdf_utils: markdown for the LLM prompt
+    "markdown": CleaningProfile(
+        name="markdown",
+        keep=LICENSE_LINE,
+        drop=(PAGE_MARKER_LINE, CAPTION_PREFIX, NUMBER_LINE),
+        headings="markdown",
+    ),
+    # pdf_processing/text_parsing.py: whitespace normalisation only
+    "pdfminer": CleaningProfile(name="pdfminer"),
+    # pdf_processing/text_parsing_20250713.py: batch conversion of input/ to output/
+    "pdfminer_batch": CleaningProfile(
+        name="pdfminer_batch",
+        drop=(CAPTION_PREFIX_SPACED, PAGE_MARKER_PREFIX, NUMBER_LINE),
+    ),
+    # pdf_processing/tmp_pdf_text_extraction.py: plain text without headings
+    "pypdf2": CleaningProfile(
+        name="pypdf2",
+        keep=LICENSE_LINE,
+        drop=(PAGE_MARKER_LINE, CAPTION_PREFIX, NUMBER_LINE),
+        headings="drop",
+    ),
+}
+
+
+class TextCleaner:
+    """Cleans whole page buffers with one precompiled pattern.
+
+    Every line rule of a profile is folded into a single multiline regex, so
+    a page is classified in one pass; ordinary text lines never match and are
+    left to the C regex engine. Only candidate lines for dropping and headings
+    reach Python.
+    """
+
+    def __init__(self, profile: CleaningProfile):
+        self.profile = profile
+        self.pattern = self._compile(profile)
+        self.keep = re.compile(profile.keep, re.IGNORECASE) if profile.keep else None
+
+    @staticmethod
+    def _compile(profile: CleaningProfile) -> Optional["re.Pattern"]:
+        branches = []
+        if profile.drop:
+            branches.append(f"(?P<drop>(?i:{'|'.join(profile.drop)})[^\\n]*)")
+        if profile.headings != "keep":
+            branches.append(f"(?P<heading>{HEADING_LINE})")
+        if not branches:
+            return None
+        return re.compile(f"^{_S}*(?:{'|'.join(branches)})", re.MULTILINE)
+
+    def _replace(self, match: "re.Match") -> str:
+        # Checking the keep rule only on candidate lines is much cheaper than a lookahead on every line
+        if self.keep is not None and self.keep.match(match.group()):
+            return match.group()
+        heading = match.group("heading") if self.profile.headings != "keep" else None
+        if heading is None or self.profile.headings == "drop":
+            return ""
+        return f"\n## {heading.strip().title()}\n"
+
+    def clean(self, text: str) -> str:
+        if "<table" not in text:
+            return self._clean_segment(text)
+        parts = TABLE_BLOCK.split(text)
+        cleaned = [part if i % 2 else self._clean_segment(part) for i, part in enumerate(parts)]
+        return "\n".join(part for part in cleaned if part)
+
+    def _clean_segment(self, text: str) -> str:
+        if self.pattern is not None:
+            text = self.pattern.sub(self._replace, text)
+        # Collapse all whitespace (line breaks included) to single spaces at C speed
+        return " ".join(text.split())
+
+
+_CLEANERS: Dict[str, TextCleaner] = {}
+
+
+def get_cleaner(profile: str = "markdown") -> TextCleaner:
+    if profile not in _CLEANERS:
+        try:
+            _CLEANERS[profile] = TextCleaner(PROFILES[profile])
+        except KeyError:
+            raise ValueError(f"Unknown cleaning profile '{profile}'. Available: {', '.join(PROFILES)}") from None
+    return _CLEANERS[profile]
+
+
+def clean_text(text: str, profile: str = "markdown") -> str:
+    """Clean extracted PDF text (one page or a whole document) with the given profile."""
+    return get_cleaner(profile).clean(text)
@@ -0,0 +1,104 @@
+# Benchmark of the PDF text extraction backends on the bundled corpus
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+# Make the metadata_extractor package importable when run as a script
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+from metadata_extractor.memory_utils import current_rss_mb, peak_rss_mb
+from metadata_extractor.pdf_backends import BACKENDS, BENCHMARK_RESULTS_PATH, text_layer_share
+
+# === CONFIGURATION ===
+input_root = os.path.join(PROJECT_DIR, "input")
+output_path = BENCHMARK_RESULTS_PATH
+
+# === FUNCTIONS ===
+def find_pdfs(root):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if filename.lower().endswith(".pdf"):
+                yield os.path.join(dirpath, filename)
+
+def measure(backend_name, pdf_path):
+    """Run one backend on one PDF; executed in a fresh worker process so peak RSS is per run."""
+    backend = BACKENDS[backend_name]
+    backend.available()  # import the library before taking the baseline
+    baseline_mb = current_rss_mb()
+    start = time.perf_counter()
+    try:
+        page_texts = backend.extract_pages(pdf_path)
+        error = None
+    except Exception as e:
+        page_texts, error = [], str(e)
+    seconds = time.perf_counter() - start
+    return {
+        "backend": backend_name,
+        "pdf": os.path.relpath(pdf_path, PROJECT_DIR),
+        "pages": len(page_texts),
+        "seconds": round(seconds, 4),
+        "pages_per_sec": round(len(page_texts) / seconds, 2) if seconds > 0 else 0.0,
+        "chars": sum(len(text.strip()) for text in page_texts),
+        "text_layer_share": round(text_layer_share(page_texts), 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "extraction_rss_mb": round(max(peak_rss_mb() - baseline_mb, 0.0), 1),
+        "error": error,
+    }
+
+def summarize(results):
+    summary = {}
+    for name in {r["backend"] for r in results}:
+        runs = [r for r in results if r["backend"] == name and not r["error"]]
+        pages = sum(r["pages"] for r in runs)
+        seconds = sum(r["seconds"] for r in runs)
+        summary[name] = {
+            "documents": len(runs),
+            "failures": sum(1 for r in results if r["backend"] == name and r["error"]),
+            "pages": pages,
+            "pages_per_sec": round(pages / seconds, 2) if seconds > 0 else 0.0,
+            "chars_per_page": round(sum(r["chars"] for r in runs) / pages, 1) if pages else 0.0,
+            "mean_text_layer_share": round(sum(r["text_layer_share"] for r in runs) / len(runs), 3) if runs else 0.0,
+            "max_peak_rss_mb": max((r["peak_rss_mb"] for r in runs), default=0.0),
+        }
+    return summary
+
+# === MAIN SCRIPT ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare PDF backends on speed, memory and text yield.")
+    parser.add_argument("--input", default=input_root, help="Folder searched recursively for PDFs")
+    parser.add_argument("--output", default=output_path, help="JSON file for per-document results and summary")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    args = parser.parse_args()
+
+    backends = [name for name in args.backends if BACKENDS[name].available()]
+    skipped = sorted(set(args.backends) - set(backends))
+    if skipped:
+        print(f"Skipping backends that are not installed: {', '.join(skipped)}")
+
+    pdfs = list(find_pdfs(args.input))
+    results = []
+    # maxtasksperchild=1 gives every measurement a fresh process, so RSS figures do not accumulate
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes=1, maxtasksperchild=1) as pool:
+        for pdf_path in pdfs:
+            for name in backends:
+                result = pool.apply(measure, (name, pdf_path))
+                results.append(result)
+                status = f"ERROR {result['error']}" if result["error"] else (
+                    f"{result['pages']:4d} pages {result['pages_per_sec']:8.2f} p/s "
+                    f"{result['peak_rss_mb']:7.1f} MB {result['chars']:8d} chars")
+                print(f"{name:9s} {status}  {result['pdf']}")
+
+    summary = summarize(results)
+    print("\nbackend   docs  pages  pages/s  chars/page  text layer  max RSS MB")
+    for name, s in sorted(summary.items(), key=lambda item: item[1]["pages_per_sec"], reverse=True):
+        print(f"{name:9s} {s['documents']:4d} {s['pages']:6d} {s['pages_per_sec']:8.2f} "
+              f"{s['chars_per_page']:11.1f} {s['mean_text_layer_share']:11.3f} {s['max_peak_rss_mb']:11.1f}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"summary": summary, "results": results}, f, indent=2)
+    print(f"\nResults saved to {args.output}")
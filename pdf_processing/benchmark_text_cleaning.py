@@ -0,0 +1,75 @@
+# Micro-benchmark of the text cleaning profiles on the extracted texts in output/
+import argparse
+import os
+import re
+import sys
+import textwrap
+import time
+
+# Make the metadata_extractor package importable when run as a script
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+from metadata_extractor.text_cleaning import PROFILES, get_cleaner
+
+# === CONFIGURATION ===
+output_root = os.path.join(PROJECT_DIR, "output")
+
+# === FUNCTIONS ===
+def load_corpus(root, width):
+    """Read output/**/*.txt; the stored texts are already joined, so re-wrap them into page-like lines."""
+    texts = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if filename.endswith(".txt") and filename != "processing_log.txt":
+                with open(os.path.join(dirpath, filename), "r", encoding="utf-8", errors="replace") as f:
+                    texts.append("\n".join(textwrap.wrap(f.read(), width)) if width else f.read())
+    return texts
+
+def legacy_markdown_clean(text):
+    """The per-line loop pdf_utils used before the shared engine, kept as a baseline."""
+    markdown_lines = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if re.search(r'(CC[- ]BY|Creative Commons|License|Copyright)', line, re.IGNORECASE):
+            markdown_lines.append(line)
+            continue
+        if re.match(r'^\s*(Page\s+\d+|All rights reserved.*)$', line, re.IGNORECASE):
+            continue
+        if re.match(r'^\s*(Figure|Fig\.|Table)\s*\d+[:.]?', line, re.IGNORECASE):
+            continue
+        if re.match(r'^\d+\s*$', line):
+            continue
+        if re.match(r'^[A-Z][A-Z\s\-]{3,}$', line):
+            markdown_lines.append(f"\n## {line.title()}\n")
+        else:
+            markdown_lines.append(line)
+    return re.sub(r'\s{2,}', ' ', ' '.join(markdown_lines)).strip()
+
+def throughput(clean, texts, repeat):
+    size_mb = sum(len(text.encode("utf-8")) for text in texts) / 2**20
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            clean(text)
+    seconds = time.perf_counter() - start
+    return size_mb * repeat / seconds if seconds > 0 else float("inf")
+
+# === MAIN SCRIPT ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report text cleaning throughput in MB/s.")
+    parser.add_argument("--input", default=output_root, help="Folder searched recursively for .txt files")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the corpus per profile")
+    parser.add_argument("--wrap", type=int, default=90, help="Line width for re-wrapping (0 keeps the files as they are)")
+    args = parser.parse_args()
+
+    texts = load_corpus(args.input, args.wrap)
+    if not texts:
+        sys.exit(f"No .txt files found under {args.input}")
+    size_mb = sum(len(text.encode("utf-8")) for text in texts) / 2**20
+    print(f"Corpus: {len(texts)} files, {size_mb:.2f} MB, {args.repeat} passes\n")
+
+    baseline = throughput(legacy_markdown_clean, texts, args.repeat)
+    print(f"{'legacy markdown loop':22s} {baseline:8.2f} MB/s")
+    for name in PROFILES:
+        mb_per_sec = throughput(get_cleaner(name).clean, texts, args.repeat)
+        print(f"{name:22s} {mb_per_sec:8.2f} MB/s")
@@ -1,22 +1,25 @@
 # Text parsing script
 import os
-import re
-from pdfminer.high_level import extract_text
+import sys
+
+# Make the metadata_extractor package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metadata_extractor.pdf_backends import get_backend
+from metadata_extractor.text_cleaning import get_cleaner
 
 # === CONFIGURATION ===
 input_folder = "C:\\Users\\Lachmuth\OneDrive - Leibniz-Zentrum für Agrarlandschaftsforschung (ZALF) e.V\\Dokumente\\FAIRagro\\Use Case 4\\LTE_text_processing\\input\\Westerfeld_documented"         # Folder containing input PDFs
 output_folder = "C:\\Users\\Lachmuth\\OneDrive - Leibniz-Zentrum für Agrarlandschaftsforschung (ZALF) e.V\\Dokumente\\FAIRagro\\Use Case 4\\LTE_text_processing\\output"       # Folder to save cleaned text files
+pdf_backend = "pdfminer"   # one of metadata_extractor.pdf_backends.BACKENDS
+text_cleaner = get_cleaner("pdfminer")   # one of metadata_extractor.text_cleaning.PROFILES
 
 # === FUNCTIONS ===
 def clean_text(text):
-    text = re.sub(r'\n{2,}', '\n\n', text)
-    text = re.sub(r'(?<!\n)\n(?!\n)', ' ', text)
-    text = re.sub(r'\s{2,}', ' ', text)
-    return text.strip()
+    return text_cleaner.clean(text)
 
 def extract_and_clean_pdf_text(pdf_path):
     try:
-        raw_text = extract_text(pdf_path)
+        raw_text = '\n'.join(get_backend(pdf_backend).extract_pages(pdf_path))
         return clean_text(raw_text)
     except Exception as e:
         print(f"Error processing {pdf_path}: {e}")
@@ -1,39 +1,42 @@
 # text_parsing_batch.py
 import os
-import re
+import sys
+import time
 from datetime import datetime
-from pdfminer.high_level import extract_text
+
+# Make the metadata_extractor package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metadata_extractor.memory_utils import SpillingTextBuffer
+from metadata_extractor.ocr import apply_ocr_fallback, format_ocr_stats, merge_ocr_stats
+from metadata_extractor.pdf_backends import get_backend
+from metadata_extractor.text_cleaning import get_cleaner
 
 # === CONFIGURATION ===
 input_root = "C:\\Users\\Lachmuth\\OneDrive - Leibniz-Zentrum für Agrarlandschaftsforschung (ZALF) e.V\\Dokumente\\FAIRagro\\Use Case 4\\LTE_text_processing\\input"
 output_root = "C:\\Users\\Lachmuth\\OneDrive - Leibniz-Zentrum für Agrarlandschaftsforschung (ZALF) e.V\\Dokumente\\FAIRagro\\Use Case 4\\LTE_text_processing\\output"
 log_file_path = os.path.join(output_root, "processing_log.txt")
+pdf_backend = "pdfminer"
+text_cleaner = get_cleaner("pdfminer_batch")
 
 # === FUNCTIONS ===
 def clean_text(text):
-    lines = text.split('\n')
-    cleaned_lines = []
-    for line in lines:
-        if re.match(r'^\s*(Figure|Fig\.|Table)\s+\d+', line, re.IGNORECASE):
-            continue
-        if re.match(r'^\s*Page\s+\d+', line, re.IGNORECASE):
-            continue
-        if re.match(r'^\s*\d+\s*$', line):
-            continue
-        cleaned_lines.append(line)
-
-    cleaned_text = '\n'.join(cleaned_lines)
-    cleaned_text = re.sub(r'\n{2,}', '\n\n', cleaned_text)
-    cleaned_text = re.sub(r'(?<!\n)\n(?!\n)', ' ', cleaned_text)
-    cleaned_text = re.sub(r'\s{2,}', ' ', cleaned_text)
-    return cleaned_text.strip()
-
-def extract_and_clean_pdf_text(pdf_path):
+    return text_cleaner.clean(text)
+
+def extract_and_clean_pdf_text(pdf_path, buffer):
+    """Extract, OCR and clean a PDF window by window into `buffer` (spills to disk above the RSS ceiling)."""
     try:
-        raw_text = extract_text(pdf_path)
-        return clean_text(raw_text), None
+        chars = 0
+        ocr_stats = None
+        for start, page_texts in get_backend(pdf_backend).iter_page_windows(pdf_path):
+            page_texts, window_stats = apply_ocr_fallback(pdf_path, page_texts, page_offset=start)
+            ocr_stats = merge_ocr_stats(ocr_stats, window_stats)
+            cleaned = clean_text('\n'.join(page_texts))
+            if cleaned:
+                buffer.write(' ' + cleaned if chars else cleaned)
+                chars += len(cleaned)
+        return chars, None, ocr_stats
     except Exception as e:
-        return None, str(e)
+        return 0, str(e), None
 
 # === MAIN SCRIPT ===
 if __name__ == "__main__":
@@ -51,23 +54,42 @@ if __name__ == "__main__":
             os.makedirs(output_folder, exist_ok=True)
 
             log_file.write(f"\nProcessing input folder: {input_folder}\n")
+            folder_start = time.perf_counter()
+            total_pages = text_pages = ocr_pages = cached_pages = 0
 
             for filename in os.listdir(input_folder):
                 if filename.lower().endswith(".pdf"):
                     pdf_path = os.path.join(input_folder, filename)
-                    text, error = extract_and_clean_pdf_text(pdf_path)
-
-                    if text:
-                        base_name = os.path.splitext(filename)[0]
-                        output_path = os.path.join(output_folder, f"{base_name}.txt")
-                        with open(output_path, "w", encoding="utf-8") as f:
-                            f.write(text)
-                        log_file.write(f"SUCCESS: Processed {filename} → {output_path}\n")
-                    else:
-                        log_file.write(f"ERROR: Failed to process {filename} - {error}\n")
+                    file_start = time.perf_counter()
+                    with SpillingTextBuffer() as buffer:
+                        chars, error, ocr_stats = extract_and_clean_pdf_text(pdf_path, buffer)
+                        elapsed = time.perf_counter() - file_start
+
+                        if chars:
+                            base_name = os.path.splitext(filename)[0]
+                            output_path = os.path.join(output_folder, f"{base_name}.txt")
+                            with open(output_path, "w", encoding="utf-8") as f:
+                                buffer.copy_to(f)
+                            spill_note = ", spilled to disk" if buffer.spilled else ""
+                            log_file.write(f"SUCCESS: Processed {filename} → {output_path} ({elapsed:.2f}s{spill_note})\n")
+                        else:
+                            log_file.write(f"ERROR: Failed to process {filename} - {error or 'no text extracted'}\n")
+
+                    if ocr_stats:
+                        total_pages += ocr_stats["pages"]
+                        text_pages += ocr_stats["pages"] - ocr_stats["pages_without_text"]
+                        ocr_pages += ocr_stats["pages_ocr"]
+                        cached_pages += ocr_stats["cache_hits"]
+                        if ocr_stats["pages_without_text"]:
+                            log_file.write(f"  OCR: {format_ocr_stats(ocr_stats)}\n")
 
             # Log completion
             log_file.write(f"\nProcessing completed at {datetime.now()}\n")
+            log_file.write(f"Elapsed: {time.perf_counter() - folder_start:.2f}s\n")
+            if total_pages:
+                log_file.write(f"Text layer coverage: {text_pages}/{total_pages} pages "
+                               f"({100 * text_pages / total_pages:.1f}%), "
+                               f"OCR: {ocr_pages} page(s), {cached_pages} from cache\n")
             log_file.write(f"Total files processed: {len([f for f in os.listdir(input_folder) if f.lower().endswith('.pdf')])}\n")
             log_file.write(f"Output folder: {output_folder}\n")
             log_file.write("=" * 40 + "\n")
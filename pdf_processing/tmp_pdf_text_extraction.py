@@ -1,53 +1,26 @@
 # -----------------------------# PDF Text Extraction Functionality
 # This section provides a utility to read and extract text from PDF
 # Function to read PDF text using PyPDF2
-import re
+import logging
+import os
+import sys
+from typing import Optional
 
-def clean_text(text: str) -> str:
-    lines = text.split('\n')
-    cleaned_lines = []
-
-    for line in lines:
-        line = line.strip()
-
-        # Skip empty lines
-        if not line:
-            continue
-        # Preserve license/copyright info
-        if re.search(r'(CC[- ]BY|Creative Commons|License|Copyright)', line, re.IGNORECASE):
-            cleaned_lines.append(line)
-            continue
-
-        # Remove common headers/footers
-        if re.match(r'^\s*(Page\s+\d+|All rights reserved.*)$', line, re.IGNORECASE):
-            continue
+# Make the metadata_extractor package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metadata_extractor.pdf_backends import get_backend
+from metadata_extractor.text_cleaning import get_cleaner
 
-        # Remove figure/table captions
-        if re.match(r'^\s*(Figure|Fig\.|Table)\s*\d+[:.]?', line, re.IGNORECASE):
-            continue
+logger = logging.getLogger(__name__)
 
-        # Remove lines that are just numbers (e.g., page numbers)
-        if re.match(r'^\d+\s*$', line):
-            continue
-
-        # Remove lines that are likely section headings (optional)
-        if re.match(r'^[A-Z][A-Z\s\-]{3,}$', line):
-            continue
-
-        cleaned_lines.append(line)
-
-    # Join lines and normalize whitespace
-    cleaned_text = ' '.join(cleaned_lines)
-    cleaned_text = re.sub(r'\s{2,}', ' ', cleaned_text)
+def clean_text(text: str) -> str:
+    # Keeps license lines; drops headers/footers, captions, page numbers and headings
+    return get_cleaner("pypdf2").clean(text)
 
-    return cleaned_text.strip()
 def extract_text_from_pdf(pdf_path: str) -> str:
     try:
         # Use PyPDF2 to read the PDF file
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
+        text = "".join(get_backend("pypdf2").extract_pages(pdf_path))
         return clean_text(text)
     except Exception as e:
         logger.error(f"Error reading PDF {pdf_path}: {e}")
@@ -1,13 +1,37 @@
 import sys
 import os
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
 import requests
 
 # Add the project directory to Python path
 project_dir = os.path.abspath(os.path.dirname(__file__))
 sys.path.insert(0, project_dir)
 
+from metadata_extractor import ledger as ledger_states
+from metadata_extractor.extraction import extract_from_pdf, extract_from_text_with_usage, extract_rule_fields_from_pdf
+from metadata_extractor.gap_extraction import extract_gaps_with_usage, find_row, missing_columns
+from metadata_extractor.lte_matcher import LTE_MAP_CSV, read_lte_map
+from metadata_extractor.ledger import WorkLedger
+from metadata_extractor.models import MetadataExtractionResponse
+from metadata_extractor.multi_lte import extract_multi_from_text_with_usage
 from metadata_extractor.pdf_utils import extract_and_format_pdf_to_markdown
 
+# === CONFIGURATION ===
+EXTRACTION_URL = os.getenv("EXTRACTION_URL", "http://127.0.0.1:8080/extract_metadata")
+EXTRACTION_MULTI_URL = os.getenv("EXTRACTION_MULTI_URL", "http://127.0.0.1:8080/extract_metadata_multi")
+REQUEST_TIMEOUT = httpx.Timeout(600.0, connect=10.0)  # the LLM may take minutes per paper
+INPUT_ROOT = os.path.join(project_dir, "input")
+OUTPUT_ROOT = os.path.join(project_dir, "output")
+LEDGER_FILE = "extraction_ledger.sqlite"  # kept in the output root; records per-paper progress
+VALIDATION_RETRIES = 1  # new LLM calls for a response that fails validation, before the paper is marked failed
+
 def analyze_pdf(pdf_path):
     # Extract and format the PDF content
     markdown_text = extract_and_format_pdf_to_markdown(pdf_path)
@@ -20,8 +44,9 @@ def analyze_pdf(pdf_path):
 
     # Send the extracted text to the FastAPI endpoint
     response = requests.post(
-        "http://127.0.0.1:8080/extract_metadata",
-        json={"text": markdown_text}
+        EXTRACTION_URL,
+        json={"text": markdown_text},
+        timeout=(REQUEST_TIMEOUT.connect, REQUEST_TIMEOUT.read)
     )
 
     # Print the JSON response
@@ -31,7 +56,248 @@ def analyze_pdf(pdf_path):
     else:
         print(f"❌ Error {response.status_code}: {response.text}")
 
+def fill_lte_gaps(pdf_path, lte_id, lte_map_csv):
+    """Extract only the fields the overview map is missing for one LTE and merge them into its row."""
+    row = find_row(read_lte_map(lte_map_csv), lte_id)
+    columns = missing_columns(row)
+    print(f"🕳️ LTE {lte_id} ({row['name']}): {len(columns)} missing field(s)")
+    merged, _, usage = extract_gaps_with_usage(extract_and_format_pdf_to_markdown(pdf_path), row)
+    filled = {column: merged[column] for column in columns if merged[column] != row[column]}
+    if usage:
+        print(f"🧮 Tokens in/out: {usage['prompt_tokens']}/{usage['completion_tokens']}")
+    print(f"✅ Filled {len(filled)}/{len(columns)}:")
+    print(json.dumps(filled, indent=2, ensure_ascii=False))
+
+    output_file = f"lte_{lte_id}_filled.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent=2, ensure_ascii=False)
+    print(f"📄 Merged map row saved to '{output_file}'")
+
+# === BATCH MODE ===
+def find_papers(input_root):
+    """Yield (LTE folder name, PDF path) for every PDF below input/<LTE>/."""
+    for lte in sorted(os.listdir(input_root)):
+        lte_folder = os.path.join(input_root, lte)
+        if not os.path.isdir(lte_folder):
+            continue
+        for filename in sorted(os.listdir(lte_folder)):
+            if filename.lower().endswith(".pdf"):
+                yield lte, os.path.join(lte_folder, filename)
+
+def result_path(output_root, lte, pdf_path):
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(output_root, lte, f"{base_name}.json")
+
+def group_copies(rows):
+    """Group ledger rows whose PDFs are the same paper filed under several LTE folders.
+
+    Candidates share file name and size; their content hashes decide.
+    """
+    by_name = {}
+    for row in rows:
+        key = (os.path.basename(row["pdf_path"]), os.path.getsize(row["pdf_path"]))
+        by_name.setdefault(key, []).append(row)
+    groups = []
+    for candidates in by_name.values():
+        if len(candidates) == 1:
+            groups.append(candidates)
+            continue
+        by_hash = {}
+        for row in candidates:
+            with open(row["pdf_path"], "rb") as f:
+                by_hash.setdefault(hashlib.sha256(f.read()).hexdigest(), []).append(row)
+        groups.extend(by_hash.values())
+    return groups
+
+async def request_extraction(client, markdown_text, ltes):
+    """One LLM extraction for the paper; returns ({LTE folder: result JSON}, prompt tokens, completion tokens)."""
+    if client is None:
+        # In-process: call the LLM directly instead of going through the extraction service
+        if len(ltes) == 1:
+            metadata, usage = await asyncio.to_thread(extract_from_text_with_usage, markdown_text)
+            results = {ltes[0]: metadata}
+        else:
+            results, usage = await asyncio.to_thread(extract_multi_from_text_with_usage, markdown_text, ltes)
+        usage = usage or {}
+        return ({lte: metadata.model_dump(mode="json", by_alias=True) for lte, metadata in results.items()},
+                usage.get("prompt_tokens"), usage.get("completion_tokens"))
+    if len(ltes) == 1:
+        response = await client.post(EXTRACTION_URL, json={"text": markdown_text})
+    else:
+        response = await client.post(EXTRACTION_MULTI_URL, json={"text": markdown_text, "ltes": ltes})
+    response.raise_for_status()
+    results = {ltes[0]: response.json()} if len(ltes) == 1 else response.json()
+    return (results, response.headers.get("X-LLM-Prompt-Tokens"), response.headers.get("X-LLM-Completion-Tokens"))
+
+async def process_paper(client, semaphore, pdf_pool, ledger, rows):
+    """Run one paper through the remaining stages, recording each in the ledger.
+
+    `rows` holds one ledger row per LTE folder the paper is filed under; all of
+    them are served by one text extraction and one LLM call.
+    """
+    pdf_path = rows[0]["pdf_path"]
+    need_text = need_llm = False
+    for row in rows:
+        resume = ledger.resume_stage(row)
+        row_needs_text = resume == ledger_states.PENDING or not os.path.exists(row["text_path"])
+        need_text = need_text or row_needs_text
+        need_llm = (need_llm or row_needs_text or resume == ledger_states.TEXT_EXTRACTED
+                    or not os.path.exists(row["result_path"]))
+        ledger.start_attempt(row["pdf_path"])
+    loop = asyncio.get_running_loop()
+
+    stage = ledger_states.TEXT_EXTRACTED
+    try:
+        if need_text:
+            start = time.perf_counter()
+            # PDF parsing is CPU-bound: run it in a worker process while other papers wait on the LLM
+            markdown_text = await loop.run_in_executor(pdf_pool, extract_and_format_pdf_to_markdown, pdf_path)
+            seconds = time.perf_counter() - start
+            for row in rows:
+                os.makedirs(os.path.dirname(row["text_path"]), exist_ok=True)
+                with open(row["text_path"], "w", encoding="utf-8") as f:
+                    f.write(markdown_text)
+                # Time and tokens are booked on the first copy so ledger totals count the paper once
+                ledger.mark_text_extracted(row["pdf_path"], seconds if row is rows[0] else 0.0)
+
+        for retry in range(VALIDATION_RETRIES + 1):
+            stage = ledger_states.LLM_DONE
+            if need_llm:
+                if not need_text:
+                    with open(rows[0]["text_path"], "r", encoding="utf-8") as f:
+                        markdown_text = f.read()
+                async with semaphore:
+                    start = time.perf_counter()
+                    results, prompt_tokens, completion_tokens = await request_extraction(
+                        client, markdown_text, [row["lte"] for row in rows])
+                    seconds = time.perf_counter() - start
+                for row in rows:
+                    if row["lte"] not in results:
+                        continue
+                    with open(row["result_path"], "w", encoding="utf-8") as f:
+                        json.dump(results[row["lte"]], f, indent=2, ensure_ascii=False)
+                    first = row is rows[0]
+                    ledger.mark_llm_done(row["pdf_path"], seconds if first else 0.0,
+                                         int(prompt_tokens) if prompt_tokens and first else None,
+                                         int(completion_tokens) if completion_tokens and first else None)
+                missing = [row["lte"] for row in rows if row["lte"] not in results]
+                if missing:
+                    raise ValueError(f"No LTE entry returned for {', '.join(missing)}")
+
+            stage = ledger_states.VALIDATED
+            invalid = []
+            for row in rows:
+                try:
+                    with open(row["result_path"], "r", encoding="utf-8") as f:
+                        MetadataExtractionResponse.model_validate(json.load(f))
+                except ValueError as e:
+                    # Drop the bad response, so neither a retry nor the next run validates it again
+                    os.remove(row["result_path"])
+                    invalid.append((row, e))
+                else:
+                    ledger.mark_validated(row["pdf_path"])
+            if not invalid:
+                break
+            if retry == VALIDATION_RETRIES:
+                raise invalid[0][1]
+            print(f"🔁 {os.path.basename(pdf_path)}: response failed validation, asking the LLM again")
+            rows = [row for row, _ in invalid]
+            need_llm = True
+    except Exception as e:
+        # Interruptions (Ctrl-C, cancellation) are not caught: the paper keeps its last completed stage
+        for row in rows:
+            if ledger.get(row["pdf_path"])["state"] != ledger_states.VALIDATED:
+                ledger.mark_failed(row["pdf_path"], stage, f"{type(e).__name__}: {e}")
+        raise
+
+async def run_batch(input_root, output_root, concurrency, overwrite=False, max_attempts=3, in_process=False,
+                    multi_lte=False):
+    os.makedirs(output_root, exist_ok=True)
+    ledger = WorkLedger(os.path.join(output_root, LEDGER_FILE))
+    rows = []
+    for lte, pdf_path in find_papers(input_root):
+        output_path = result_path(output_root, lte, pdf_path)
+        ledger.register(pdf_path, lte, os.path.splitext(output_path)[0] + ".md", output_path)
+        if overwrite:
+            ledger.reset(pdf_path)
+        row = ledger.get(pdf_path)
+        if row["state"] == ledger_states.VALIDATED:
+            continue
+        if row["state"] == ledger_states.FAILED and row["attempts"] >= max_attempts:
+            print(f"⏭️ Skipping {lte}/{os.path.basename(pdf_path)} after {row['attempts']} failed attempts")
+            continue
+        rows.append(row)
+    # With multi_lte, a paper filed under several LTE folders is extracted once for all of them
+    groups = group_copies(rows) if multi_lte else [[row] for row in rows]
+    total = len(groups)
+    print(f"📚 {total} paper(s) to extract with concurrency {concurrency}"
+          f"{f' ({len(rows)} LTE folder copies)' if len(rows) != total else ''}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    done = failed = 0
+    start = time.perf_counter()
+
+    async def run_one(rows):
+        nonlocal done, failed
+        paper_start = time.perf_counter()
+        try:
+            await process_paper(client, semaphore, pdf_pool, ledger, rows)
+            status = "✅"
+        except Exception as e:
+            failed += 1
+            status = f"❌ {type(e).__name__}: {e}"
+        done += 1
+        print(f"[{done}/{total}] {'+'.join(row['lte'] for row in rows)}/{os.path.basename(rows[0]['pdf_path'])} "
+              f"({time.perf_counter() - paper_start:.1f}s) {status}")
+
+    try:
+        with ProcessPoolExecutor(max_workers=min(concurrency, os.cpu_count() or 1)) as pdf_pool:
+            if in_process:
+                client = None
+                await asyncio.gather(*(run_one(group) for group in groups))
+            else:
+                async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, limits=limits) as client:
+                    await asyncio.gather(*(run_one(group) for group in groups))
+
+        print(f"🏁 {total - failed}/{total} paper(s) extracted in {time.perf_counter() - start:.1f}s"
+              f"{f', {failed} failed' if failed else ''}")
+        totals = ledger.totals()
+        print(f"📒 Ledger: {ledger.summary()} | tokens in/out: "
+              f"{totals['prompt_tokens']}/{totals['completion_tokens']}")
+    finally:
+        ledger.close()
+
 # Example usage
 if __name__ == "__main__":
-    pdf_file_path = "C:\\Users\\Lachmuth\\OneDrive - Leibniz-Zentrum für Agrarlandschaftsforschung (ZALF) e.V\\Dokumente\\FAIRagro\\Use Case 4\\LTE_text_processing\\input\\V140_documented\\Burger_Geoderma_2023_CCBY-NC-ND4-0.pdf" 
-    analyze_pdf(pdf_file_path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract LTE metadata from PDFs via the extraction service.")
+    parser.add_argument("pdf", nargs="?", help="Single PDF to extract")
+    parser.add_argument("--batch", action="store_true", help="Extract every PDF below input/<LTE>/ into output/<LTE>/")
+    parser.add_argument("--input", default=INPUT_ROOT, help="Input root for --batch")
+    parser.add_argument("--output", default=OUTPUT_ROOT, help="Output root for --batch")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once (match the LLM quota)")
+    parser.add_argument("--overwrite", action="store_true", help="Re-extract papers that were already validated")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Give up on a paper after this many failed runs")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Call the LLM directly instead of posting to the extraction service")
+    parser.add_argument("--multi-lte", action="store_true",
+                        help="Extract a paper filed under several LTE folders once, with one LTE entry per folder")
+    parser.add_argument("--rules-only", action="store_true",
+                        help="Only extract the pattern-recoverable fields (DOI, ISSN, year, licence, ...), no LLM call")
+    parser.add_argument("--lte-id", help="Only extract the fields this overview map row is missing (needs a PDF)")
+    parser.add_argument("--lte-map", default=LTE_MAP_CSV, help="LTE overview map CSV for --lte-id")
+    args = parser.parse_args()
+
+    if args.batch:
+        asyncio.run(run_batch(args.input, args.output, args.concurrency, args.overwrite, args.max_attempts,
+                              args.in_process, args.multi_lte))
+    elif args.pdf and args.rules_only:
+        print(json.dumps(extract_rule_fields_from_pdf(args.pdf), indent=2, ensure_ascii=False))
+    elif args.pdf and args.lte_id:
+        fill_lte_gaps(args.pdf, args.lte_id, args.lte_map)
+    elif args.pdf and args.in_process:
+        print(json.dumps(extract_from_pdf(args.pdf).model_dump(mode="json", by_alias=True), indent=2, ensure_ascii=False))
+    elif args.pdf:
+        analyze_pdf(args.pdf)
+    else:
+        parser.error("give a PDF path or --batch")
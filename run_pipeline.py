@@ -0,0 +1,167 @@
+import sys
+import os
+import argparse
+import glob
+import json
+
+# Add the project directory to Python path
+project_dir = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_dir)
+
+from metadata_extractor.pipeline import Pipeline, Stage, Task
+from metadata_extractor.prompts import SYSTEM_PROMPT
+
+# === CONFIGURATION ===
+INPUT_ROOT = os.path.join(project_dir, "input")
+OUTPUT_ROOT = os.path.join(project_dir, "output")
+MANIFEST_PATH = os.path.join(OUTPUT_ROOT, "pipeline_manifest.sqlite")
+PDF_WORKERS = os.cpu_count() or 1
+LLM_WORKERS = int(os.getenv("LLM_CONCURRENCY", "4"))
+
+def source(*parts):
+    return os.path.join(project_dir, *parts)
+
+# === STAGE FUNCTIONS ===
+# Top-level functions so they can be sent to worker processes; heavy imports stay inside
+# so running one stage does not require the dependencies of all the others.
+
+def pdf_to_markdown(pdf_path, markdown_path):
+    from metadata_extractor.pdf_utils import write_pdf_markdown_file
+    os.makedirs(os.path.dirname(markdown_path), exist_ok=True)
+    write_pdf_markdown_file(pdf_path, markdown_path)
+
+def markdown_to_metadata(markdown_path, json_path):
+    # In-process LLM call: threads share one client pool, no round trip through the extraction service
+    from metadata_extractor.extraction import extract_from_text
+    with open(markdown_path, "r", encoding="utf-8") as f:
+        markdown_text = f.read()
+    metadata = extract_from_text(markdown_text)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(metadata.model_dump(mode="json", by_alias=True), f, indent=2, ensure_ascii=False)
+
+def export_parquet(output_root, parquet_dir):
+    from metadata_extractor.columnar_export import export_parquet as export
+    export(output_root, parquet_dir)
+
+def enrich_bibtex(*paths):
+    from bibtex_processing.bibtex_enrichment import enrich_bibtex as enrich
+    enrich(*paths)
+
+def keyword_network(bib_path, png_path):
+    import matplotlib
+    matplotlib.use("Agg")
+    from bibtex_processing.bibliometric_analysis import keyword_network as build_network
+    build_network(bib_path, png_path)
+
+def metadata_coverage(csv_path, output_dir):
+    import matplotlib
+    matplotlib.use("Agg")
+    from bibtex_processing.LTEmetadata_heatmap import metadata_coverage as plot_coverage
+    plot_coverage(csv_path, output_dir)
+
+# === TASK LISTS ===
+def find_papers():
+    for pdf_path in sorted(glob.glob(os.path.join(INPUT_ROOT, "*", "*.pdf"))):
+        lte = os.path.basename(os.path.dirname(pdf_path))
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        yield lte, pdf_path, os.path.join(OUTPUT_ROOT, lte, base_name)
+
+def pdf_text_tasks():
+    return [Task(key=f"{lte}/{os.path.basename(pdf_path)}", func=pdf_to_markdown,
+                 args=(pdf_path, f"{stem}.md"), inputs=[pdf_path], outputs=[f"{stem}.md"])
+            for lte, pdf_path, stem in find_papers()]
+
+def llm_tasks():
+    return [Task(key=f"{lte}/{os.path.basename(stem)}", func=markdown_to_metadata,
+                 args=(f"{stem}.md", f"{stem}.json"), inputs=[f"{stem}.md"], outputs=[f"{stem}.json"])
+            for lte, _, stem in find_papers()]
+
+def parquet_tasks():
+    parquet_dir = os.path.join(OUTPUT_ROOT, "parquet")
+    results = [f"{stem}.json" for _, _, stem in find_papers() if os.path.exists(f"{stem}.json")]
+    if not results:
+        return []
+    return [Task(key="results", func=export_parquet, args=(OUTPUT_ROOT, parquet_dir), inputs=results,
+                 outputs=[os.path.join(parquet_dir, f"{name}.parquet") for name in (
+                     "papers", "authors", "research_parameters", "crop_species", "soil_info")])]
+
+def bibliographies():
+    """(raw .bib, output folder, base name) for every input/<folder>/<name>_raw.bib."""
+    for raw_path in sorted(glob.glob(os.path.join(INPUT_ROOT, "*", "*_raw.bib"))):
+        folder = os.path.basename(os.path.dirname(raw_path))
+        base_name = os.path.basename(raw_path)[:-len("_raw.bib")]
+        yield raw_path, os.path.join(OUTPUT_ROOT, folder), base_name
+
+def scopus_tasks():
+    tasks = []
+    for raw_path, output_dir, base_name in bibliographies():
+        outputs = [os.path.join(output_dir, f"{base_name}_rich.bib"),
+                   os.path.join(output_dir, f"{base_name}_schemaorg.json"),
+                   os.path.join(output_dir, "scopus_query_log.txt")]
+        tasks.append(Task(key=base_name, func=enrich_bibtex, args=(raw_path, *outputs),
+                          inputs=[raw_path], outputs=outputs))
+    return tasks
+
+def bibliometric_tasks():
+    tasks = []
+    for _, output_dir, base_name in bibliographies():
+        bib_path = os.path.join(output_dir, f"{base_name}_rich.bib")
+        png_path = os.path.join(output_dir, f"{base_name}_keyword_network.png")
+        outputs = [png_path] + [os.path.join(output_dir, f"{base_name}_keyword_network{ext}")
+                                for ext in (".gexf", ".graphml")]
+        tasks.append(Task(key=base_name, func=keyword_network, args=(bib_path, png_path),
+                          inputs=[bib_path], outputs=outputs))
+    return tasks
+
+def heatmap_tasks():
+    outputs = [os.path.join(OUTPUT_ROOT, name) for name in (
+        "lte_metadata_coverage_heatmap.png", "top_25_most_missing_metadata.csv",
+        "top_25_least_missing_metadata.csv", "top_25_most_missing_metadata_clean.csv",
+        "top_25_least_missing_metadata_clean.csv", "top_50_LTE_least_missing_relevant_metadata.csv")]
+    csv_paths = sorted(glob.glob(os.path.join(INPUT_ROOT, "metadata_LTEmap_*.csv")))
+    if not csv_paths:
+        return []
+    # The newest overview map export wins
+    return [Task(key=os.path.basename(csv_paths[-1]), func=metadata_coverage,
+                 args=(csv_paths[-1], OUTPUT_ROOT), inputs=[csv_paths[-1]], outputs=outputs)]
+
+STAGES = [
+    Stage("pdf_text", pdf_text_tasks, executor="process", workers=PDF_WORKERS,
+          code=[source("metadata_extractor", name) for name in (
+              "pdf_utils.py", "pdf_backends.py", "pdf_tables.py", "text_cleaning.py", "ocr.py")]),
+    Stage("llm_extraction", llm_tasks, depends_on=["pdf_text"], workers=LLM_WORKERS,
+          code=[source("metadata_extractor", name) for name in (
+              "extraction.py", "llm_client.py", "models.py", "prompts.py", "rule_extraction.py", "agrovoc.py")],
+          params={"prompt": SYSTEM_PROMPT, "model": os.getenv("LLM_MODEL_NAME")}),
+    Stage("parquet_export", parquet_tasks, depends_on=["llm_extraction"],
+          code=[source("metadata_extractor", "columnar_export.py")]),
+    Stage("scopus_enrichment", scopus_tasks,
+          code=[source("bibtex_processing", name) for name in (
+              "bibtex_enrichment.py", "scopus_client.py", "scopus_cache.py", "bibtex_stream.py", "dedup.py",
+              "snapshot_index.py")]),
+    Stage("bibliometric_analysis", bibliometric_tasks, depends_on=["scopus_enrichment"],
+          code=[source("bibtex_processing", "bibliometric_analysis.py"),
+                source("bibtex_processing", "network_layout.py")]),
+    Stage("metadata_heatmap", heatmap_tasks,
+          code=[source("bibtex_processing", "LTEmetadata_heatmap.py")]),
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the PDF → metadata → enrichment pipeline incrementally.")
+    parser.add_argument("stages", nargs="*", help="Stages to bring up to date (with their upstream stages); default all")
+    parser.add_argument("--force", nargs="+", default=[], metavar="STAGE", help="Re-run these stages even if cached")
+    parser.add_argument("--list", action="store_true", help="List the stages and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for stage in STAGES:
+            upstream = f" (after {', '.join(stage.depends_on)})" if stage.depends_on else ""
+            print(f"{stage.name}{upstream}")
+        sys.exit(0)
+
+    os.makedirs(OUTPUT_ROOT, exist_ok=True)
+    pipeline = Pipeline(STAGES, MANIFEST_PATH)
+    try:
+        pipeline.run(args.stages or None, force=args.force)
+    finally:
+        pipeline.close()
@@ -0,0 +1,186 @@
+"""scopus_client against the local mock Scopus server (bibtex_processing/mock_scopus_server.py).
+
+    python -m pytest tests/test_scopus_client.py
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bibtex_processing.mock_scopus_server import (INVALID_DOI_PREFIX, MISSING_DOI_PREFIX, NO_ABSTRACT_DOI_PREFIX,
+                                                   MockScopusHandler, start_server)
+from bibtex_processing.scopus_client import (ABSTRACT_ONLY_FIELDS, SEARCH_REQUIRED_FIELDS, ScopusClient,
+                                             ScopusError, ScopusUnavailable, TokenBucket, lookup_entries,
+                                             missing_fields)
+from bibtex_processing.scopus_cache import ScopusCache, cache_key
+
+MOCK_RATE = 50
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = start_server(0, MOCK_RATE)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def mock_rate():
+    MockScopusHandler.rate = MOCK_RATE
+    yield
+    MockScopusHandler.rate = MOCK_RATE
+    MockScopusHandler.max_count = 25
+
+
+def doi_entries(count):
+    return [{"doi": f"10.1234/test.{i}"} for i in range(count)]
+
+
+def lookup(entries, base_url, cache_path=None, **options):
+    options.setdefault("rate", MOCK_RATE)
+    return asyncio.run(lookup_entries(entries, "test-key", cache_path=cache_path, snapshot_path=None,
+                                      base_url=base_url, **options))
+
+
+def run_client(base_url, coroutine_function, **options):
+    """Result of `coroutine_function(client)` and the client's stats."""
+    async def run():
+        async with ScopusClient(options.pop("api_key", "test-key"), base_url=base_url, **options) as client:
+            return await coroutine_function(client), client.stats
+    return asyncio.run(run())
+
+
+def test_results_in_input_order(base_url):
+    entries = doi_entries(20)
+    entries[3] = {"doi": f"{MISSING_DOI_PREFIX}.3"}
+    entries[5] = {"title": "Soil organic carbon under long-term fertilisation", "author": "Doe, J."}
+    results = lookup(entries, base_url)
+    assert results[3] is None
+    assert results[5] is not None
+    for entry, result in zip(entries, results):
+        if "doi" in entry and result is not None:
+            assert result["abstracts-retrieval-response"]["coredata"]["prism:doi"] == entry["doi"]
+
+
+def test_one_request_per_doi(base_url):
+    results, stats = run_client(base_url, lambda client: client.lookup_many(doi_entries(30)), rate=MOCK_RATE)
+    assert all(results)
+    assert stats["requests"] - stats["retries"] == 30
+
+
+def test_throttled_requests_are_retried(base_url):
+    # The client starts faster than the mock allows, so some requests are answered with 429
+    MockScopusHandler.rate = 5
+    results, stats = run_client(base_url, lambda client: client.lookup_many(doi_entries(30)), rate=20)
+    assert all(results)
+    assert stats["throttled"] > 0
+    assert stats["retries"] >= stats["throttled"]
+
+
+def test_rate_recovers_after_throttling():
+    bucket = TokenBucket(9)
+    bucket.throttled()
+    bucket.throttled()
+    assert bucket.rate == 2.25
+    for _ in range(30):
+        bucket.succeeded()
+    assert bucket.rate == 9
+
+
+def test_rejected_key_is_not_retried(base_url):
+    async def rejected(client):
+        # The mock rejects requests without a key header with 401
+        client.http.headers["X-ELS-APIKey"] = ""
+        return await client.abstract_by_doi("10.1234/test.1")
+
+    with pytest.raises(ScopusError):
+        run_client(base_url, rejected)
+
+
+def test_missing_key_is_unavailable(base_url):
+    async def without_key(client):
+        client.api_key = ""
+        return await client.abstract_by_doi("10.1234/test.1")
+
+    with pytest.raises(ScopusUnavailable):
+        run_client(base_url, without_key)
+
+
+def test_cached_run_makes_no_requests(base_url, tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    entries = doi_entries(10) + [{"doi": f"{MISSING_DOI_PREFIX}.1"}]
+    first = lookup(entries, base_url, cache_path)
+
+    async def second_run(client):
+        return await client.lookup_many(entries)
+
+    cache = ScopusCache(cache_path)
+    try:
+        second, stats = run_client(base_url, second_run, cache=cache)
+    finally:
+        cache.close()
+    assert second == first
+    assert stats["requests"] == 0
+
+
+def test_unavailable_results_are_not_cached(tmp_path):
+    # Nothing listens on this port: every attempt fails and the entry must be looked up again next time
+    cache_path = str(tmp_path / "cache.sqlite")
+    entry = {"doi": "10.1234/test.1"}
+    assert lookup([entry], "http://127.0.0.1:9", cache_path, max_retries=0) == [None]
+    cache = ScopusCache(cache_path)
+    try:
+        assert cache.get(cache_key(entry)) == (False, None)
+    finally:
+        cache.close()
+
+
+def test_batched_lookup_is_complete(base_url):
+    entries = doi_entries(30) + [{"doi": f"{MISSING_DOI_PREFIX}.1"}]
+    unbatched = lookup(entries, base_url)
+    batched = lookup(entries, base_url, doi_batch_size=25)
+    assert batched == unbatched
+    assert all(not missing_fields(result, ABSTRACT_ONLY_FIELDS) for result in batched[:-1])
+
+
+def test_search_view_only_saves_requests(base_url):
+    entries = doi_entries(50) + [{"doi": f"{NO_ABSTRACT_DOI_PREFIX}.1"}]
+
+    async def batched(client):
+        return await client.lookup_many(entries, 25, SEARCH_REQUIRED_FIELDS)
+
+    results, stats = run_client(base_url, batched, rate=MOCK_RATE)
+    assert all(results)
+    # 3 searches, and one retrieval for the record whose search view lacks the abstract
+    assert stats["requests"] - stats["retries"] == 4
+    assert stats["fallbacks"] == 1
+    assert results[-1]["abstracts-retrieval-response"]["coredata"]["dc:description"]
+
+
+def test_search_records_are_not_served_as_retrievals(base_url, tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    entries = doi_entries(10)
+    lookup(entries, base_url, cache_path, doi_batch_size=25, required_fields=SEARCH_REQUIRED_FIELDS)
+    results = lookup(entries, base_url, cache_path)
+    assert all(not missing_fields(result, ABSTRACT_ONLY_FIELDS) for result in results)
+
+
+@pytest.mark.parametrize("reject", ["invalid_doi", "count"])
+def test_rejected_search_falls_back_without_caching_negatives(base_url, tmp_path, reject):
+    cache_path = str(tmp_path / "cache.sqlite")
+    entries = doi_entries(20)
+    if reject == "invalid_doi":
+        entries[7] = {"doi": f"{INVALID_DOI_PREFIX}.7"}
+    else:
+        MockScopusHandler.max_count = 10
+    results = lookup(entries, base_url, cache_path, doi_batch_size=25)
+    assert results == lookup(entries, base_url)
+    assert sum(result is not None for result in results) == (19 if reject == "invalid_doi" else 20)
+    cache = ScopusCache(cache_path)
+    try:
+        for entry, result in zip(entries, results):
+            assert cache.get(cache_key(entry)) == (True, result)
+    finally:
+        cache.close()